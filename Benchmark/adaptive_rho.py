@@ -0,0 +1,83 @@
+"""
+This script compares ADMM with a fixed penalty rho against residual balancing (adaptive_rho) and over-relaxation
+(relaxation) on the same feeders. All variants stop on the same residual rule (--eps-abs, --eps-rel, see
+residual_tolerances), so they end at the same accuracy. For every variant it reports the iterations, why the run stopped,
+the final objective, the deviation from the centralized optimum, the last rho and the wall time. The generated feeders
+of --feeders are written to rawData/synth_build_<nodes> on first use.
+
+Usage:
+    python -m Benchmark.adaptive_rho --systems avista_sys --feeders 100 500 --rho 5e-5 --relaxation 1.6
+"""
+import argparse
+import os
+import time
+import pyomo.environ as pe
+from Benchmark.generate_feeder import benchmark_feeder
+from Build_Model.Constraints import build_pyomo_model
+from Build_Model.Objective import cost_minimize, pyomo_solve
+from Build_Model.solvers import set_solver
+from Distributed.admm import solve_ADMM
+from Distributed.area_informatiion import get_area_info
+from Distributed.separate_areas import split_data_into_areas
+from Parser.cache import load_system_data
+
+## same arbitrary price profile as main.py
+PRICE = [0.1, 0.1, 0.1, 0.1, 0.1, 0.12, 0.15, 0.18, 0.2, 0.2, 0.22, 0.25, 0.25, 0.28, 0.33, 0.3, 0.25, 0.22, 0.15, 0.12, 0.12, 0.1, 0.1, 0.1]
+
+## variant name -> solve_ADMM keyword arguments, relaxation is filled in from the command line
+def variants(relaxation):
+    return {
+        'fixed': {},
+        'adaptive': {'adaptive_rho': True},
+        'relaxed': {'relaxation': relaxation},
+        'adaptive+relaxed': {'adaptive_rho': True, 'relaxation': relaxation},
+    }
+
+def run(system_name, rho, max_iterations, relaxation, eps_abs=1e-3, eps_rel=1e-4, solver=None):
+    area_info = get_area_info(system_name)
+    data = load_system_data(os.path.join("rawData", system_name, "csvs"), PRICE, mode="array")
+    centralized = pe.value(pyomo_solve(build_pyomo_model(data), cost_minimize, solver=solver).obj)
+    rows = []
+    for name, kwargs in variants(relaxation).items():
+        start = time.perf_counter()
+        try:
+            vals, objective, _, _ = solve_ADMM(data, split_data_into_areas(data, area_info), area_info, cost_minimize,
+                                               rho=rho, max_iterations=max_iterations, solver=solver, eps_abs=eps_abs,
+                                               eps_rel=eps_rel, **kwargs)
+        except Exception as e: ## e.g. an infeasible area model for a poor rho
+            rows.append({'system': system_name, 'variant': name, 'error': f"{type(e).__name__}"})
+            continue
+        last = max(objective)
+        rows.append({'system': system_name, 'variant': name, 'iterations': len(objective),
+                     'stop_reason': vals['stop_reason'], 'objective': objective[last],
+                     'gap': abs(objective[last] - centralized) / abs(centralized),
+                     'rho': vals['iteration_stats']['rho'][-1], 'wall_s': time.perf_counter() - start})
+    return rows
+
+def print_report(rows):
+    print(f"{'system':>16} {'variant':>17} {'iterations':>11} {'stopped':>15} {'objective':>14} {'gap [%]':>9} {'last rho':>10} {'wall [s]':>9}")
+    for row in rows:
+        if 'error' in row:
+            print(f"{row['system']:>16} {row['variant']:>17} failed: {row['error']}")
+            continue
+        print(f"{row['system']:>16} {row['variant']:>17} {row['iterations']:11d} {row['stop_reason']:>15} {row['objective']:14.4f} "
+              f"{100 * row['gap']:9.4f} {row['rho']:10.3g} {row['wall_s']:9.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fixed vs adaptive rho and over-relaxation of ADMM")
+    parser.add_argument('--systems', nargs='*', default=['avista_sys'])
+    parser.add_argument('--feeders', type=int, nargs='*', default=[100, 500], help="nodes of the generated feeders to add")
+    parser.add_argument('--solver', default='auto')
+    parser.add_argument('--rho', type=float, default=5e-5)
+    parser.add_argument('--relaxation', type=float, default=1.6)
+    parser.add_argument('--max-iterations', type=int, default=300)
+    parser.add_argument('--eps-abs', type=float, default=1e-3)
+    parser.add_argument('--eps-rel', type=float, default=1e-4)
+    args = parser.parse_args()
+
+    set_solver(args.solver)
+    rows = []
+    for system_name in args.systems + [benchmark_feeder(n_nodes) for n_nodes in args.feeders]:
+        rows += run(system_name, args.rho, args.max_iterations, args.relaxation, args.eps_abs, args.eps_rel)
+    print_report(rows)
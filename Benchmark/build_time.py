@@ -0,0 +1,108 @@
+"""
+This script reports the build time of build_pyomo_model on generated feeders of increasing size. For every size the
+power balance constraint is also built with the previous rule, which scanned all of Lset for the incoming and outgoing
+lines of every (t, j), so the report shows the speedup of the adjacency-indexed construction.
+
+Usage:
+    python -m Benchmark.build_time --sizes 100 500 1000 2000 5000 --legacy-max 2000
+"""
+import argparse
+import logging
+import os
+import time
+from pyomo.common.timing import ConstructionTimer
+from pyomo.environ import ConcreteModel, Var, Constraint, Reals, NonNegativeReals
+from Benchmark.generate_feeder import generate_feeder, RAW_DATA
+from Build_Model.Constraints import build_pyomo_model
+from Parser.cache import load_system_data
+
+###############################################################################
+# Helper collecting the construction time of every Pyomo component
+###############################################################################
+class ConstructionTimes(logging.Handler):
+    def __init__(self):
+        super().__init__(logging.INFO)
+        self.times = {}
+
+    def emit(self, record):
+        if isinstance(record.msg, ConstructionTimer):
+            self.times[record.msg.name] = record.msg.timer
+
+    def __enter__(self):
+        self.logger = logging.getLogger('pyomo.common.timing.construction')
+        self.old_level = self.logger.level
+        self.logger.setLevel(logging.INFO)
+        self.logger.addHandler(self)
+        return self
+
+    def __exit__(self, *exc):
+        self.logger.removeHandler(self)
+        self.logger.setLevel(self.old_level)
+
+## Power balance exactly as it was built before the adjacency lookups (O(T * N * L))
+def legacy_power_balance(data):
+    model = ConcreteModel()
+    model.Tset, model.Nset, model.Lset = data['Tset'], data['Nset'], data['Lset']
+    model.Bset, model.Eset = data['Bset'], data['Eset']
+    model.P_subs = Var(model.Tset, domain=NonNegativeReals)
+    model.P = Var(model.Tset, model.Lset, domain=Reals)
+    model.Pe_c = Var(model.Tset, model.Eset, domain=NonNegativeReals)
+    model.Pe_d = Var(model.Tset, model.Eset, domain=NonNegativeReals)
+    model.P_c = Var(model.Tset, model.Bset, domain=NonNegativeReals)
+    model.P_d = Var(model.Tset, model.Bset, domain=NonNegativeReals)
+
+    def real_power_balance_rule(model, t, j):
+        substationBus = data['substationBus']
+        p_L = data['p_L']
+        incoming_pij = (0 if j in substationBus else sum(model.P[t, (i, j)] for (i, jj) in model.Lset if jj == j))
+        outgoing_pij = sum(model.P[t, (j, k)] for (jj, k) in model.Lset if jj == j)
+        bat_charge = model.P_c[t, j] if j in model.Bset else 0
+        bat_discharge = model.P_d[t, j] if j in model.Bset else 0
+        edo_charge = model.Pe_c[t, j] if j in model.Eset else 0
+        edo_discharge = model.Pe_d[t, j] if j in model.Eset else 0
+        load = p_L[(t, j)]
+        if j in substationBus:
+            return model.P_subs[t] - outgoing_pij - load - bat_charge + bat_discharge - edo_charge + edo_discharge == 0
+        return incoming_pij - outgoing_pij - load - bat_charge + bat_discharge - edo_charge + edo_discharge == 0
+
+    model.real_power_balance_constraint = Constraint(model.Tset, model.Nset, rule=real_power_balance_rule)
+    return model
+
+def build_time_report(sizes, legacy_max=2000, T=24, seed=0):
+    rows = []
+    for n_nodes in sizes:
+        name = f"synth_build_{n_nodes}"
+        generate_feeder(name, n_nodes, n_batteries=max(1, n_nodes // 50), n_edos=max(1, n_nodes // 25), T=T, seed=seed)
+        data = load_system_data(os.path.join(RAW_DATA, name, "csvs"), [0.1] * T, mode="array")
+
+        with ConstructionTimes() as timer:
+            start = time.perf_counter()
+            model = build_pyomo_model(data)
+            build = time.perf_counter() - start
+        balance = timer.times['real_power_balance_constraint']
+        row = {'nodes': n_nodes, 'rows': sum(len(c) for c in model.component_objects(Constraint)),
+               'build_s': build, 'balance_s': balance, 'legacy_balance_s': None, 'legacy_build_s': None, 'speedup': None}
+
+        if n_nodes <= legacy_max:
+            with ConstructionTimes() as timer:
+                legacy_power_balance(data)
+            row['legacy_balance_s'] = timer.times['real_power_balance_constraint']
+            row['legacy_build_s'] = build - balance + row['legacy_balance_s']
+            row['speedup'] = row['legacy_build_s'] / build
+        rows.append(row)
+    return rows
+
+def print_report(rows):
+    print(f"{'nodes':>8} {'rows':>9} {'build [s]':>10} {'balance [s]':>12} {'legacy balance [s]':>19} {'legacy build [s]':>17} {'speedup':>8}")
+    for r in rows:
+        legacy = [f"{r['legacy_balance_s']:19.3f}", f"{r['legacy_build_s']:17.3f}", f"{r['speedup']:7.1f}x"] if r['speedup'] else [f"{'-':>19}", f"{'-':>17}", f"{'-':>8}"]
+        print(f"{r['nodes']:8d} {r['rows']:9d} {r['build_s']:10.3f} {r['balance_s']:12.3f} " + " ".join(legacy))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build time of build_pyomo_model on generated feeders")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 500, 1000, 2000, 5000])
+    parser.add_argument('--legacy-max', type=int, default=2000, help="largest feeder also built with the legacy rule")
+    parser.add_argument('--T', type=int, default=24)
+    args = parser.parse_args()
+    print_report(build_time_report(args.sizes, args.legacy_max, args.T))
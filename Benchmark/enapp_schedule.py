@@ -0,0 +1,61 @@
+"""
+This script compares the schedules of the EnAPP area solves (see Distributed/enapp.py): the sweep solving every area in
+every iteration, and the wavefront solving the area tree by depth and skipping the areas whose dummy node loads did not
+change. For every run it reports the depth of the area tree, the iterations, the area solves, the objective and the
+wall time, and the solves the wavefront saves against the sweep run of the same system. The generated feeders of
+--feeders are written to rawData/synth_build_<nodes> on first use.
+
+Usage:
+    python -m Benchmark.enapp_schedule --systems avista_sys --feeders 100 500 --executor serial
+"""
+import argparse
+import os
+import time
+from Benchmark.generate_feeder import benchmark_feeder
+from Build_Model.Objective import cost_minimize
+from Build_Model.solvers import set_solver
+from Distributed.area_informatiion import get_area_info
+from Distributed.enapp import solve_EnAPP, area_levels, enapp_schedule_stats
+from Distributed.executors import EXECUTORS
+from Distributed.separate_areas import split_data_into_areas
+from Parser.cache import load_system_data
+
+## same arbitrary price profile as main.py
+PRICE = [0.1, 0.1, 0.1, 0.1, 0.1, 0.12, 0.15, 0.18, 0.2, 0.2, 0.22, 0.25, 0.25, 0.28, 0.33, 0.3, 0.25, 0.22, 0.15, 0.12, 0.12, 0.1, 0.1, 0.1]
+
+def run(system_name, schedule, executor='serial', max_iterations=50, solver=None):
+    area_info = get_area_info(system_name)
+    data = load_system_data(os.path.join("rawData", system_name, "csvs"), PRICE, mode="array")
+    data_area = split_data_into_areas(data, area_info)
+    start = time.perf_counter()
+    vals, objective, _ = solve_EnAPP(data, data_area, area_info, cost_minimize, max_iterations=max_iterations, solver=solver,
+                                     executor=executor, schedule=schedule)
+    wall = time.perf_counter() - start
+    return {'system': system_name, 'schedule': schedule, 'areas': len(area_info), 'depth': len(area_levels(area_info)) - 1,
+            'iterations': len(objective), 'solves': vals['iteration_stats']['solves'], 'objective': objective[max(objective)], 'wall_s': wall}
+
+## Solves saved by every run against the sweep run of its system, nan without one
+def print_report(rows):
+    print(f"{'system':>16} {'areas':>6} {'depth':>6} {'schedule':>10} {'iterations':>11} {'solves':>7} {'saved':>6} {'objective':>14} {'wall [s]':>9}")
+    sweeps = {row['system']: row['iterations'] for row in rows if row['schedule'] == 'sweep'}
+    for row in rows:
+        stats = enapp_schedule_stats(row['schedule'], row['solves'], row['areas'], sweeps.get(row['system']))
+        saved = stats.get('solves_saved', float('nan'))
+        print(f"{row['system']:>16} {row['areas']:6d} {row['depth']:6d} {row['schedule']:>10} {row['iterations']:11d} {stats['solves']:7d} "
+              f"{saved:6} {row['objective']:14.4f} {row['wall_s']:9.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sweep and wavefront schedules of the EnAPP area solves")
+    parser.add_argument('--systems', nargs='*', default=['avista_sys'])
+    parser.add_argument('--feeders', type=int, nargs='*', default=[100, 500], help="nodes of the generated feeders to add")
+    parser.add_argument('--schedules', nargs='*', default=['sweep', 'wavefront'], choices=['sweep', 'wavefront'])
+    parser.add_argument('--executor', default='serial', choices=list(EXECUTORS))
+    parser.add_argument('--solver', default='auto')
+    parser.add_argument('--max-iterations', type=int, default=50)
+    args = parser.parse_args()
+
+    set_solver(args.solver)
+    systems = args.systems + [benchmark_feeder(n_nodes) for n_nodes in args.feeders]
+    rows = [run(system_name, schedule, args.executor, args.max_iterations) for system_name in systems for schedule in args.schedules]
+    print_report(rows)
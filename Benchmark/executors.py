@@ -0,0 +1,68 @@
+"""
+This script compares the executors of the area solves (serial, thread, process, auto, see Distributed/executors.py)
+for ADMM and EnAPP on the same feeders. For every run it reports the executor in use, the iterations, the objective, the
+total wall time and the mean wall time of an iteration. The thread executor needs a thread-safe solver: with --solver
+auto the areas then solve with OSQP, also the LP areas of EnAPP. The generated feeders of --feeders are written to
+rawData/synth_build_<nodes> on first use.
+
+Usage:
+    python -m Benchmark.executors --systems avista_sys --feeders 100 500 --algorithms admm enapp --processes 4
+"""
+import argparse
+import os
+import time
+import numpy as np
+from Benchmark.generate_feeder import benchmark_feeder
+from Build_Model.Objective import cost_minimize
+from Build_Model.solvers import set_solver
+from Distributed.admm import solve_ADMM
+from Distributed.area_informatiion import get_area_info
+from Distributed.enapp import solve_EnAPP
+from Distributed.executors import EXECUTORS, cpu_count
+from Distributed.separate_areas import split_data_into_areas
+from Parser.cache import load_system_data
+
+## same arbitrary price profile as main.py
+PRICE = [0.1, 0.1, 0.1, 0.1, 0.1, 0.12, 0.15, 0.18, 0.2, 0.2, 0.22, 0.25, 0.25, 0.28, 0.33, 0.3, 0.25, 0.22, 0.15, 0.12, 0.12, 0.1, 0.1, 0.1]
+
+def run(system_name, algorithm, executor, processes=None, rho=5e-5, max_iterations=500, solver=None):
+    area_info = get_area_info(system_name)
+    data = load_system_data(os.path.join("rawData", system_name, "csvs"), PRICE, mode="array")
+    data_area = split_data_into_areas(data, area_info)
+    start = time.perf_counter()
+    if algorithm == 'admm':
+        vals, objective, _, _ = solve_ADMM(data, data_area, area_info, cost_minimize, rho=rho, max_iterations=max_iterations,
+                                           solver=solver, executor=executor, processes=processes)
+    else:
+        vals, objective, _ = solve_EnAPP(data, data_area, area_info, cost_minimize, max_iterations=max_iterations, solver=solver,
+                                         executor=executor, processes=processes)
+    wall = time.perf_counter() - start
+    return {'system': system_name, 'algorithm': algorithm, 'executor': executor, 'used': vals['executor'], 'areas': len(area_info),
+            'iterations': len(objective), 'objective': objective[max(objective)], 'wall_s': wall,
+            'iteration_s': float(np.mean(vals['iteration_stats']['wall_time']))}
+
+def print_report(rows):
+    print(f"{'system':>16} {'algorithm':>9} {'areas':>6} {'executor':>9} {'used':>8} {'iterations':>11} {'objective':>14} {'wall [s]':>9} {'iter [s]':>9}")
+    for row in rows:
+        print(f"{row['system']:>16} {row['algorithm']:>9} {row['areas']:6d} {row['executor']:>9} {row['used']:>8} {row['iterations']:11d} "
+              f"{row['objective']:14.4f} {row['wall_s']:9.2f} {row['iteration_s']:9.4f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serial, thread, process and auto executors of the area solves")
+    parser.add_argument('--systems', nargs='*', default=['avista_sys'])
+    parser.add_argument('--feeders', type=int, nargs='*', default=[100, 500], help="nodes of the generated feeders to add")
+    parser.add_argument('--algorithms', nargs='*', default=['admm', 'enapp'], choices=['admm', 'enapp'])
+    parser.add_argument('--executors', nargs='*', default=list(EXECUTORS), choices=list(EXECUTORS))
+    parser.add_argument('--processes', type=int, default=None, help="worker processes/threads (default: one per core)")
+    parser.add_argument('--solver', default='auto')
+    parser.add_argument('--rho', type=float, default=5e-5)
+    parser.add_argument('--max-iterations', type=int, default=500)
+    args = parser.parse_args()
+
+    set_solver(args.solver)
+    print(f"{cpu_count()} cores")
+    systems = args.systems + [benchmark_feeder(n_nodes) for n_nodes in args.feeders]
+    rows = [run(system_name, algorithm, executor, args.processes, args.rho, args.max_iterations)
+            for system_name in systems for algorithm in args.algorithms for executor in args.executors]
+    print_report(rows)
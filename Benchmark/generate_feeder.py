@@ -0,0 +1,223 @@
+"""
+This script generates synthetic radial feeders for the scaling benchmarks. It writes a complete rawData/<name>/csvs set
+(node_data, branch_data, loadshape, edo and battery profiles) in the same layout as rawData/avista_sys, together with a
+matching area partition in rawData/<name>/area_info.json that can be read with get_area_info(<name>).
+
+Usage:
+    python -m Benchmark.generate_feeder --name synth_1000 --nodes 1000 --branching 3 --batteries 20 --edos 40 --areas 8
+"""
+import argparse
+import json
+import os
+from collections import deque
+import numpy as np
+import pandas as pd
+
+RAW_DATA = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "rawData")
+
+## 24 hour load multipliers of rawData/avista_sys/csvs/loadshape.csv
+AVISTA_LOADSHAPE = [0.4444, 0.4444, 0.4444, 0.4444, 0.4444, 0.5555, 0.6666, 0.7222, 0.7777, 0.7777, 0.8333, 0.8888,
+                    0.8888, 0.9444, 1.0, 0.9555, 0.8888, 0.8333, 0.6666, 0.5555, 0.5555, 0.4444, 0.4444, 0.4444]
+
+###########################
+# 1) Feeder topology
+###########################
+def random_radial_tree(n_nodes, branching, rng):
+    """
+    Grows a radial tree rooted at node 1: every new node hangs below a random node that has less than 'branching'
+    children, so branching=1 gives a single lateral and larger values give bushier feeders.
+    Returns the parent of every node (parent[1] = 0).
+    """
+    parent = np.zeros(n_nodes + 1, dtype=int)
+    children = np.zeros(n_nodes + 1, dtype=int)
+    open_nodes = [1] ## nodes that can still take a child
+    for k in range(2, n_nodes + 1):
+        idx = rng.integers(len(open_nodes))
+        p = open_nodes[idx]
+        parent[k] = p
+        children[p] += 1
+        if children[p] == branching:
+            open_nodes[idx] = open_nodes[-1]
+            open_nodes.pop()
+        open_nodes.append(k)
+    return parent
+
+def partition_areas(parent, n_areas):
+    """
+    Cuts the tree into at most n_areas connected areas of roughly equal size. Nodes are visited leaves first and an
+    area is closed at a node as soon as the not yet assigned part of its subtree reaches the target size. The target
+    starts at N / n_areas and is lowered until n_areas areas are found (or every line is cut).
+    Returns the list of cut lines (fb, tb).
+    """
+    n_nodes = len(parent) - 1
+    target = n_nodes / n_areas
+    while True:
+        remaining = np.ones(n_nodes + 1, dtype=int)
+        remaining[0] = 0
+        cuts = []
+        for k in range(n_nodes, 1, -1): ## children always have larger ids than their parents
+            if remaining[k] >= target and len(cuts) < n_areas - 1:
+                cuts.append((int(parent[k]), k))
+            else:
+                remaining[parent[k]] += remaining[k]
+        if len(cuts) >= n_areas - 1 or target <= 1:
+            return cuts
+        target = max(1.0, 0.95 * target)
+
+def build_area_info(parent, cuts):
+    """
+    Numbers the areas breadth first from the substation (area1 holds node 1) and fills in the connection
+    information in the format of Distributed/area_informatiion.py. The dummy node of a tie-line is called
+    D<area>_<conn_area> inside <area>.
+    """
+    n_nodes = len(parent) - 1
+    cut_set = set(cuts)
+    children = [[] for _ in range(n_nodes + 1)]
+    for k in range(2, n_nodes + 1):
+        children[parent[k]].append(k)
+
+    area_of = np.zeros(n_nodes + 1, dtype=int)
+    area_of[1] = 1
+    n_found = 1
+    area_roots = {1: 1}
+    queue = deque([1])
+    while queue:
+        j = queue.popleft()
+        for k in children[j]:
+            if (j, k) in cut_set:
+                n_found += 1
+                area_of[k] = n_found
+                area_roots[n_found] = k
+            else:
+                area_of[k] = area_of[j]
+            queue.append(k)
+
+    area_info = {f"area{a}": {
+        'up_area': [],
+        'up_local_node_id': [1] if a == 1 else [],
+        'up_global_node_id': [1] if a == 1 else [],
+        'down_areas': [],
+        'down_local_node_id': [],
+        'down_global_node_id': []
+    } for a in range(1, n_found + 1)}
+
+    for a in range(2, n_found + 1):
+        tb = area_roots[a]
+        fb = int(parent[tb])
+        up, down = f"area{area_of[fb]}", f"area{a}"
+        area_info[down]['up_area'].append(up)
+        area_info[down]['up_local_node_id'].append(f"D{a}_{area_of[fb]}")
+        area_info[down]['up_global_node_id'].append(int(tb))
+        area_info[up]['down_areas'].append(down)
+        area_info[up]['down_local_node_id'].append(f"D{area_of[fb]}_{a}")
+        area_info[up]['down_global_node_id'].append(fb)
+
+    return area_info
+
+###########################
+# 2) Profiles
+###########################
+def daily_loadshape(T, steps_per_day, shape, rng):
+    hours = np.arange(T) * 24 / steps_per_day % 24
+    base = np.interp(hours, np.arange(25), AVISTA_LOADSHAPE + AVISTA_LOADSHAPE[:1])
+    if shape == 'avista':
+        return base
+    if shape == 'flat':
+        return np.full(T, max(AVISTA_LOADSHAPE))
+    if shape == 'random':
+        return np.clip(base * rng.normal(1, 0.05, T), 0, 1)
+    raise ValueError(f"Unknown load shape '{shape}', expected 'avista', 'flat' or 'random'")
+
+def window_profile(T, steps_per_day, start_hour, end_hour, peak, n_cols, rng):
+    """
+    (T x n_cols) power limits that are non zero between start_hour and end_hour of every day and scaled per column.
+    """
+    hours = np.arange(T) * 24 / steps_per_day % 24
+    active = ((hours >= start_hour) & (hours < end_hour)).astype(float)
+    scale = rng.uniform(0.1, 1.0, n_cols) * peak
+    return np.round(np.outer(active, scale)).astype(int)
+
+def node_loads(n_nodes, total_load_kw, load_dist, rng):
+    if load_dist == 'uniform':
+        p = np.ones(n_nodes)
+    elif load_dist == 'random':
+        p = rng.uniform(0.2, 1.8, n_nodes)
+    else:
+        raise ValueError(f"Unknown load distribution '{load_dist}', expected 'uniform' or 'random'")
+    p[0] = 0 ## the substation node carries no load
+    return np.round(p / p.sum() * total_load_kw, 3)
+
+###########################
+# 3) Main function
+###########################
+def generate_feeder(name, n_nodes, branching=3, n_batteries=1, n_edos=4, n_areas=4, T=24, steps_per_day=24,
+                    total_load_kw=5000, load_shape='avista', load_dist='random', seed=0):
+    """
+    Writes rawData/<name>/csvs and rawData/<name>/area_info.json and returns the area_info dictionary.
+    total_load_kw is the sum of the nominal node loads, keep its peak below the 8000 kW substation limit.
+    """
+    if n_batteries + n_edos > n_nodes - 1:
+        raise ValueError("Not enough non-substation nodes for the requested batteries and edos")
+    rng = np.random.default_rng(seed)
+    csv_path = os.path.join(RAW_DATA, name, "csvs")
+    os.makedirs(csv_path, exist_ok=True)
+
+    parent = random_radial_tree(n_nodes, branching, rng)
+    nodes = np.arange(1, n_nodes + 1)
+    pd.DataFrame({'Nodes': nodes, 'P': node_loads(n_nodes, total_load_kw, load_dist, rng)}).to_csv(os.path.join(csv_path, "node_data.csv"), index=False)
+    pd.DataFrame({'fb': parent[2:], 'tb': nodes[1:]}).to_csv(os.path.join(csv_path, "branch_data.csv"), index=False)
+
+    time = np.arange(1, T + 1)
+    loadshape = daily_loadshape(T, steps_per_day, load_shape, rng)
+    pd.DataFrame({'time': time, 'M': np.round(loadshape, 4)}).to_csv(os.path.join(csv_path, "loadshape.csv"), index=False)
+
+    ## battery and edo nodes are distinct non-substation nodes
+    chosen = rng.choice(nodes[1:], size=n_batteries + n_edos, replace=False)
+    bat_nodes = np.sort(chosen[:n_batteries])
+    edo_nodes = np.sort(chosen[n_batteries:])
+
+    def write_profile(file, values, cols):
+        df = pd.DataFrame(values, columns=[str(c) for c in cols])
+        df.insert(0, 't', time)
+        df.to_csv(os.path.join(csv_path, file), index=False)
+
+    ## same daily windows as the avista profiles: edo charging in the morning, discharging in the afternoon
+    write_profile("edo_kw_ch_profiles.csv", window_profile(T, steps_per_day, 6, 8, 400, n_edos, rng), edo_nodes)
+    write_profile("edo_kw_dis_profiles.csv", window_profile(T, steps_per_day, 13, 16, 250, n_edos, rng), edo_nodes)
+    write_profile("bat_kw_ch_profiles.csv", window_profile(T, steps_per_day, 0, 3, 500, n_batteries, rng), bat_nodes)
+    write_profile("bat_kw_dis_profiles.csv", window_profile(T, steps_per_day, 13, 16, 500, n_batteries, rng), bat_nodes)
+
+    area_info = build_area_info(parent, partition_areas(parent, n_areas))
+    with open(os.path.join(RAW_DATA, name, "area_info.json"), 'w') as f:
+        json.dump(area_info, f, indent=1)
+
+    return area_info
+
+## rawData/synth_build_<n_nodes>, the generated feeder of the benchmarks (as in Benchmark/build_time.py), written on first
+## use. Returns its system name.
+def benchmark_feeder(n_nodes, T=24, seed=0):
+    name = f"synth_build_{n_nodes}"
+    if not os.path.exists(os.path.join(RAW_DATA, name, "area_info.json")):
+        generate_feeder(name, n_nodes, n_batteries=max(1, n_nodes // 50), n_edos=max(1, n_nodes // 25), T=T, seed=seed)
+    return name
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic radial feeder under rawData/<name>")
+    parser.add_argument('--name', required=True)
+    parser.add_argument('--nodes', type=int, required=True)
+    parser.add_argument('--branching', type=int, default=3)
+    parser.add_argument('--batteries', type=int, default=1)
+    parser.add_argument('--edos', type=int, default=4)
+    parser.add_argument('--areas', type=int, default=4)
+    parser.add_argument('--T', type=int, default=24)
+    parser.add_argument('--steps-per-day', type=int, default=24)
+    parser.add_argument('--total-load', type=float, default=5000)
+    parser.add_argument('--load-shape', default='avista', choices=['avista', 'flat', 'random'])
+    parser.add_argument('--load-dist', default='random', choices=['uniform', 'random'])
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    info = generate_feeder(args.name, args.nodes, args.branching, args.batteries, args.edos, args.areas, args.T,
+                           args.steps_per_day, args.total_load, args.load_shape, args.load_dist, args.seed)
+    print(f"Generated rawData/{args.name} with {args.nodes} nodes and {len(info)} areas")
@@ -0,0 +1,65 @@
+"""
+This script compares the distributed algorithms with and without warm starts of the area solves. For every outer
+iteration it reports the solver iterations and the wall time summed over the areas, once with every area solved from a
+cold start and once started from its previous solution (and basis, for HiGHS based solvers).
+
+Usage:
+    python -m Benchmark.warm_start --system avista_sys --algorithm enapp --solver appsi_highs
+"""
+import argparse
+import os
+import numpy as np
+from Build_Model.Objective import cost_minimize
+from Build_Model.solvers import set_solver
+from Distributed.admm import solve_ADMM
+from Distributed.area_informatiion import get_area_info
+from Distributed.enapp import solve_EnAPP
+from Distributed.separate_areas import split_data_into_areas
+from Parser.cache import load_system_data
+
+## same arbitrary price profile as main.py
+PRICE = [0.1, 0.1, 0.1, 0.1, 0.1, 0.12, 0.15, 0.18, 0.2, 0.2, 0.22, 0.25, 0.25, 0.28, 0.33, 0.3, 0.25, 0.22, 0.15, 0.12, 0.12, 0.1, 0.1, 0.1]
+
+def run(system_name, algorithm, warmstart, solver, rho=5e-5, max_iterations=500):
+    area_info = get_area_info(system_name)
+    data = load_system_data(os.path.join("rawData", system_name, "csvs"), PRICE, mode="array")
+    data_area = split_data_into_areas(data, area_info)
+    if algorithm == 'admm':
+        vals, objective, _, _ = solve_ADMM(data, data_area, area_info, cost_minimize, rho=rho, max_iterations=max_iterations, solver=solver, warmstart=warmstart)
+    else:
+        vals, objective, _ = solve_EnAPP(data, data_area, area_info, cost_minimize, max_iterations=max_iterations, solver=solver, warmstart=warmstart)
+    return vals['iteration_stats'], objective[max(objective)]
+
+def _cell(stats, key, i, fmt):
+    val = stats[key][i] if i < len(stats[key]) else None
+    return '-' if val is None else format(val, fmt)
+
+def print_report(cold, warm):
+    print(f"{'iter':>5} {'cold iters':>11} {'warm iters':>11} {'cold solve [s]':>15} {'warm solve [s]':>15} {'cold wall [s]':>14} {'warm wall [s]':>14}")
+    for i in range(max(len(cold['wall_time']), len(warm['wall_time']))):
+        print(f"{i:5d} {_cell(cold, 'solver_iterations', i, 'd'):>11} {_cell(warm, 'solver_iterations', i, 'd'):>11} "
+              f"{_cell(cold, 'solve_time', i, '.3f'):>15} {_cell(warm, 'solve_time', i, '.3f'):>15} "
+              f"{_cell(cold, 'wall_time', i, '.3f'):>14} {_cell(warm, 'wall_time', i, '.3f'):>14}")
+    for key in ('solver_iterations', 'solve_time', 'wall_time'):
+        if None in cold[key] + warm[key]:
+            continue
+        n = min(len(cold[key]), len(warm[key])) - 1 ## the first iteration is a cold start in both runs
+        if n > 0:
+            reduction = 1 - np.sum(warm[key][1:n + 1]) / np.sum(cold[key][1:n + 1])
+            print(f"{key} of iterations 1..{n}: {100 * reduction:.1f}% lower with warm starts")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cold vs warm started area solves of ADMM / EnAPP")
+    parser.add_argument('--system', default='avista_sys')
+    parser.add_argument('--algorithm', default='enapp', choices=['admm', 'enapp'])
+    parser.add_argument('--solver', default='auto')
+    parser.add_argument('--rho', type=float, default=5e-5)
+    parser.add_argument('--max-iterations', type=int, default=500)
+    args = parser.parse_args()
+
+    set_solver(args.solver)
+    cold, cold_obj = run(args.system, args.algorithm, False, args.solver, args.rho, args.max_iterations)
+    warm, warm_obj = run(args.system, args.algorithm, True, args.solver, args.rho, args.max_iterations)
+    print(f"objective cold {cold_obj}, warm {warm_obj}")
+    print_report(cold, warm)
@@ -1,8 +1,20 @@
 import math
-
-from pyomo.environ import ConcreteModel, Var, Constraint, Reals, NonNegativeReals, Binary, inequality
-
-def build_pyomo_model(data):
+import threading
+
+from pyomo.environ import ConcreteModel, Var, Param, Constraint, Reals, NonNegativeReals, Binary, inequality
+from Profiling.stages import timed
+
+## Held while a Pyomo model is built or read into a solver. Building models is not thread-safe in Pyomo, so the thread
+## executor of the distributed algorithms builds the area models one at a time and only overlaps their solves.
+MODEL_LOCK = threading.RLock()
+
+## mutable_load_nodes: nodes (e.g. the dummy nodes of an area) whose loads are held as mutable parameters in model.p_L_mutable,
+## so that they can be updated in place between solves without rebuilding the model
+## mutable_cost: holds the energy price model.cost as a mutable parameter instead of a constant dictionary
+## mutable_edo_limits, mutable_initial_soc: hold the edo power limits (model.edo_ch_max, model.edo_dis_max) and the initial
+## battery soc (model.b_init) as mutable parameters, used by the rolling horizon mode
+@timed('build_pyomo_model')
+def build_pyomo_model(data, mutable_load_nodes=(), mutable_cost=False, mutable_edo_limits=False, mutable_initial_soc=False):
     model = ConcreteModel()
 
     # Define sets for different components of the network
@@ -16,7 +28,29 @@ def build_pyomo_model(data):
     model.n_d = data['n_d']  # Discharging efficiency of batteries
 
     substation_limit = 8000
-    model.cost = data['costshape']
+    model.cost = Param(model.Tset, mutable=True, initialize=dict(data['costshape'])) if mutable_cost else data['costshape']
+
+    model.edo_ch_max = Param(model.Tset, model.Eset, mutable=True, initialize=dict(data['edo_ch'])) if mutable_edo_limits else data['edo_ch']
+    model.edo_dis_max = Param(model.Tset, model.Eset, mutable=True, initialize=dict(data['edo_dis'])) if mutable_edo_limits else data['edo_dis']
+    model.b_init = Param(model.Bset, mutable=True, initialize=data['b0']) if mutable_initial_soc else {j: data['b0'] for j in model.Bset}
+
+    model.mutable_load_nodes = list(mutable_load_nodes)
+    model.p_L_mutable = Param(model.Tset, model.mutable_load_nodes, mutable=True,
+                              initialize={(t, j): data['p_L'][t, j] for t in model.Tset for j in model.mutable_load_nodes})
+
+    ## Incoming/outgoing lines of every node and set membership lookups, computed once so that each power balance
+    ## row only touches the lines of its own node instead of scanning all of Lset
+    incoming_lines = {j: [] for j in model.Nset}
+    outgoing_lines = {j: [] for j in model.Nset}
+    for (i, j) in model.Lset:
+        outgoing_lines.setdefault(i, []).append((i, j))
+        incoming_lines.setdefault(j, []).append((i, j))
+    substation_nodes = set(model.substationBus)
+    bat_nodes = set(model.Bset)
+    edo_nodes = set(model.Eset)
+    mutable_nodes = set(model.mutable_load_nodes)
+    t_first = min(model.Tset)
+    t_last = max(model.Tset)
 
     ## Continuous Variables
     model.P_subs = Var(model.Tset, domain=NonNegativeReals) ## Substation Power flow variables
@@ -29,6 +63,12 @@ def build_pyomo_model(data):
     ## Binary Variables
     # model.zeta = Var(model.Tset, model.Bset, domain=Binary)
 
+    ## Plain dict lookups of the variable data. Indexing model.P[t, (i, j)] re-validates the nested index against the
+    ## product set on every access, which dominated the power balance construction
+    P = {(t, (i, j)): var for (t, i, j), var in model.P.items()}
+    P_c, P_d = dict(model.P_c.items()), dict(model.P_d.items())
+    Pe_c, Pe_d = dict(model.Pe_c.items()), dict(model.Pe_d.items())
+
     ## Constraint: Substation power limit
     # Equation: P_subs(t) ≤ 8000, ∀ t ∈ T
     def substation_power_limit_rule(model, t):
@@ -43,18 +83,16 @@ def build_pyomo_model(data):
     # Otherwise:
     #     ∑(P_incoming) - ∑(P_outgoing) - Load - Battery and Edo charging + Battery and Edo discharging = 0
     def real_power_balance_rule(model, t, j):
-        substationBus = data['substationBus']
         p_L = data['p_L']
-        incoming_pij = (0 if j in substationBus else sum(model.P[t, (i, j)] for (i, jj) in model.Lset if jj == j)
-)
-        outgoing_pij = sum(model.P[t, (j, k)] for (jj, k) in model.Lset if jj == j)
-        bat_charge = model.P_c[t, j] if j in model.Bset else 0
-        bat_discharge = model.P_d[t, j] if j in model.Bset else 0
-        edo_charge = model.Pe_c[t, j] if j in model.Eset else 0
-        edo_discharge = model.Pe_d[t, j] if j in model.Eset else 0
-        load = p_L[(t,j)]
-
-        if j in substationBus:
+        incoming_pij = 0 if j in substation_nodes else sum(P[t, line] for line in incoming_lines[j])
+        outgoing_pij = sum(P[t, line] for line in outgoing_lines[j])
+        bat_charge = P_c[t, j] if j in bat_nodes else 0
+        bat_discharge = P_d[t, j] if j in bat_nodes else 0
+        edo_charge = Pe_c[t, j] if j in edo_nodes else 0
+        edo_discharge = Pe_d[t, j] if j in edo_nodes else 0
+        load = model.p_L_mutable[t, j] if j in mutable_nodes else p_L[(t,j)]
+
+        if j in substation_nodes:
             return model.P_subs[t] - outgoing_pij - load - bat_charge + bat_discharge - edo_charge + edo_discharge == 0
         else:
             return incoming_pij - outgoing_pij - load - bat_charge + bat_discharge - edo_charge+ edo_discharge == 0
@@ -65,7 +103,7 @@ def build_pyomo_model(data):
     # Equation: Pe_c(t, j) ≤ edo_ch_max(t, j), ∀ t ∈ T, j ∈ E
     def edo_charging_power_rule(model, t, j):
 
-        Pmax = data['edo_ch'][t,j]
+        Pmax = model.edo_ch_max[t,j]
         return model.Pe_c[t, j] <=  Pmax
 
     model.edo_charging_power_constraint = Constraint(model.Tset, model.Eset, rule = edo_charging_power_rule)
@@ -73,7 +111,7 @@ def build_pyomo_model(data):
     ## Constraint: Edo nodes discharging power
     # Equation: Pe_d(t, j) ≤ edo_dis_max(t, j), ∀ t ∈ T, j ∈ E
     def edo_discharging_power_rule(model, t, j):
-        Pmax = data['edo_dis'][t, j]
+        Pmax = model.edo_dis_max[t, j]
         return model.Pe_d[t, j] <= Pmax
 
     model.edo_discharging_power_constraint = Constraint(model.Tset, model.Eset, rule=edo_discharging_power_rule)
@@ -109,8 +147,8 @@ def build_pyomo_model(data):
         n_c = data['n_c']
         n_d = data['n_d']
         delta_t = data['delta_t']
-        if t == min(data['Tset']):
-            return model.B[t, j] == b0 + (n_c * model.P_c[t, j] - (model.P_d[t, j] / n_d)) * delta_t
+        if t == t_first:
+            return model.B[t, j] == model.b_init[j] + (n_c * model.P_c[t, j] - (model.P_d[t, j] / n_d)) * delta_t
         else:
             return model.B[t, j] == model.B[t - 1, j] + (n_c * model.P_c[t, j] - (model.P_d[t, j] / n_d)) * delta_t
 
@@ -120,7 +158,7 @@ def build_pyomo_model(data):
     # Equation: B(t_max, j) = B(0, j), ∀ j ∈ B
     def final_soc_rule(model, t, j):
         b0 = data['b0']
-        if t == max(data['Tset']):
+        if t == t_last:
             return model.B[t, j] == b0
         else:
             return Constraint.Skip
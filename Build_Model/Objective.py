@@ -1,11 +1,16 @@
+import time
 from pyomo.environ import Objective, minimize, maximize, value, SolverFactory,SolverStatus,TerminationCondition
+from Build_Model.compiled_objective import objective_expression
+from Build_Model.Constraints import MODEL_LOCK
+from Build_Model.solvers import get_solver, solver_options, solver_iterations, set_basis, has_basis, clear_solver_state
+from Profiling.stages import stage
 
 ## Objective function to minimize the total substation power for all time periods
 def substation_power_minimize(model):
     sub_power = sum(model.P_subs[t] for t in model.Tset) ## Total substation power for all time periods
     scd_term = sum((1 - model.n_c) * model.P_c[t, j] + ((1 / model.n_d) - 1) * model.P_d[t, j] for t in model.Tset for j in model.Bset) ## terms to get rid of simultaneous charging and discharging of battery
     alpha = 1e-3
-    return sum(sub_power + alpha * scd_term)
+    return sub_power + alpha * scd_term
 
 ## Objective function to minimize the total substation power for all time periods with associated discharging costs of edo and battery nodes
 def substation_power_minimize_with_discharge_cost(model):
@@ -43,20 +48,45 @@ def cost_minimize(model, **kwargs):
 
     return (subs_cost + alpha * scd_term)
 
-## Solves the optimization model with the specified solver and logs the Solver status and termination condition
-def pyomo_solve(model, obj_func, **kwargs):
+## Solves the optimization model with the specified solver and logs the Solver status and termination condition.
+## The objective is created on the first solve of a model (compiled from coefficient arrays for the objectives above) and
+## reused by later solves with the same obj_func, update its mutable Params to change it.
+## solver is a name registered in Build_Model/solvers.py (default: the solver of the run, see set_solver). Persistent
+## solvers keep the model loaded between calls, so later solves only push the changed parameters.
+## warmstart=True passes the current variable values as the starting point to solvers that accept one (unless the solver
+## already holds a basis), warmstart=False clears the basis a persistent solver keeps from its previous solve (by default
+## it is left as is). basis is a solver basis from get_basis, possibly of another process, loaded first where supported.
+## The solver iterations and time of the solve are kept in model.solver_iterations and model.solve_time, model.solved
+## tells whether it ended optimal. Only an optimal solution is loaded into the model.
+def pyomo_solve(model, obj_func, warmstart=None, solver=None, basis=None, **kwargs):
     # Store kwargs as attributes on the model
     for key, value in kwargs.items():
         setattr(model, key, value)
 
-    model.obj = Objective(rule=obj_func, sense=minimize) ## Minimizing the objective function
-    # opt = SolverFactory('gurobi')
-    ## You may need to give the complete path of your solver in executables
-    opt = SolverFactory('osqp', executable=r"C:\Program Files\SCIPOptSuite 9.2.0\bin\scip.exe") ## using open-source solver
-    results = opt.solve(model, tee=False)
-    if results.solver.status == "ok" and results.solver.termination_condition == "optimal":
+    if model.component('obj') is None or getattr(model, 'obj_func_built', None) is not obj_func:
+        if model.component('obj') is not None:
+            model.del_component('obj') ## the model is solved with another objective function now
+        with stage('objective'), MODEL_LOCK:
+            model.obj = Objective(expr=objective_expression(obj_func, model), sense=minimize) ## Minimizing the objective function
+        model.obj_func_built = obj_func
+    name, opt = get_solver(model, solver)
+    solve_options = {'options': solver_options()} if solver_options() else {}
+    if warmstart is False:
+        clear_solver_state(opt)
+    elif basis is not None:
+        set_basis(opt, model, basis)
+    if warmstart and opt.warm_start_capable() and not has_basis(opt):
+        solve_options['warmstart'] = True ## a basis is the better simplex start, HiGHS drops it when given primal values
+    start = time.perf_counter()
+    with stage('solve'):
+        results = opt.solve(model, tee=False, load_solutions=False, **solve_options)
+    model.solve_time = time.perf_counter() - start
+    model.solver_iterations = solver_iterations(opt)
+    model.solved = results.solver.status == "ok" and results.solver.termination_condition == "optimal"
+    if model.solved:
+        model.solutions.load_from(results) ## a failed solve keeps the values of the last successful one, see model.solved
         print("Solver completed successfully.")
     else:
         print(f"Solver failed: {results.solver.termination_condition}")
 
-    return model
\ No newline at end of file
+    return model
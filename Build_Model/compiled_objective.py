@@ -0,0 +1,205 @@
+"""
+This script compiles the objective functions of Objective.py once into coefficient arrays instead of rebuilding Python
+sum(...) expressions over Tset x Bset x Eset on every solve. Every variable block v (P_subs, P, Pe_c, ...) gets a
+(T x n_v) array of linear coefficients
+
+    c_v[t] = fixed_v[t] + priced_v[t] * cost[t]
+
+so the energy price stays a separate input. fixed_v and priced_v are read off the objective function itself, evaluated
+once on a small probe model (PROBE_SIZE periods and elements per set) for a few price vectors, so every edit of the
+functions in Objective.py carries over. Objectives that are not linear, that weight a variable by the price of another
+period or that treat the periods or elements of a set differently have no compiled form and are built by the function.
+As the probe numbers its periods and elements 1, 2, ..., the coefficients are checked once more on the first, middle
+and last period and element of the real sets, which catches objectives special-casing particular node ids or periods.
+The same arrays give the cost vector of MatrixLP and a Pyomo LinearExpression, whose priced coefficients refer to
+model.cost and follow it when it is a mutable parameter. The ADMM penalty of a tie-line flow x is compiled into the
+diagonal quadratic form rho/2 x^2 + (dual - rho*shared) x + const.
+"""
+from collections.abc import Mapping
+import numpy as np
+from pyomo.environ import ConcreteModel, RangeSet, Set, Param, Var
+from pyomo.core.expr.numeric_expr import LinearExpression
+from pyomo.repn import generate_standard_repn
+
+BLOCKS = ('P_subs', 'P', 'Pe_c', 'Pe_d', 'P_c', 'P_d', 'B')
+BLOCK_SETS = {'P': 'Lset', 'Pe_c': 'Eset', 'Pe_d': 'Eset', 'P_c': 'Bset', 'P_d': 'Bset', 'B': 'Bset'}
+PROBE_SIZE = 2
+PROBE_COSTS = ((0.0, 0.0), (1.0, 2.0), (3.0, -1.0)) ## price vectors of the probe: the fixed part, the priced part, a check
+CHECK_COST = (1.5, -2.0, 4.0) ## prices of the first, middle and last period in the check on the sets of the real model
+_coefficients = {} ## (obj_func, n_c, n_d) -> {v: (fixed_v, priced_v)} or None without a compiled form
+_checked = {} ## (obj_func, n_c, n_d, sampled sets) -> whether the coefficients hold on the sampled periods and elements
+
+## Probe model over the given sets {set name: elements}, by default PROBE_SIZE elements 1, 2, ... per set
+def _probe_model(n_c, n_d, sets=None):
+    probe = ConcreteModel()
+    for name in ('Tset', 'Lset', 'Eset', 'Bset'):
+        setattr(probe, name, RangeSet(PROBE_SIZE) if sets is None else Set(initialize=sets[name], ordered=True))
+    probe.n_c, probe.n_d = n_c, n_d
+    probe.cost = Param(probe.Tset, mutable=True, initialize=0.0)
+    probe.P_subs = Var(probe.Tset)
+    for v, set_name in BLOCK_SETS.items():
+        setattr(probe, v, Var(probe.Tset, getattr(probe, set_name)))
+    return probe
+
+## Linear coefficients of every probe variable at each of the price vectors costs, None if the objective is not linear.
+## An objective reading a component or an index the probe does not have raises AttributeError or KeyError.
+def _probe_coefficients(obj_func, probe, costs):
+    expr = obj_func(probe)
+    coefficients = []
+    for cost in costs:
+        for t, c in zip(probe.Tset, cost):
+            probe.cost[t] = c
+        if isinstance(expr, (int, float)):
+            coefficients.append({})
+            continue
+        repn = generate_standard_repn(expr, compute_values=True)
+        if not repn.is_linear() or repn.constant != 0:
+            return None
+        coefs = {}
+        for var, coef in zip(repn.linear_vars, repn.linear_coefs):
+            coefs[id(var)] = coefs.get(id(var), 0.0) + coef
+        coefficients.append(coefs)
+    return coefficients
+
+## (fixed, priced) of block v if its probe coefficients are fixed + priced * cost[t] with the same fixed and priced for
+## every period and element, None otherwise
+def _block_coefficients(probe, v, coefficients, costs):
+    var = getattr(probe, v)
+    values = np.array([[coefs.get(id(var[index]), 0.0) for index in var] for coefs in coefficients])
+    times = {t: k for k, t in enumerate(probe.Tset)}
+    cost = np.array([[cost[times[index if v == 'P_subs' else index[0]]] for index in var] for cost in costs])
+    fixed, priced = values[0], (values[1] - values[0]) / cost[1]
+    if not (np.allclose(fixed, fixed[0]) and np.allclose(priced, priced[0]) and np.allclose(values, fixed + priced * cost)):
+        return None
+    return float(fixed[0]), float(priced[0])
+
+## First, middle and last element of every set of the model or data dictionary source
+def _sampled_sets(source):
+    get = source.__getitem__ if isinstance(source, Mapping) else lambda key: getattr(source, key)
+    sets = {}
+    for name in ('Tset', 'Lset', 'Eset', 'Bset'):
+        elements = list(get(name))
+        sets[name] = tuple(elements[k] for k in sorted({0, len(elements) // 2, len(elements) - 1})) if elements else ()
+    return sets
+
+## Whether the compiled coefficients blocks reproduce the objective on the sampled periods and elements of the real sets,
+## which catches objectives that treat particular node ids or periods differently
+def _matches_sample(obj_func, blocks, n_c, n_d, sets):
+    probe = _probe_model(n_c, n_d, sets)
+    cost = CHECK_COST[:len(sets['Tset'])]
+    try:
+        coefficients = _probe_coefficients(obj_func, probe, [cost])
+    except (AttributeError, KeyError):
+        return False
+    if coefficients is None:
+        return False
+    times = {t: k for k, t in enumerate(probe.Tset)}
+    for v in BLOCKS:
+        var = getattr(probe, v)
+        fixed, priced = blocks[v]
+        for index in var:
+            expected = fixed + priced * cost[times[index if v == 'P_subs' else index[0]]]
+            if not np.isclose(coefficients[0].get(id(var[index]), 0.0), expected):
+                return False
+    return True
+
+def compiled_coefficients(obj_func, n_c, n_d, sets=None):
+    """
+    {v: (fixed_v, priced_v)} of every variable block of obj_func, the same for all periods and elements of the block,
+    or None if obj_func has no compiled form (see the module docstring). With the sets of the real model (see
+    _sampled_sets) the coefficients are also checked on its first, middle and last periods and elements.
+    """
+    key = (obj_func, n_c, n_d)
+    if key not in _coefficients:
+        probe = _probe_model(n_c, n_d)
+        try:
+            coefficients = _probe_coefficients(obj_func, probe, PROBE_COSTS)
+        except (AttributeError, KeyError): ## e.g. an objective reading a component the probe does not have
+            coefficients = None
+        blocks = None
+        if coefficients is not None:
+            blocks = {v: _block_coefficients(probe, v, coefficients, PROBE_COSTS) for v in BLOCKS}
+            if any(block is None for block in blocks.values()):
+                blocks = None
+        _coefficients[key] = blocks
+    blocks = _coefficients[key]
+    if blocks is None or sets is None:
+        return blocks
+    check_key = key + (tuple(sets.items()),)
+    if check_key not in _checked:
+        _checked[check_key] = _matches_sample(obj_func, blocks, n_c, n_d, sets)
+    return blocks if _checked[check_key] else None
+
+def _efficiencies(source):
+    get = source.__getitem__ if isinstance(source, Mapping) else lambda key: getattr(source, key)
+    return get('n_c'), get('n_d')
+
+def is_compiled(obj_func, source):
+    return compiled_coefficients(obj_func, *_efficiencies(source), _sampled_sets(source)) is not None
+
+class CompiledObjective:
+    """
+    Linear coefficient arrays of one objective function for the sets of a data dictionary or a Pyomo model.
+    """
+    def __init__(self, obj_func, source):
+        coefficients = compiled_coefficients(obj_func, *_efficiencies(source), _sampled_sets(source))
+        if coefficients is None:
+            raise ValueError(f"No compiled form of objective '{obj_func.__name__}'")
+        get = source.__getitem__ if isinstance(source, Mapping) else lambda key: getattr(source, key)
+        self.obj_func = obj_func
+        self.Tset = list(get('Tset'))
+        T, L, E, B = len(self.Tset), len(get('Lset')), len(get('Eset')), len(get('Bset'))
+        self.cols = {'P_subs': 1, 'P': L, 'Pe_c': E, 'Pe_d': E, 'P_c': B, 'P_d': B, 'B': B}
+        self.fixed = {v: np.zeros((T, n)) for v, n in self.cols.items()}
+        self.priced = {v: np.zeros((T, n)) for v, n in self.cols.items()}
+        for v, (fixed, priced) in coefficients.items():
+            self.fixed[v][:] = fixed
+            self.priced[v][:] = priced
+
+    ## (T x n_v) coefficients of block v for the price array cost (T,)
+    def linear(self, v, cost):
+        return self.fixed[v] + self.priced[v] * np.asarray(cost, dtype=float)[:, None]
+
+    ## Coefficients of all blocks stacked time major in the given block order, the cost vector of MatrixLP
+    def vector(self, cost, order=BLOCKS):
+        return np.concatenate([self.linear(v, cost).ravel() for v in order])
+
+    def expression(self, model):
+        """
+        LinearExpression of the objective over the variables of model. The priced coefficients are priced * cost[t]
+        expressions of model.cost, so updating a mutable cost parameter updates the objective without rebuilding it.
+        """
+        cost = model.cost
+        coefs, variables = [], []
+        for v in BLOCKS:
+            fixed, priced = self.fixed[v].ravel(), self.priced[v].ravel()
+            nonzero = np.flatnonzero((fixed != 0) | (priced != 0))
+            if not len(nonzero):
+                continue ## e.g. the line flows, which are in none of the objectives
+            var = list(getattr(model, v).values())
+            times = np.repeat(self.Tset, self.cols[v])
+            for k in nonzero.tolist():
+                a, w = float(fixed[k]), float(priced[k])
+                if w:
+                    coefs.append(a + w * cost[times[k]] if a else w * cost[times[k]])
+                else:
+                    coefs.append(a)
+                variables.append(var[k])
+        return LinearExpression(constant=0, linear_coefs=coefs, linear_vars=variables)
+
+## Objective expression of obj_func for model, compiled where possible and built by the function itself otherwise
+def objective_expression(obj_func, model):
+    if is_compiled(obj_func, model):
+        return CompiledObjective(obj_func, model).expression(model)
+    return obj_func(model)
+
+def admm_penalty(shared, dual, rho):
+    """
+    dual*(x - shared) + rho/2*(x - shared)^2 of tie-line flows x with consensus values shared and duals dual (arrays of
+    the same shape) as the diagonal quadratic form q/2 x^2 + c x + const. Returns (c, q, const).
+    """
+    shared, dual = np.asarray(shared, dtype=float), np.asarray(dual, dtype=float)
+    c = dual - rho * shared
+    q = np.full(shared.shape, float(rho))
+    const = float(np.sum(rho / 2 * shared ** 2 - dual * shared))
+    return c, q, const
@@ -0,0 +1,132 @@
+"""
+This script builds the same LP as build_pyomo_model + Objective.py directly as sparse matrices and solves it in process
+with scipy's HiGHS interface, bypassing Pyomo expression trees and the solver file exchange.
+
+Variables are stacked time major in the order P_subs (T), P (T x L), Pe_c, Pe_d (T x E), P_c, P_d, B (T x B):
+    min  c'x
+    s.t. A_eq x = b_eq   (real power balance, battery SOC evolution and final SOC)
+         lb <= x <= ub   (substation limit, edo and battery power limits, SOC bounds)
+"""
+import numpy as np
+import scipy.sparse as sp
+from scipy.optimize import linprog
+from Build_Model.compiled_objective import CompiledObjective
+from Build_Model.results import Results, VAR_SETS
+from Parser.system_data import SystemData
+
+VAR_ORDER = ('P_subs', 'P', 'Pe_c', 'Pe_d', 'P_c', 'P_d', 'B')
+SUBSTATION_LIMIT = 8000 ## same limit as substation_power_limit_rule
+
+## (T x n) array of a profile for the given columns, read straight from SystemData or from a tuple-keyed dict
+def profile_values(data, name, nodes):
+    if isinstance(data, SystemData) and list(nodes) == list(data.sets[data.profile_sets[name]]):
+        return np.asarray(data.profiles[name], dtype=float)
+    profile = data[name]
+    return np.array([[profile[t, i] for i in nodes] for t in data['Tset']], dtype=float).reshape(len(data['Tset']), len(nodes))
+
+def series_values(data, name):
+    return np.array([data[name][t] for t in data['Tset']], dtype=float)
+
+class MatrixLP:
+    """
+    Sparse LP of one (area) system with the index maps needed to turn the solution vector back into results.
+    """
+    def __init__(self, data):
+        self.data = data
+        self.compiled = {} ## obj_func -> CompiledObjective
+        self.Tset = list(data['Tset'])
+        self.Nset = list(data['Nset'])
+        self.Lset = list(data['Lset'])
+        self.Eset = list(data['Eset'])
+        self.Bset = list(data['Bset'])
+        T, N, L, E, B = len(self.Tset), len(self.Nset), len(self.Lset), len(self.Eset), len(self.Bset)
+        self.sizes = {'P_subs': T, 'P': T * L, 'Pe_c': T * E, 'Pe_d': T * E, 'P_c': T * B, 'P_d': T * B, 'B': T * B}
+        offsets = np.cumsum([0] + [self.sizes[v] for v in VAR_ORDER])
+        self.offset = dict(zip(VAR_ORDER, offsets[:-1]))
+        self.n = int(offsets[-1])
+
+        node_idx = {j: k for k, j in enumerate(self.Nset)}
+        I_T = sp.identity(T, format='csr')
+
+        ## bus-line incidence: +1 at the receiving node, -1 at the sending node of every line
+        fb = np.array([node_idx[i] for (i, j) in self.Lset], dtype=int)
+        tb = np.array([node_idx[j] for (i, j) in self.Lset], dtype=int)
+        incidence = sp.csr_matrix((np.r_[np.ones(L), -np.ones(L)], (np.r_[tb, fb], np.r_[np.arange(L), np.arange(L)])), shape=(N, L))
+        substation = sp.csr_matrix((np.ones(len(data['substationBus'])), ([node_idx[j] for j in data['substationBus']], np.zeros(len(data['substationBus']), dtype=int))), shape=(N, 1))
+        select_E = sp.csr_matrix((np.ones(E), ([node_idx[j] for j in self.Eset], np.arange(E))), shape=(N, E))
+        select_B = sp.csr_matrix((np.ones(B), ([node_idx[j] for j in self.Bset], np.arange(B))), shape=(N, B))
+
+        ## real power balance (T*N rows): P_subs + sum(P_in) - sum(P_out) - P_c + P_d - Pe_c + Pe_d = p_L
+        balance = sp.hstack([sp.kron(I_T, substation), sp.kron(I_T, incidence), -sp.kron(I_T, select_E), sp.kron(I_T, select_E),
+                             -sp.kron(I_T, select_B), sp.kron(I_T, select_B), sp.csr_matrix((T * N, T * B))])
+        p_L = profile_values(data, 'p_L', self.Nset)
+
+        ## battery SOC evolution (T*B rows): B(t) - B(t-1) - n_c*dt*P_c(t) + dt/n_d*P_d(t) = b0 if t is the first period else 0
+        dt, n_c, n_d, b0 = data['delta_t'], data['n_c'], data['n_d'], data['b0']
+        I_B = sp.identity(B, format='csr')
+        difference = sp.identity(T, format='csr') - sp.eye(T, k=-1, format='csr')
+        soc = sp.hstack([sp.csr_matrix((T * B, T + T * L + 2 * T * E)), -n_c * dt * sp.kron(I_T, I_B), dt / n_d * sp.kron(I_T, I_B), sp.kron(difference, I_B)])
+        soc_rhs = np.zeros(T * B)
+        soc_rhs[:B] = b0
+
+        ## final SOC (B rows): B(T) = b0
+        final = sp.hstack([sp.csr_matrix((B, self.n - B)), I_B])
+
+        self.n_balance = T * N ## the first n_balance rows of A_eq are the power balance rows
+        self.A_eq = sp.vstack([balance, soc, final], format='csr')
+        self.b_eq = np.r_[p_L.ravel(), soc_rhs, np.full(B, b0)]
+
+        self.lb = np.r_[np.zeros(T), np.full(T * L, -np.inf), np.zeros(2 * T * E), np.zeros(2 * T * B), np.full(T * B, data['bmin'])]
+        self.ub = np.r_[np.full(T, SUBSTATION_LIMIT), np.full(T * L, np.inf),
+                        profile_values(data, 'edo_ch', self.Eset).ravel(), profile_values(data, 'edo_dis', self.Eset).ravel(),
+                        np.full(2 * T * B, data['Pb_R']), np.full(T * B, data['bmax'])]
+
+    def block(self, x, var):
+        return x[self.offset[var]:self.offset[var] + self.sizes[var]]
+
+    ## Cost vector of the objective functions in Objective.py, for the price profile of the data or the given cost array.
+    ## Every objective is compiled once per MatrixLP, later calls only combine its coefficient arrays with the prices.
+    def objective_vector(self, obj_func, cost=None):
+        if obj_func not in self.compiled:
+            self.compiled[obj_func] = CompiledObjective(obj_func, self.data)
+        cost = series_values(self.data, 'costshape') if cost is None else cost
+        return self.compiled[obj_func].vector(cost, VAR_ORDER)
+
+    ## Solution vector -> Results like store_results, the blocks are reshaped views of x
+    def results(self, x, objective_value):
+        sets = {'Lset': self.Lset, 'Eset': self.Eset, 'Bset': self.Bset}
+        arrays = {'P_subs': self.block(x, 'P_subs')}
+        for var in VAR_ORDER[1:]:
+            arrays[var] = self.block(x, var).reshape(len(self.Tset), len(sets[VAR_SETS[var]]))
+        return Results(self.Tset, sets, arrays, objective_value)
+
+def solve_matrix_lp(data, obj_func, cross_check=False, rtol=1e-6):
+    """
+    Builds and solves the LP of data with the objective obj_func and returns its Results, like store_results. When the
+    solve fails, the Results have nan values and objective_value None, as store_results of an unsolved Pyomo model.
+    With cross_check=True the model is also solved through build_pyomo_model/pyomo_solve, and a ValueError is raised
+    when the two objective values differ by more than rtol or the matrix LP failed.
+    """
+    lp = MatrixLP(data)
+    c = lp.objective_vector(obj_func)
+    res = linprog(c, A_eq=lp.A_eq, b_eq=lp.b_eq, bounds=np.c_[lp.lb, lp.ub], method='highs')
+    if res.status == 0:
+        print("Solver completed successfully.")
+    else:
+        print(f"Solver failed: {res.message}")
+    modelVals = lp.results(res.x, res.fun) if res.status == 0 else lp.results(np.full(len(c), np.nan), None)
+
+    if cross_check:
+        from pyomo.environ import value
+        from Build_Model.Constraints import build_pyomo_model
+        from Build_Model.Objective import pyomo_solve
+        model = pyomo_solve(build_pyomo_model(data), obj_func)
+        if not model.solved:
+            raise ValueError("The Pyomo model of the cross check could not be solved")
+        pyomo_objective = value(model.obj)
+        if modelVals['objective_value'] is None:
+            raise ValueError(f"Matrix LP failed ({res.message}), the Pyomo objective is {pyomo_objective}")
+        if not np.isclose(modelVals['objective_value'], pyomo_objective, rtol=rtol):
+            raise ValueError(f"Matrix LP objective {modelVals['objective_value']} differs from Pyomo objective {pyomo_objective}")
+
+    return modelVals
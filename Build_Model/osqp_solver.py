@@ -0,0 +1,205 @@
+"""
+This script holds an in-process QP backend for pyomo_solve built on OSQP, which solves the quadratic ADMM area models
+without a file based or commercial solver. The model is read once into the sparse form
+
+    min 1/2 x'Px + q'x   s.t.   l <= Ax <= u
+
+with one row of A per active constraint and one per variable for its bounds. Coefficients that depend on mutable
+parameters (loads, prices, shared values, duals, rho) are kept as Pyomo expressions and only those are evaluated again
+before every later solve, which is pushed to the same OSQP object as a data update. Activating or deactivating a
+constraint, fixing a variable or a new objective reads the model again. OSQP releases the GIL while solving and
+prints nothing unless asked to, so several instances can solve in threads of one process.
+"""
+import importlib.util
+import numpy as np
+from pyomo.core.base.symbol_map import SymbolMap
+from pyomo.environ import Constraint, Objective, Var, value, maximize
+from pyomo.opt import SolverResults, SolverStatus, TerminationCondition, Solution
+from pyomo.repn import generate_standard_repn
+from Build_Model.Constraints import MODEL_LOCK
+
+OSQP_INSTALLED = importlib.util.find_spec('osqp') is not None ## osqp (and scipy with it) is only imported by the first solve
+
+## tight enough for the tie-line flows the ADMM iterations exchange, polishing cleans up the active set of the LP parts
+DEFAULT_SETTINGS = {'eps_abs': 1e-7, 'eps_rel': 1e-7, 'max_iter': 200000, 'polishing': True, 'verbose': False}
+
+## OSQP status -> (solver status, termination condition)
+STATUS = {
+    'solved': (SolverStatus.ok, TerminationCondition.optimal),
+    'solved inaccurate': (SolverStatus.warning, TerminationCondition.other),
+    'primal infeasible': (SolverStatus.warning, TerminationCondition.infeasible),
+    'primal infeasible inaccurate': (SolverStatus.warning, TerminationCondition.infeasible),
+    'dual infeasible': (SolverStatus.warning, TerminationCondition.unbounded),
+    'dual infeasible inaccurate': (SolverStatus.warning, TerminationCondition.unbounded),
+    'maximum iterations reached': (SolverStatus.aborted, TerminationCondition.maxIterations),
+    'run time limit reached': (SolverStatus.aborted, TerminationCondition.maxTimeLimit),
+}
+
+class _SparseTerms:
+    """
+    Entries (row, col, coefficient) of a sparse matrix in the CSC order OSQP expects, duplicates summed. Numeric
+    coefficients are added up once, the others are expressions evaluated by values().
+    """
+    def __init__(self, rows, cols, coefs, shape):
+        rows, cols = np.asarray(rows, dtype=np.int64), np.asarray(cols, dtype=np.int64)
+        keys, position = np.unique(cols * shape[0] + rows, return_inverse=True)
+        self.shape = shape
+        self.indices = (keys % shape[0]).astype(np.int64)
+        self.indptr = np.concatenate([[0], np.cumsum(np.bincount(keys // shape[0], minlength=shape[1]))]).astype(np.int64)
+        numeric = np.array([not _is_expression(c) for c in coefs], dtype=bool)
+        self.fixed = np.zeros(len(keys))
+        np.add.at(self.fixed, position[numeric], [float(c) for c, n in zip(coefs, numeric) if n])
+        self.position = position[~numeric]
+        self.expressions = [c for c, n in zip(coefs, numeric) if not n]
+
+    def values(self):
+        data = self.fixed.copy()
+        if self.expressions:
+            np.add.at(data, self.position, [value(c) for c in self.expressions])
+        return data
+
+    def matrix(self, data):
+        import scipy.sparse as sp
+        return sp.csc_matrix((data, self.indices, self.indptr), shape=self.shape)
+
+def _is_expression(c):
+    return not isinstance(c, (int, float))
+
+## Current values of a list of numbers and Pyomo expressions
+def _evaluate(values):
+    return np.array([value(v) if _is_expression(v) else float(v) for v in values], dtype=float)
+
+class OSQPDirect:
+    """
+    Pyomo style solver object (solve, available, warm_start_capable) over one OSQP instance. It is persistent like the
+    other registered backends: get_solver keeps one object per model and every later solve only updates the data.
+    """
+    def __init__(self):
+        self.settings = dict(DEFAULT_SETTINGS)
+        self.iterations = None
+        self._model = None
+        self._signature = None
+        self._solver = None
+        self._cold = False
+
+    def available(self, exception_flag=False):
+        if not OSQP_INSTALLED and exception_flag:
+            raise RuntimeError("osqp is not installed")
+        return OSQP_INSTALLED
+
+    def warm_start_capable(self):
+        return True
+
+    def clear_warm_start(self):
+        self._cold = True ## the next solve starts from x = 0, y = 0 like a fresh OSQP object
+
+    ## Active constraints, fixed variables and objective of the model, which fix the sparsity of P and A
+    def _structure_signature(self, model):
+        constraints = tuple(id(c) for c in model.component_data_objects(Constraint, active=True))
+        fixed = tuple(id(v) for v in model.component_data_objects(Var) if v.fixed)
+        objectives = tuple(id(o) for o in model.component_data_objects(Objective, active=True))
+        return constraints, fixed, objectives
+
+    def _read_model(self, model):
+        objectives = list(model.component_data_objects(Objective, active=True))
+        if len(objectives) != 1:
+            raise ValueError(f"OSQP needs exactly one active objective, the model has {len(objectives)}")
+        objective = objectives[0]
+        variables, column = [], {}
+        def col(var):
+            if id(var) not in column:
+                if not var.is_continuous():
+                    raise ValueError(f"OSQP solves continuous models only, {var.name} is not continuous")
+                column[id(var)] = len(variables)
+                variables.append(var)
+            return column[id(var)]
+
+        sign = -1.0 if objective.sense == maximize else 1.0
+        repn = generate_standard_repn(objective.expr, compute_values=False, quadratic=True)
+        if repn.nonlinear_expr is not None:
+            raise ValueError("OSQP solves linear and quadratic objectives only")
+        q_cols = [col(v) for v in repn.linear_vars]
+        q_coefs = [sign * c for c in repn.linear_coefs]
+        p_rows, p_cols, p_coefs = [], [], []
+        for (x, y), c in zip(repn.quadratic_vars, repn.quadratic_coefs):
+            i, j = sorted((col(x), col(y)))
+            p_rows.append(i)
+            p_cols.append(j)
+            p_coefs.append(sign * (2 * c if i == j else c)) ## 1/2 x'Px with the upper triangle of P
+        a_rows, a_cols, a_coefs, lower, upper = [], [], [], [], []
+        for row, con in enumerate(model.component_data_objects(Constraint, active=True)):
+            body = generate_standard_repn(con.body, compute_values=False, quadratic=False)
+            if body.nonlinear_expr is not None:
+                raise ValueError(f"OSQP solves linear constraints only, {con.name} is not linear")
+            for v, c in zip(body.linear_vars, body.linear_coefs):
+                a_rows.append(row)
+                a_cols.append(col(v))
+                a_coefs.append(c)
+            lower.append(-np.inf if con.lower is None else con.lower - body.constant)
+            upper.append(np.inf if con.upper is None else con.upper - body.constant)
+        n_rows = len(lower)
+        for var in variables: ## one bound row per variable, infinite for free variables
+            a_rows.append(n_rows + column[id(var)])
+            a_cols.append(column[id(var)])
+            a_coefs.append(1.0)
+        n = len(variables)
+        self._variables = variables
+        self._q = (np.array(q_cols, dtype=np.int64), q_coefs)
+        self._P = _SparseTerms(p_rows, p_cols, p_coefs, (n, n))
+        self._A = _SparseTerms(a_rows, a_cols, a_coefs, (n_rows + n, n))
+        self._bounds = (lower, upper)
+        self._symbol_map = SymbolMap()
+        self._symbols = [f"x{k}" for k in range(n)]
+        self._symbol_map.addSymbols(zip(variables, self._symbols))
+
+    def _data(self):
+        n = len(self._variables)
+        q = np.zeros(n)
+        np.add.at(q, self._q[0], _evaluate(self._q[1]))
+        var_lb = np.array([-np.inf if v.lb is None else v.lb for v in self._variables], dtype=float)
+        var_ub = np.array([np.inf if v.ub is None else v.ub for v in self._variables], dtype=float)
+        l = np.concatenate([_evaluate(self._bounds[0]), var_lb])
+        u = np.concatenate([_evaluate(self._bounds[1]), var_ub])
+        return q, l, u, self._P.values(), self._A.values()
+
+    def solve(self, model, tee=False, load_solutions=True, warmstart=False, options=None, **kwargs):
+        self.available(exception_flag=True)
+        import osqp
+        settings = {**self.settings, **(options or {}), 'verbose': bool(tee)}
+        signature = self._structure_signature(model)
+        if self._solver is None or model is not self._model or signature != self._signature:
+            with MODEL_LOCK:
+                self._read_model(model)
+            q, l, u, Px, Ax = self._data()
+            self._solver = osqp.OSQP()
+            self._solver.setup(self._P.matrix(Px), q, self._A.matrix(Ax), l, u, **settings)
+            self._model, self._signature, self._settings = model, signature, settings
+        else:
+            q, l, u, Px, Ax = self._data()
+            self._solver.update(q=q, l=l, u=u, Px=Px, Ax=Ax)
+            if settings != self._settings:
+                self._solver.update_settings(**{k: v for k, v in settings.items() if self._settings.get(k) != v})
+                self._settings = settings
+        if self._cold:
+            self._solver.warm_start(x=np.zeros(len(self._variables)), y=np.zeros(self._A.shape[0]))
+            self._cold = False
+        elif warmstart and all(v.value is not None for v in self._variables):
+            self._solver.warm_start(x=np.array([v.value for v in self._variables], dtype=float))
+        res = self._solver.solve(raise_error=False)
+        self.iterations = int(res.info.iter)
+
+        results = SolverResults()
+        results.solver.name = 'osqp'
+        results.solver.status, results.solver.termination_condition = STATUS.get(res.info.status, (SolverStatus.error, TerminationCondition.error))
+        results.solver.message = res.info.status
+        results.problem.number_of_variables = len(self._variables)
+        results.problem.number_of_constraints = self._A.shape[0]
+        if results.solver.termination_condition == TerminationCondition.optimal:
+            solution = Solution()
+            solution.status = 'optimal'
+            solution.variable.update({symbol: {'Value': x} for symbol, x in zip(self._symbols, res.x.tolist())})
+            results.solution.insert(solution)
+            results._smap = self._symbol_map
+            if load_solutions:
+                model.solutions.load_from(results)
+        return results
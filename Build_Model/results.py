@@ -0,0 +1,134 @@
+"""
+This script holds the array-backed container of the solved variables. Every variable block is one dense NumPy array,
+(T x L) for P, (T x E) for Pe_c/Pe_d, (T x B) for P_c/P_d/B and (T,) for P_subs, filled in bulk from the variable
+values, together with the time and line/node index maps. Like SystemData it exposes dict-compatible views, so
+results['P'][t, (i, j)] and results['B'].items() keep working for code written against the tuple-keyed dictionaries
+store_results used to return, while the distributed algorithms slice the arrays directly.
+"""
+from collections.abc import MutableMapping
+import numpy as np
+from Parser.system_data import ProfileView, SeriesView
+
+VARS = ('P_subs', 'P', 'Pe_c', 'Pe_d', 'P_c', 'P_d', 'B')
+VAR_SETS = {'P': 'Lset', 'Pe_c': 'Eset', 'Pe_d': 'Eset', 'P_c': 'Bset', 'P_d': 'Bset', 'B': 'Bset'} ## block -> set of its columns
+
+## Values of an indexed Pyomo variable in its (time major) index order as a flat array, unset values are nan.
+## var.get_values() returns them in construction order, which is the index order of the dense variables of
+## build_pyomo_model, without the per element index checks of var.values() (~5x faster on large feeders)
+def var_values(var):
+    return np.fromiter((np.nan if v is None else v for v in var.get_values().values()), dtype=float, count=len(var))
+
+
+class Results(MutableMapping):
+    """
+    Solved variables of one model: results.arrays[name] is the dense array of a block, results[name] the dict-compatible
+    view of it. Keys other than the variable blocks and 'objective_value' (e.g. the iteration_stats of the distributed
+    algorithms) are kept as they are in results.extra.
+    """
+    def __init__(self, Tset, sets, arrays, objective_value=None):
+        self.Tset = list(Tset)
+        self.sets = {name: list(sets[name]) for name in ('Lset', 'Eset', 'Bset')}
+        self.arrays = arrays
+        self.objective_value = objective_value
+        self.extra = {}
+        self.time_index = {t: k for k, t in enumerate(self.Tset)}
+        self.index = {name: {i: k for k, i in enumerate(nodes)} for name, nodes in self.sets.items()}
+        self._views = {}
+
+    def __getitem__(self, key):
+        if key == 'objective_value':
+            return self.objective_value
+        if key in self.extra:
+            return self.extra[key]
+        if key not in self.arrays:
+            raise KeyError(key)
+        if key not in self._views:
+            if key == 'P_subs':
+                self._views[key] = SeriesView(self.arrays[key], self.time_index)
+            else:
+                self._views[key] = ProfileView(self.arrays[key], self.time_index, self.index[VAR_SETS[key]])
+        return self._views[key]
+
+    def __setitem__(self, key, val):
+        if key == 'objective_value':
+            self.objective_value = val
+        elif key in VARS:
+            self.arrays[key] = np.asarray(val, dtype=float)
+            self._views.pop(key, None)
+        else:
+            self.extra[key] = val
+
+    def __delitem__(self, key):
+        if key not in self.extra:
+            raise TypeError(f"'{key}' of the results cannot be deleted")
+        del self.extra[key]
+
+    def __iter__(self):
+        yield from (name for name in VARS if name in self.arrays)
+        yield 'objective_value'
+        yield from self.extra
+
+    def __len__(self):
+        return sum(name in self.arrays for name in VARS) + 1 + len(self.extra)
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state['_views'] = {} ## rebuilt on demand, only the arrays travel between processes
+        return state
+
+    ## Time series of one line/node of a block (a view, not a copy)
+    def column(self, name, i):
+        return self.arrays[name][:, self.index[VAR_SETS[name]][i]]
+
+    def line_into(self, node):
+        """
+        (T x 1) flow of the line into node, e.g. the tie-line towards the dummy node of a downstream area, as a view of
+        the P array. A radial feeder has exactly one such line.
+        """
+        lines = [k for k, (i, j) in enumerate(self.sets['Lset']) if j == node]
+        if len(lines) != 1:
+            raise ValueError(f"Node {node} must have exactly one incoming line, found {len(lines)}")
+        return self.arrays['P'][:, lines[0]:lines[0] + 1]
+
+    def relabel_lines(self, nodes):
+        """
+        Results sharing the arrays of these results, with the end node of every line into a node of the mapping
+        nodes (old -> new) renamed, e.g. the dummy nodes of an area to the global nodes they stand for.
+        """
+        sets = dict(self.sets)
+        sets['Lset'] = [(i, nodes.get(j, j)) for (i, j) in self.sets['Lset']]
+        relabeled = Results(self.Tset, sets, self.arrays, self.objective_value)
+        relabeled.extra = dict(self.extra)
+        return relabeled
+
+    ## Materializes the tuple-keyed dictionaries store_results used to return
+    def to_dict(self):
+        modelVals = {name: dict(self[name].items()) for name in VARS if name in self.arrays}
+        modelVals['objective_value'] = self.objective_value
+        modelVals.update(self.extra)
+        return modelVals
+
+
+def merge_results(results_by_area, subs_from):
+    """
+    Results of the whole system from the results of its areas. The columns of every block are concatenated in area
+    order, a line/node present in several areas keeps the values of the first one, and P_subs is that of the area
+    subs_from (the area at the substation).
+    """
+    parts = list(results_by_area.values())
+    sets, keep = {}, {}
+    for name in ('Lset', 'Eset', 'Bset'):
+        first = {}
+        offset = 0
+        for part in parts:
+            for k, i in enumerate(part.sets[name]):
+                first.setdefault(i, offset + k)
+            offset += len(part.sets[name])
+        sets[name] = list(first)
+        keep[name] = None if len(first) == offset else np.fromiter(first.values(), dtype=int, count=len(first))
+
+    arrays = {'P_subs': results_by_area[subs_from].arrays['P_subs']}
+    for var, set_name in VAR_SETS.items():
+        merged = np.concatenate([part.arrays[var] for part in parts], axis=1)
+        arrays[var] = merged if keep[set_name] is None else merged[:, keep[set_name]]
+    return Results(parts[0].Tset, sets, arrays)
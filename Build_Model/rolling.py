@@ -0,0 +1,139 @@
+"""
+This script runs the dispatch in a receding horizon (MPC) mode. A window of 'horizon' periods is optimized, the decisions
+of its first period are applied and the window advances by one step. The window model is built once with mutable loads,
+prices, edo limits and initial battery soc. Every step only shifts these parameters: the realized soc B of the applied
+period becomes the initial soc of the next window and the variables start from the previous solution shifted by one
+period (warm start). Profiles are repeated cyclically past the end of the data, like a daily profile.
+"""
+import time
+import numpy as np
+from pyomo.environ import value
+from scipy.optimize import linprog
+from Build_Model.Constraints import build_pyomo_model
+from Build_Model.Objective import pyomo_solve
+from Build_Model.matrix_lp import MatrixLP, profile_values, series_values
+from Build_Model.results import Results, var_values
+
+WINDOW_VARS = ('P_subs', 'P', 'Pe_c', 'Pe_d', 'P_c', 'P_d', 'B')
+
+## Positions (0 based) of the data periods covered by the window starting at step
+def window_index(T, step, horizon):
+    return (step + np.arange(horizon)) % T
+
+## Dictionary data of one window with a local Tset = 1..horizon, used to build the window model once
+def window_data(data, arrays, idx):
+    wdata = {key: data[key] for key in data if key not in arrays}
+    Tset = list(range(1, len(idx) + 1))
+    wdata['Tset'], wdata['T'] = Tset, len(Tset)
+    for name, (values, nodes) in arrays.items():
+        if nodes is None:
+            wdata[name] = dict(zip(Tset, values[idx].tolist()))
+        else:
+            wdata[name] = dict(zip(((t, j) for t in Tset for j in nodes), values[idx].ravel().tolist()))
+    return wdata
+
+## Time major values of a (Tset x ...) variable as a (horizon x n) array
+def _window_values(var, horizon):
+    return var_values(var).reshape(horizon, -1)
+
+## Initializes every variable of the window model with its solution shifted one period ahead (the last period is repeated)
+def shift_warm_start(model, horizon):
+    for name in WINDOW_VARS:
+        var = getattr(model, name)
+        values = _window_values(var, horizon)
+        shifted = np.vstack([values[1:], values[-1:]]).ravel()
+        for v, x in zip(var.values(), shifted.tolist()):
+            v.set_value(None if np.isnan(x) else x, skip_validation=True)
+
+def solve_rolling_horizon(data, obj_func, horizon=24, steps=None, terminal_soc=True, backend='pyomo', warmstart=True):
+    """
+    Advances a 'horizon' period window 'steps' times (default: once over every period of the data) and returns the
+    applied (first period) decisions as Results (like store_results) indexed by step t = 1..steps, together with
+        'objective_value' : realized cost sum(costshape[t] * P_subs[t]) of the applied decisions
+        'window_objective': objective value of every window
+        'step_time'       : wall time of every step in seconds (parameter update + solve + extraction)
+        'build_time'      : time to build the window model once
+
+    terminal_soc=True brings the soc back to b0 at the end of the data horizon (period T, where final_soc_constraint puts it
+    in the day-ahead model) whenever that period lies inside the window. Holding it at the end of every window instead can
+    be infeasible, e.g. for windows that end right after the peak.
+    backend='matrix' solves the windows through MatrixLP, updating only its right hand sides, bounds and costs.
+    """
+    Tset, Nset, Lset, Eset, Bset = list(data['Tset']), list(data['Nset']), list(data['Lset']), list(data['Eset']), list(data['Bset'])
+    T = len(Tset)
+    steps = T if steps is None else steps
+    arrays = {'p_L': (profile_values(data, 'p_L', Nset), Nset), 'edo_ch': (profile_values(data, 'edo_ch', Eset), Eset),
+              'edo_dis': (profile_values(data, 'edo_dis', Eset), Eset), 'costshape': (series_values(data, 'costshape'), None)}
+    cost = arrays['costshape'][0]
+    b_init = np.full(len(Bset), float(data['b0']))
+
+    start = time.perf_counter()
+    wdata = window_data(data, arrays, window_index(T, 0, horizon))
+    if backend == 'matrix':
+        lp = MatrixLP(wdata)
+        lp.A_eq, lp.b_eq = lp.A_eq[:lp.A_eq.shape[0] - len(Bset)], lp.b_eq[:len(lp.b_eq) - len(Bset)] ## drop the final soc rows
+        soc_lb, soc_ub = lp.lb[lp.offset['B']:].copy(), lp.ub[lp.offset['B']:].copy()
+        soc_rows = slice(lp.n_balance, lp.n_balance + len(Bset)) ## rows of the first period soc evolution
+        edo_ch = slice(lp.offset['Pe_c'], lp.offset['Pe_c'] + lp.sizes['Pe_c'])
+        edo_dis = slice(lp.offset['Pe_d'], lp.offset['Pe_d'] + lp.sizes['Pe_d'])
+    elif backend == 'pyomo':
+        model = build_pyomo_model(wdata, mutable_load_nodes=Nset, mutable_cost=True, mutable_edo_limits=True, mutable_initial_soc=True)
+        model.final_soc_constraint.deactivate() ## replaced by fixing B at the end of the data horizon
+        wTset = list(wdata['Tset'])
+        load_keys = [(t, j) for t in wTset for j in Nset]
+        edo_keys = [(t, j) for t in wTset for j in Eset]
+    else:
+        raise ValueError(f"Unknown backend '{backend}', expected 'pyomo' or 'matrix'")
+    build_time = time.perf_counter() - start
+
+    applied = {name: [] for name in WINDOW_VARS}
+    window_objective, step_time = [], []
+    for step in range(steps):
+        start = time.perf_counter()
+        idx = window_index(T, step, horizon)
+        day_end = (T - 1 - step) % T if terminal_soc else horizon ## window position of period T
+        if backend == 'matrix':
+            lp.lb[lp.offset['B']:], lp.ub[lp.offset['B']:] = soc_lb, soc_ub
+            if day_end < horizon:
+                end = slice(lp.offset['B'] + day_end * len(Bset), lp.offset['B'] + (day_end + 1) * len(Bset))
+                lp.lb[end] = lp.ub[end] = data['b0']
+            lp.b_eq[:lp.n_balance] = arrays['p_L'][0][idx].ravel()
+            lp.b_eq[soc_rows] = b_init
+            lp.ub[edo_ch] = arrays['edo_ch'][0][idx].ravel()
+            lp.ub[edo_dis] = arrays['edo_dis'][0][idx].ravel()
+            res = linprog(lp.objective_vector(obj_func, cost=cost[idx]), A_eq=lp.A_eq, b_eq=lp.b_eq, bounds=np.c_[lp.lb, lp.ub], method='highs')
+            if res.status != 0:
+                raise RuntimeError(f"Window {step + 1} could not be solved: {res.message}")
+            first = {name: lp.block(res.x, name).reshape(horizon, -1)[0] for name in WINDOW_VARS}
+            window_objective.append(res.fun)
+        else:
+            model.p_L_mutable.store_values(dict(zip(load_keys, arrays['p_L'][0][idx].ravel().tolist())))
+            model.edo_ch_max.store_values(dict(zip(edo_keys, arrays['edo_ch'][0][idx].ravel().tolist())))
+            model.edo_dis_max.store_values(dict(zip(edo_keys, arrays['edo_dis'][0][idx].ravel().tolist())))
+            model.cost.store_values(dict(zip(wTset, cost[idx].tolist())))
+            model.b_init.store_values(dict(zip(Bset, b_init.tolist())))
+            model.B.unfix()
+            if day_end < horizon:
+                for j in Bset:
+                    model.B[wTset[day_end], j].fix(data['b0'])
+            model = pyomo_solve(model, obj_func, warmstart=warmstart and step > 0)
+            if not model.solved:
+                raise RuntimeError(f"Window {step + 1} could not be solved")
+            first = {name: _window_values(getattr(model, name), horizon)[0] for name in WINDOW_VARS}
+            window_objective.append(value(model.obj))
+            shift_warm_start(model, horizon)
+        for name in WINDOW_VARS:
+            applied[name].append(first[name])
+        b_init = first['B'] ## realized soc of the applied period
+        step_time.append(time.perf_counter() - start)
+
+    arrays = {name: np.vstack(applied[name]) for name in WINDOW_VARS}
+    arrays['P_subs'] = arrays['P_subs'].ravel()
+    modelVals = Results(range(1, steps + 1), {'Lset': Lset, 'Eset': Eset, 'Bset': Bset}, arrays,
+                        float(np.dot(cost[np.arange(steps) % T], arrays['P_subs'])))
+    modelVals['window_objective'] = window_objective
+    modelVals['step_time'] = step_time
+    modelVals['build_time'] = build_time
+    print(f"Rolling horizon: {steps} steps of {horizon} periods, build {build_time:.3f} s, "
+          f"step latency mean {np.mean(step_time):.3f} s / max {np.max(step_time):.3f} s")
+    return modelVals
@@ -0,0 +1,107 @@
+"""
+This script saves the results of a run (centralized, ADMM, EnAPP, ...) to disk and loads them back lazily, so plots and
+comparisons can be redone without solving again. Every method gets a folder holding
+
+    <var>.npy             one (T x n) array per variable block (P_subs is (T,)), time major
+    history_<name>.npy    the per iteration histories (objective, convergence, ...)
+    meta.json             index sets, objective value, iteration stats and run metadata
+
+The arrays are memory mapped on load and sliced before anything is read, so asking for a few variables or a range of
+time periods of a large feeder only pulls those rows from the files.
+"""
+import json
+import os
+import shutil
+import time
+import numpy as np
+from Build_Model.results import Results, VARS
+
+RUN_VERSION = 1 ## bump whenever the saved layout changes
+
+def _to_json(o):
+    if isinstance(o, np.generic):
+        return o.item()
+    if isinstance(o, np.ndarray):
+        return o.tolist()
+    raise TypeError(f"{type(o).__name__} is not JSON serializable")
+
+## {iteration: value} dictionaries as returned by solve_ADMM/solve_EnAPP, lists or arrays -> float array
+def _history_array(values):
+    if isinstance(values, dict):
+        values = list(values.values())
+    return np.array([np.nan if v is None else v for v in values], dtype=float)
+
+def save_results(path, results, history=None, metadata=None):
+    """
+    Saves results (Results of store_results, solve_ADMM, ...) to the folder path, replacing an earlier save.
+    history holds the per iteration series, e.g. {'objective': admm_obj, 'convergence': admm_conv}, metadata any
+    JSON serializable run information (system, objective function, rho, ...).
+    """
+    tmp_path = path + ".tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    for name in VARS:
+        if name in results.arrays:
+            np.save(os.path.join(tmp_path, f"{name}.npy"), np.ascontiguousarray(results.arrays[name]))
+    history = history or {}
+    for name, values in history.items():
+        np.save(os.path.join(tmp_path, f"history_{name}.npy"), _history_array(values))
+    meta = {
+        'version': RUN_VERSION,
+        'saved_at': time.strftime("%Y-%m-%d %H:%M:%S"),
+        'Tset': results.Tset,
+        'sets': results.sets,
+        'variables': [name for name in VARS if name in results.arrays],
+        'history': list(history),
+        'objective_value': results.objective_value,
+        'extra': results.extra, ## e.g. iteration_stats
+        'metadata': metadata or {},
+    }
+    with open(os.path.join(tmp_path, "meta.json"), 'w') as f:
+        json.dump(meta, f, default=_to_json)
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(tmp_path, path) ## a save only becomes visible once it is complete
+
+def load_metadata(path):
+    with open(os.path.join(path, "meta.json")) as f:
+        meta = json.load(f)
+    if meta.get('version') != RUN_VERSION:
+        raise ValueError(f"{path} was saved with layout version {meta.get('version')}, expected {RUN_VERSION}")
+    meta['sets'] = {name: [tuple(i) if isinstance(i, list) else i for i in nodes] for name, nodes in meta['sets'].items()}
+    return meta
+
+def _rows(Tset, times):
+    if times is None:
+        return slice(None)
+    first, last = times
+    start = Tset.index(first)
+    return slice(start, Tset.index(last, start) + 1)
+
+def load_results(path, variables=None, times=None, meta=None):
+    """
+    Results saved in path. variables limits the loaded blocks (default: all), times=(first, last) the time periods
+    (inclusive, labels of Tset). The arrays stay memory mapped, only the selected rows are read when they are used.
+    """
+    meta = meta or load_metadata(path)
+    variables = meta['variables'] if variables is None else [name for name in VARS if name in variables]
+    missing = set(variables) - set(meta['variables'])
+    if missing:
+        raise KeyError(f"{sorted(missing)} not saved in {path}")
+    rows = _rows(meta['Tset'], times)
+    ## plain ndarray views of the mappings, scalar indexing of a np.memmap is an order of magnitude slower
+    arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode='r')[rows].view(np.ndarray) for name in variables}
+    results = Results(meta['Tset'][rows], meta['sets'], arrays, meta['objective_value'])
+    results.extra = meta['extra']
+    return results
+
+## Per iteration histories saved in path by name (memory mapped), limited to the given names
+def load_history(path, names=None, meta=None):
+    meta = meta or load_metadata(path)
+    names = meta['history'] if names is None else names
+    return {name: np.load(os.path.join(path, f"history_{name}.npy"), mmap_mode='r') for name in names}
+
+## Names of the saved methods (sub folders) of a run folder
+def saved_methods(run_path):
+    if not os.path.isdir(run_path):
+        return []
+    return sorted(entry for entry in os.listdir(run_path) if os.path.isfile(os.path.join(run_path, entry, "meta.json")))
@@ -0,0 +1,89 @@
+"""
+This script solves the same feeder under a batch of K load/price scenarios. The model structure is built once per
+worker process and only the scenario data (node loads and energy prices) is swapped between solves. Results come back as
+arrays stacked along a leading scenario axis.
+"""
+import multiprocessing as mp
+import time
+import numpy as np
+from pyomo.environ import value
+from scipy.optimize import linprog
+from Build_Model.Constraints import build_pyomo_model
+from Build_Model.Objective import pyomo_solve
+from Build_Model.matrix_lp import MatrixLP
+from Build_Model.results import var_values
+
+## (K x T x N) node loads of the scenarios. loads is either (K x T x N) or (K x T) load multipliers like the 'M' column of
+## loadshape.csv, which are applied to the nominal node loads of node_data.csv (data['p_L_nom'])
+def scenario_loads(data, loads):
+    loads = np.asarray(loads, dtype=float)
+    if loads.ndim == 3:
+        return loads
+    nominal = np.array([data['p_L_nom'][j] for j in data['Nset']], dtype=float)
+    return loads[:, :, None] * nominal[None, None, :]
+
+## Solves a chunk of scenarios on one structure and returns the stacked results of the chunk
+def solve_scenario_chunk(data, loads, prices, obj_func, backend):
+    Tset, Nset = list(data['Tset']), list(data['Nset'])
+    T, L, E, B = len(Tset), len(data['Lset']), len(data['Eset']), len(data['Bset'])
+    K = len(loads)
+    results = {'P_subs': np.empty((K, T)), 'P': np.empty((K, T, L)), 'Pe_c': np.empty((K, T, E)), 'Pe_d': np.empty((K, T, E)),
+               'P_c': np.empty((K, T, B)), 'P_d': np.empty((K, T, B)), 'B': np.empty((K, T, B)), 'objective_value': np.empty(K)}
+    shapes = {'P_subs': (T,), 'P': (T, L), 'Pe_c': (T, E), 'Pe_d': (T, E), 'P_c': (T, B), 'P_d': (T, B), 'B': (T, B)}
+
+    if backend == 'matrix':
+        lp = MatrixLP(data)
+        bounds = np.c_[lp.lb, lp.ub]
+        for k in range(K):
+            b_eq = lp.b_eq.copy()
+            b_eq[:lp.n_balance] = loads[k].ravel() ## the power balance rows are time major like the load array
+            res = linprog(lp.objective_vector(obj_func, cost=prices[k]), A_eq=lp.A_eq, b_eq=b_eq, bounds=bounds, method='highs')
+            x = res.x if res.status == 0 else np.full(lp.n, np.nan)
+            for var, shape in shapes.items():
+                results[var][k] = lp.block(x, var).reshape(shape)
+            results['objective_value'][k] = res.fun if res.status == 0 else np.nan
+        return results
+
+    model = build_pyomo_model(data, mutable_load_nodes=Nset, mutable_cost=True)
+    load_keys = [(t, j) for t in Tset for j in Nset]
+    for k in range(K):
+        model.p_L_mutable.store_values(dict(zip(load_keys, loads[k].ravel().tolist())))
+        model.cost.store_values(dict(zip(Tset, prices[k].tolist())))
+        model = pyomo_solve(model, obj_func)
+        for var, shape in shapes.items():
+            results[var][k] = var_values(getattr(model, var)).reshape(shape) if model.solved else np.nan
+        results['objective_value'][k] = value(model.obj) if model.solved else np.nan
+    return results
+
+def solve_scenarios(data, loads, prices, obj_func, processes=None, backend='pyomo'):
+    """
+    Solves K scenarios of the system in data and returns a dictionary of arrays stacked by scenario:
+        'P_subs' (K x T), 'P' (K x T x L), 'Pe_c'/'Pe_d' (K x T x E), 'P_c'/'P_d'/'B' (K x T x B), 'objective_value' (K,)
+    together with the index sets 'Tset', 'Lset', 'Eset', 'Bset' and the throughput in 'scenarios_per_second'.
+
+    loads is (K x T) load multipliers or (K x T x N) node loads, prices is (K x T). The scenarios are spread in
+    contiguous chunks over a pool of 'processes' workers (default: one per cpu), each building the model once.
+    backend='matrix' solves the chunks through MatrixLP instead of Pyomo.
+    """
+    loads = scenario_loads(data, loads)
+    prices = np.asarray(prices, dtype=float)
+    K = len(loads)
+    if prices.shape != loads.shape[:2]:
+        raise ValueError(f"prices must be (K x T) = {loads.shape[:2]}, got {prices.shape}")
+    processes = min(processes or mp.cpu_count(), K)
+
+    start = time.perf_counter()
+    chunks = [idx for idx in np.array_split(np.arange(K), processes) if len(idx)]
+    args = [(data, loads[idx], prices[idx], obj_func, backend) for idx in chunks]
+    if processes == 1:
+        chunk_results = [solve_scenario_chunk(*a) for a in args]
+    else:
+        with mp.Pool(processes=processes) as pool:
+            chunk_results = pool.starmap(solve_scenario_chunk, args)
+    elapsed = time.perf_counter() - start
+
+    results = {key: np.concatenate([r[key] for r in chunk_results]) for key in chunk_results[0]}
+    results.update({'Tset': np.asarray(data['Tset']), 'Lset': list(data['Lset']), 'Eset': list(data['Eset']), 'Bset': list(data['Bset'])})
+    results['scenarios_per_second'] = K / elapsed
+    print(f"Solved {K} scenarios in {elapsed:.2f} s on {processes} process(es): {K / elapsed:.2f} scenarios/s")
+    return results
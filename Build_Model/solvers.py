@@ -0,0 +1,176 @@
+"""
+This script holds the registry of solvers used by pyomo_solve. A run picks a solver by name with set_solver (or the
+solver argument of pyomo_solve, solve_ADMM and solve_EnAPP). Persistent interfaces keep the model loaded in the solver
+in memory: the solver object is stored on the model and reused by every later solve of it, so only the changed
+parameters (loads, prices, shared values, duals, rho) are pushed to the solver instead of writing and reading problem
+files. Off the main thread (the thread executor of the distributed algorithms) only thread-safe solvers are handed out.
+"""
+import os
+import threading
+import numpy as np
+from pyomo.environ import SolverFactory
+from Build_Model.osqp_solver import OSQPDirect
+try:
+    import highspy
+except ImportError:
+    highspy = None
+
+SCIP_EXECUTABLE = r"C:\Program Files\SCIPOptSuite 9.2.0\bin\scip.exe" ## You may need to give the complete path of your solver in executables
+
+SOLVERS = {} ## name -> {'factory': callable returning a solver, 'persistent': bool, 'quadratic': bool, 'thread_safe': bool}
+
+AUTO_ORDER = ('appsi_highs', 'highs', 'osqp', 'scip_persistent', 'gurobi', 'scip_direct', 'scip') ## 'auto' takes the first available of these
+
+_run_solver = {'name': 'auto', 'options': {}} ## solver of the current run, see set_solver
+_available = {} ## name -> availability, checked once per process
+_shared = {} ## (name, thread) -> solver object of the non persistent solvers, shared by the models of a thread
+
+def register_solver(name, factory, persistent=False, quadratic=True, thread_safe=False):
+    """
+    Adds a solver to the registry. factory() returns an object with a Pyomo solve(model, ...) method. persistent=True
+    means the object keeps the model it solved and updates it incrementally on the next solve of the same model.
+    quadratic=False marks solvers that 'auto' skips for the quadratic ADMM objective. thread_safe=True marks solvers that
+    can solve several models at once in threads of one process: the Pyomo interfaces of HiGHS and SCIP redirect the
+    process-wide stdout/stderr (capture_output) around every solve, so they are not.
+    """
+    SOLVERS[name] = {'factory': factory, 'persistent': persistent, 'quadratic': quadratic, 'thread_safe': thread_safe}
+
+register_solver('appsi_highs', lambda: SolverFactory('appsi_highs'), persistent=True, quadratic=False) ## in process HiGHS, LP only
+register_solver('highs', lambda: SolverFactory('highs'), persistent=True, quadratic=False) ## in process HiGHS (pyomo.contrib.solver), its QP path stalls on small rho
+register_solver('osqp', OSQPDirect, persistent=True, thread_safe=True) ## in process OSQP (Build_Model/osqp_solver.py), the first choice for the quadratic ADMM objective, releases the GIL while solving
+register_solver('scip_persistent', lambda: SolverFactory('scip_persistent'), persistent=True) ## in process SCIP through pyscipopt
+register_solver('scip_direct', lambda: SolverFactory('scip_direct')) ## in process SCIP, model rebuilt on every solve
+register_solver('gurobi', lambda: SolverFactory('appsi_gurobi'), persistent=True)
+register_solver('scip', lambda: SolverFactory('scip', executable=SCIP_EXECUTABLE if os.path.exists(SCIP_EXECUTABLE) else None)) ## scip executable, file based
+
+## Selects the solver of this run. name is a registered solver or 'auto', options are passed to every solve.
+## Worker processes of a run get the solver through the solver argument of solve_ADMM / solve_EnAPP.
+def set_solver(name, **options):
+    if name != 'auto' and name not in SOLVERS:
+        raise ValueError(f"Unknown solver '{name}', registered solvers: {', '.join(SOLVERS)}")
+    _run_solver['name'] = name
+    _run_solver['options'] = options
+
+def current_solver():
+    return _run_solver['name']
+
+def solver_available(name):
+    if name not in _available:
+        try:
+            _available[name] = bool(SOLVERS[name]['factory']().available(exception_flag=False))
+        except Exception:
+            _available[name] = False
+    return _available[name]
+
+def _main_thread():
+    return threading.current_thread() is threading.main_thread()
+
+## Resolves 'auto' to a registered solver for the objective of the model, a thread-safe one if thread_safe
+def resolve_solver(name, model, thread_safe=False):
+    if name != 'auto':
+        return name
+    quadratic = model.obj.expr.polynomial_degree() not in (0, 1)
+    for candidate in AUTO_ORDER:
+        if (SOLVERS[candidate]['quadratic'] or not quadratic) and (SOLVERS[candidate]['thread_safe'] or not thread_safe) \
+                and solver_available(candidate):
+            return candidate
+    raise RuntimeError(f"None of the {'thread-safe ' if thread_safe else ''}solvers {AUTO_ORDER} is available for a "
+                       f"{'quadratic' if quadratic else 'linear'} objective")
+
+## True if solver (a registered name or 'auto') can solve models in threads of this process
+def thread_safe_solver(name=None):
+    name = name or _run_solver['name']
+    if name == 'auto':
+        return any(SOLVERS[candidate]['thread_safe'] and solver_available(candidate) for candidate in AUTO_ORDER)
+    return SOLVERS[name]['thread_safe']
+
+def get_solver(model, name=None):
+    """
+    Returns (name, solver object) for solving model. Persistent solver objects are created once per model and kept on
+    it, the others are created once per thread and shared by its models. Off the main thread 'auto' picks a thread-safe
+    solver and other solvers are refused.
+    """
+    name = name or _run_solver['name']
+    if name == 'auto':
+        if getattr(model, '_auto_solver', None) is None:
+            model._auto_solver = resolve_solver(name, model, thread_safe=not _main_thread()) ## the degree of the objective does not change between solves
+        name = model._auto_solver
+    if not _main_thread() and not SOLVERS[name]['thread_safe']:
+        raise RuntimeError(f"Solver '{name}' is not thread-safe, threads solve with one of "
+                           f"{[candidate for candidate in SOLVERS if SOLVERS[candidate]['thread_safe']]}")
+    if not SOLVERS[name]['persistent']:
+        key = (name, threading.get_ident())
+        if key not in _shared:
+            _shared[key] = SOLVERS[name]['factory']()
+        return name, _shared[key]
+    solvers = getattr(model, '_persistent_solvers', None)
+    if solvers is None:
+        solvers = model._persistent_solvers = {}
+    if name not in solvers:
+        solvers[name] = SOLVERS[name]['factory']()
+    return name, solvers[name]
+
+def solver_options():
+    return dict(_run_solver['options'])
+
+## In memory model of the solver behind an in-process interface (highspy.Highs, pyscipopt.Model), None for the others
+def _solver_model(opt):
+    return getattr(opt, '_solver_model', None)
+
+def _is_highs(solver_model):
+    return highspy is not None and isinstance(solver_model, highspy.Highs)
+
+## Simplex/barrier/QP iterations of the last solve of opt, None if the solver does not report them
+def solver_iterations(opt):
+    solver_model = _solver_model(opt)
+    if _is_highs(solver_model):
+        info = solver_model.getInfo()
+        return sum(max(count, 0) for count in (info.simplex_iteration_count, info.ipm_iteration_count, info.qp_iteration_count))
+    if hasattr(solver_model, 'getNLPIterations'):
+        return solver_model.getNLPIterations()
+    if isinstance(opt, OSQPDirect):
+        return opt.iterations
+    return None
+
+def get_basis(opt):
+    """
+    Basis of the last solve of a HiGHS based solver as (col_status, row_status) int8 arrays, which can be sent to another
+    process and loaded with set_basis into a solver holding the same model structure. None for other solvers.
+    """
+    solver_model = _solver_model(opt)
+    if not _is_highs(solver_model):
+        return None
+    basis = solver_model.getBasis()
+    if not basis.valid:
+        return None
+    return (np.array([int(s) for s in basis.col_status], dtype=np.int8),
+            np.array([int(s) for s in basis.row_status], dtype=np.int8))
+
+## Loads a basis from get_basis into the solver of model, returns False if the solver or the problem size do not match
+def set_basis(opt, model, basis):
+    if basis is None or highspy is None:
+        return False
+    if _solver_model(opt) is None or getattr(opt, '_model', None) is not model:
+        opt.set_instance(model) ## a fresh solver loads the model here instead of in solve, so the basis can be set first
+    solver_model = _solver_model(opt)
+    col_status, row_status = basis
+    if not _is_highs(solver_model) or solver_model.getNumCol() != len(col_status) or solver_model.getNumRow() != len(row_status):
+        return False
+    highs_basis = highspy.HighsBasis()
+    highs_basis.col_status = [highspy.HighsBasisStatus(int(s)) for s in col_status]
+    highs_basis.row_status = [highspy.HighsBasisStatus(int(s)) for s in row_status]
+    highs_basis.valid = True
+    return solver_model.setBasis(highs_basis) == highspy.HighsStatus.kOk
+
+## True if the solver holds a basis, from its previous solve or loaded with set_basis
+def has_basis(opt):
+    solver_model = _solver_model(opt)
+    return _is_highs(solver_model) and solver_model.getBasis().valid
+
+## Drops the basis and solution kept by a persistent solver, so its next solve starts cold
+def clear_solver_state(opt):
+    solver_model = _solver_model(opt)
+    if _is_highs(solver_model):
+        solver_model.clearSolver()
+    elif isinstance(opt, OSQPDirect):
+        opt.clear_warm_start()
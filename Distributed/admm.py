@@ -1,256 +1,381 @@
 """
 This Script does the distributed optimization using ADMM Approach.
 """
-import multiprocessing as mp
+import time
 from Build_Model.Objective import cost_minimize_with_discharging_cost,cost_minimize,substation_power_minimize_with_discharge_cost,substation_power_minimize,pyomo_solve
 from Build_Model.Constraints import build_pyomo_model
-from Build_Model.store import store_results
-from pyomo.environ import value
-from collections import defaultdict,ChainMap
+from Build_Model.results import merge_results, var_values
+from Build_Model.compiled_objective import objective_expression, admm_penalty
+from Build_Model.solvers import current_solver
+from Distributed.area_informatiion import root_area, downstream_areas
+from Distributed.area_model import boundary_loads, set_boundary_loads
+from Distributed.area_workers import worker_stats, print_worker_report
+from Distributed.executors import area_executor
+from Distributed.history import IterateHistory, TrajectoryLog, KEEP
+from Distributed.tie_lines import TieLines
+from Distributed.telemetry import TelemetrySink
+from Distributed.checkpoint import save_checkpoint, load_checkpoint, iteration_dict
+from Profiling.stages import stage, worker_settings, add_records
+from pyomo.environ import value, Param
 import numpy as np
 
 
-def process_area(data_areas,area_name,area_info, shared_vars, dual_vars, rho,obj_fcn):
-    model = build_pyomo_model(data_areas)
-
-    model = pyomo_solve(
-        model,
-        augmented_obj_function,
-        area_name=area_name,
-        area_info=area_info,
-        shared_vars=shared_vars,
-        dual_vars=dual_vars,
-        rho=rho,
-        obj_fcn=obj_fcn,
-    )
-    solutions = store_results(model)
-
-    return area_name, solutions
-
-def augmented_obj_function(model, **kwargs):
-    area_name = model.area_name
-    area_info = model.area_info
-    shared_vars = model.shared_vars
-    dual_vars = model.dual_vars
-    rho = model.rho
-    obj_fcn = model.obj_fcn
-
-    original_obj  = obj_fcn(model)
-
-    f = original_obj
-
+## Boundary arrays of an area in its worker: consensus values, duals and tie-line flows by connected area (up_area then
+## down_areas, the order of model.conn_areas) and the loads of the dummy nodes of the downstream areas
+def boundary_layout(area_name, area_info):
+    n_conn = len(area_info[area_name]['up_area']) + len(area_info[area_name]['down_areas'])
+    return {'shared': n_conn, 'dual': n_conn, 'loads': len(area_info[area_name]['down_local_node_id']), 'flows': n_conn}
+
+## Builds the model of the area once in its worker, settings holds obj_fcn, solver and warmstart
+def init_area(data_area, area_name, area_info, settings):
+    model = build_pyomo_model(data_area, mutable_load_nodes=area_info[area_name]['down_local_node_id'])
+    add_admm_parameters(model, area_name, area_info, settings['obj_fcn'])
+    model.admm_settings = settings
+    model.admm_solves = 0 ## the first solve of a worker is a cold start, also when a run resumes from a checkpoint
+    return model
+
+def solve_area(model, boundary, params):
+    """
+    One ADMM iteration of the area in its worker: reads the dummy node loads and the consensus/dual values of its
+    tie-lines from the boundary arrays, solves, writes the tie-line flows back and returns a small status record.
+    The persistent solver stays in the worker, so later iterations restart from its previous basis.
+    """
+    settings = model.admm_settings
+    set_boundary_loads(model, boundary['loads'])
+    set_admm_penalty(model, boundary['shared'], boundary['dual'], params['rho'])
+    model = pyomo_solve(model, augmented_obj_function, solver=settings['solver'],
+                        warmstart=settings['warmstart'] and model.admm_solves > 0)
+    if not model.solved:
+        raise RuntimeError(f"{model.area_name} could not be solved")
+    model.admm_solves += 1
+    boundary['flows'][:] = tie_flow_values(model)
+    return {'objective_value': value(model.obj), 'P_subs': var_values(model.P_subs),
+            'iterations': model.solver_iterations, 'solve_time': model.solve_time}
+
+## (T x n_conn) values of the tie-line flows of a solved area model
+def tie_flow_values(model):
+    flows = np.fromiter((np.nan if x.value is None else x.value for x in model.tie_flows.values()), dtype=float, count=len(model.tie_flows))
+    return flows.reshape(len(model.Tset), len(model.conn_areas))
+
+## Adds the tie-line flows of the area and the coefficients of their compiled ADMM penalty as mutable parameters, so the
+## augmented objective is built once and only updated between ADMM iterations
+def add_admm_parameters(model, area_name, area_info, obj_fcn):
+    model.area_name = area_name
+    model.area_info = area_info
+    model.obj_fcn = obj_fcn
+    model.conn_areas = area_info[area_name]['up_area'] + area_info[area_name]['down_areas']
+    model.tie_flows = tie_line_flows(model, area_name, area_info)
+    model.admm_keys = [(tt, conn_area) for tt in model.Tset for conn_area in model.conn_areas]
+    model.admm_c = Param(model.Tset, model.conn_areas, mutable=True, initialize=0.0) ## dual - rho * shared
+    model.admm_const = Param(mutable=True, initialize=0.0)
+    model.rho = Param(mutable=True, initialize=0.0)
+    return model
+
+## Flow variable of every tie-line of the area by (t, conn_area): P_subs towards the upstream area and the flow of the
+## line into the dummy node of every downstream area (exactly one line in a radial feeder)
+def tie_line_flows(model, area_name, area_info):
+    flows = {}
     for tt in model.Tset:
-        t = tt-1
-        # Handle upstream connections
-        for idx, up_area in enumerate(area_info[area_name]['up_area']):
-            local_node_id = area_info[area_name]['up_local_node_id'][idx]
-            shared_p = shared_vars[f"{area_name}_{up_area}_p"][-1]
-            dual_p = dual_vars[f"lambda_{area_name}_{up_area}_p"][-1]
-
-            x_p = model.P_subs[tt]
-
-            f += (
-                    dual_p[t] * (x_p - shared_p[t]) +
-                    (rho / 2) * ((x_p - shared_p[t]) ** 2))
-
-        # Handle downstream connections
-        for idx, down_area in enumerate(area_info[area_name]['down_areas']):
-            local_node_id = area_info[area_name]['down_local_node_id'][idx]
-            shared_p = shared_vars[f"{area_name}_{down_area}_p"][-1]
-            dual_p = dual_vars[f"lambda_{area_name}_{down_area}_p"][-1]
-
-            x_p = sum(model.P[tt, (i, k)] for (i, k) in model.Lset if k == local_node_id)
-
-            f += (
-                    dual_p[t] * (x_p - shared_p[t]) +
-                    (rho / 2) * ((x_p - shared_p[t]) ** 2 ))
-    # Update the objective function with dual and penalty expressions
-    augmented_obj = f
-
-    return augmented_obj
-
+        for up_area in area_info[area_name]['up_area']:
+            flows[tt, up_area] = model.P_subs[tt]
+    for idx, down_area in enumerate(area_info[area_name]['down_areas']):
+        local_node_id = area_info[area_name]['down_local_node_id'][idx]
+        lines = [(i, k) for (i, k) in model.Lset if k == local_node_id]
+        if len(lines) != 1:
+            raise ValueError(f"Dummy node {local_node_id} of {area_name} must have exactly one incoming line, found {lines}")
+        for tt in model.Tset:
+            flows[tt, down_area] = model.P[tt, lines[0]]
+    return {key: flows[key] for key in ((tt, c) for tt in model.Tset for c in model.conn_areas)}
+
+## (T x n_conn) consensus values and duals of the tie-lines of the area -> coefficients of the compiled penalty
+def set_admm_penalty(model, shared, dual, rho):
+    if model.conn_areas:
+        c, q, const = admm_penalty(shared, dual, rho)
+        model.admm_c.store_values(dict(zip(model.admm_keys, c.ravel().tolist())))
+        model.admm_const.set_value(const)
+    model.rho.set_value(rho)
+
+## Objective of the area plus dual*(x - shared) + rho/2*(x - shared)^2 for every tie-line flow x, in the compiled form
+## rho/2*x^2 + admm_c*x + admm_const with a diagonal quadratic term (see admm_penalty)
+def augmented_obj_function(model, **kwargs):
+    original_obj = objective_expression(model.obj_fcn, model)
+    linear = sum(model.admm_c[key] * x for key, x in model.tie_flows.items())
+    quadratic = sum((model.rho / 2) * x * x for x in model.tie_flows.values())
+    return original_obj + linear + quadratic + model.admm_const
 
-def initialize_shared_dual(area_info, data):
-    shared_vars = {}
-    dual_vars = {}
 
-    # Initialize shared variables and dual variables dynamically
-    for area in area_info.keys():
-        for idx, conn_area in enumerate(area_info[area]['down_areas']):
-            shared_vars[f"{area}_{conn_area}_p"] = [np.zeros((data['T'], 1))]
-            dual_vars[f"lambda_{area}_{conn_area}_p"] = [np.zeros((data['T'], 1))]
-        for idx, conn_area in enumerate(area_info[area]['up_area']):
-            shared_vars[f"{area}_{conn_area}_p"] = [np.zeros((data['T'], 1))]
-            dual_vars[f"lambda_{area}_{conn_area}_p"] = [np.zeros((data['T'], 1))]
+## Consensus values (tie-lines x T) and duals (ends x T) in the stacked layout of tie_lines, zero to start with. Only the
+## last 'keep' iterates are held in memory, log (a TrajectoryLog) receives all of them under 'shared' and 'dual'
+def initialize_shared_dual(tie_lines, T, keep=KEEP, log=None):
+    shared_vars = IterateHistory([np.zeros((len(tie_lines.edges), T))], keep, log, 'shared')
+    dual_vars = IterateHistory([np.zeros((len(tie_lines.end_keys), T))], keep, log, 'dual')
 
     return shared_vars, dual_vars
 
-def compute_locals(area_info,area_results):
-    p_local = {}
-
-    # Extract local variables
-    for area in area_info.keys():
-        area_p = area_results[area]['P']
-        for idx, conn_area in enumerate(area_info[area]['up_area']):
-            local_node_id = area_info[area]['up_local_node_id'][idx]
-            p_local[f"{area}_{conn_area}_p"] = np.vstack([area_results[area]['P_subs'][key] for key in area_results[area]['P_subs'].keys()])
-
-        for idx, conn_area in enumerate(area_info[area]['down_areas']):
-            local_node_id = area_info[area]['down_local_node_id'][idx]
-            p_local[f"{area}_{conn_area}_p"] = np.vstack([area_p[key] for key in area_p.keys() if key[1][1] == local_node_id])
-
-    return p_local
-
-def compute_globals(area_info,p_local):
-    p_global = {}
-
-    # Compute global variables as averages
-    for area in area_info.keys():
-        for idx, conn_area in enumerate(area_info[area]['down_areas']):
-            p_global[f"{area}_{conn_area}_p"] = (p_local[f"{area}_{conn_area}_p"] + p_local[f"{conn_area}_{area}_p"]) / 2
-
-        for idx, conn_area in enumerate(area_info[area]['up_area']):
-            p_global[f"{area}_{conn_area}_p"] = (p_local[f"{area}_{conn_area}_p"] + p_local[f"{conn_area}_{area}_p"]) / 2
-
-    return p_global
-
-def update_area_values(area_info,data_by_area,p_global):
-    for area in area_info.keys():
-        for idx, conn_area in enumerate(area_info[area]['down_areas']):
-            local_node_id = area_info[area]['down_local_node_id'][idx]
-            for t in data_by_area[area]['Tset']:
-                data_by_area[area]['p_L'][t,local_node_id] = p_global[f"{conn_area}_{area}_p"][t-1]
+## (ends x T) tie-line flows of every area: the substation power and the flows into the dummy nodes
+def compute_locals(tie_lines, area_flows):
+    return tie_lines.stack(area_flows)
+
+## Consensus values as the averages of the two ends of every tie-line
+def compute_globals(tie_lines, p_local):
+    return tie_lines.average(p_local)
+
+## Over-relaxed local values alpha*p_local + (1 - alpha)*previous consensus, used in place of p_local by the consensus and
+## dual updates. alpha in (1, 2) often speeds ADMM up, alpha=1 is plain ADMM
+def relax_locals(tie_lines, p_local, shared_vars, alpha):
+    if alpha == 1:
+        return p_local
+    return alpha * p_local + (1 - alpha) * tie_lines.spread(shared_vars[-1])
+
+## Primal residual ||p_local - p_global|| and dual residual rho*||p_global - previous|| of every tie-line over its two ends
+def tie_line_residuals(tie_lines, p_local, p_global, previous, rho):
+    primal = np.sqrt(tie_lines.ends.T @ np.sum((p_local - tie_lines.spread(p_global)) ** 2, axis=1))
+    dual = rho * np.sqrt(tie_lines.ends.T @ np.sum(tie_lines.spread(p_global - previous) ** 2, axis=1))
+    return primal, dual
+
+## Size of the local flows and consensus values (both per end) the primal residual is measured against, and of the duals
+## for the dual residual
+def residual_scales(p_local, p_global_ends, duals):
+    return max(np.linalg.norm(p_local), np.linalg.norm(p_global_ends)), np.linalg.norm(duals)
+
+def residual_tolerances(p_local, p_global_ends, duals, eps_abs, eps_rel):
+    """
+    Stopping tolerances of the primal and dual residual (Boyd et al., 2011, section 3.3.1): an absolute part that
+    grows with the square root of the number of boundary values plus a part relative to the residual_scales.
+    """
+    scale = np.sqrt(p_local.size) * eps_abs
+    scale_pri, scale_dual = residual_scales(p_local, p_global_ends, duals)
+    return scale + eps_rel * scale_pri, scale + eps_rel * scale_dual
+
+def balance_rho(rho, primal, dual, mu=10.0, tau=2.0):
+    """
+    Residual balancing: rho is multiplied by tau when the primal residual is more than mu times the dual residual and
+    divided by tau in the opposite case. Only the mutable penalty parameters of the area models change with it.
+    solve_ADMM balances the residuals relative to their residual_scales (Wohlberg, 2017): the flows are in kW and the
+    duals in $/kWh, so the absolute residuals differ by orders of magnitude at any rho and balancing them only drives rho
+    up.
+    """
+    if primal > mu * dual:
+        return rho * tau
+    if dual > mu * primal:
+        return rho / tau
+    return rho
+
+def update_lagrange(tie_lines, dual_vars, p_local, p_global, rho):
+    return dual_vars[-1] + rho * (p_local - tie_lines.spread(p_global))
+
+def share_global_dual(shared_vars, dual_vars, lagrange_update, p_global):
+    shared_vars.append(p_global)
+    dual_vars.append(lagrange_update)
 
-    return data_by_area
+    return shared_vars, dual_vars
 
-def update_lagrange(area_info,dual_vars,p_local,p_global,rho):
-    lagrange_update = {}
-    for area in area_info.keys():
-        for idx, conn_area in enumerate(area_info[area]['down_areas']):
-            lagrange_update[f"lambda_{area}_{conn_area}_p"] = dual_vars[f"lambda_{area}_{conn_area}_p"][-1] + rho * (p_local[f"{area}_{conn_area}_p"] - p_global[f"{area}_{conn_area}_p"])
-        for idx, conn_area in enumerate(area_info[area]['up_area']):
-            lagrange_update[f"lambda_{area}_{conn_area}_p"] = dual_vars[f"lambda_{area}_{conn_area}_p"][-1] + rho * (p_local[f"{area}_{conn_area}_p"] - p_global[f"{area}_{conn_area}_p"])
-    return lagrange_update
+## Largest change of a tie-line over the last iteration: rho*||consensus change||^2 or ||dual change||^2
+def admm_convergence(shared_vars, dual_vars, rho):
+    shared_change = rho * np.sum((shared_vars[-1] - shared_vars[-2]) ** 2, axis=1)
+    dual_change = np.sum((dual_vars[-1] - dual_vars[-2]) ** 2, axis=1)
+    return max(np.max(shared_change, initial=0.0), np.max(dual_change, initial=0.0))
+
+def save_admm_checkpoint(path, tie_lines, state, objective, convergence, iteration_stats):
+    """
+    Checkpoint of the coordinator state of solve_ADMM after iteration state['iteration']: consensus values, duals and
+    dummy node loads as they go into the next iteration, rho and the histories up to that iteration.
+    """
+    i = state['iteration']
+    arrays = {'shared': state['shared'], 'dual': state['dual'], **{f"loads_{area}": loads for area, loads in state['loads'].items()}}
+    meta = {'method': 'admm', 'iteration': i, 'rho': state['rho'], 'tie_lines': tie_lines.edges, 'areas': list(state['loads']),
+            'objective': {k: v for k, v in objective.items() if k <= i}, 'convergence': {k: v for k, v in convergence.items() if k <= i},
+            'iteration_stats': {key: values[:i + 1] for key, values in iteration_stats.items()}}
+    save_checkpoint(path, arrays, meta)
+
+## Coordinator state saved by save_admm_checkpoint, checked against the tie-lines and time periods of the run
+def load_admm_checkpoint(path, tie_lines, T):
+    arrays, meta = load_checkpoint(path, 'admm')
+    if [tuple(edge) for edge in meta['tie_lines']] != tie_lines.edges or arrays['shared'].shape[1] != T:
+        raise ValueError(f"{path} was saved for other areas or time periods")
+    return {'iteration': meta['iteration'], 'rho': meta['rho'], 'shared': arrays['shared'], 'dual': arrays['dual'],
+            'loads': {area: arrays[f"loads_{area}"] for area in meta['areas']}, 'objective': iteration_dict(meta['objective']),
+            'convergence': iteration_dict(meta['convergence']), 'iteration_stats': meta['iteration_stats']}
 
-def share_global_dual(area_info,shared_vars,dual_vars,lagrange_update,p_global):
+def arrange_solution_by_areas(area_info,area_results):
+    ## the lines into the dummy nodes of the downstream areas get the global node ids back, the arrays are shared
     for area in area_info.keys():
-        for idx, conn_area in enumerate(area_info[area]['down_areas']):
-            shared_vars[f"{area}_{conn_area}_p"].append(p_global[f"{area}_{conn_area}_p"])
-            dual_vars[f"lambda_{area}_{conn_area}_p"].append(lagrange_update[f"lambda_{area}_{conn_area}_p"])
-        for idx, conn_area in enumerate(area_info[area]['up_area']):
-            shared_vars[f"{area}_{conn_area}_p"].append(p_global[f"{area}_{conn_area}_p"])
-            dual_vars[f"lambda_{area}_{conn_area}_p"].append(lagrange_update[f"lambda_{area}_{conn_area}_p"])
+        dummy_nodes = {area_info[area]['down_local_node_id'][idx]: area_info[conn_area]['up_global_node_id'][0]
+                       for idx, conn_area in enumerate(area_info[area]['down_areas'])}
+        if dummy_nodes:
+            area_results[area] = area_results[area].relabel_lines(dummy_nodes)
 
-    return shared_vars,dual_vars
+    return area_results
 
-def arrange_solution_by_areas(area_info,area_results):
-    for area in area_info.keys():
-        for idx, conn_area in enumerate(area_info[area]['down_areas']):
-            local_node_id = area_info[area]['down_local_node_id'][idx]
-            global_node_id = area_info[conn_area]['up_global_node_id'][0]
-            for key, value in area_results[area].items():
-                if key in ['P']:  # For 'pij_values': key is (t, i, k)
-                    updated_dict = {}
-                    for (t, (i, k)), val in value.items():
-                        if k == local_node_id:
-                            updated_dict[(t, (i, global_node_id))] = val
-                        else:
-                            updated_dict[(t, (i, k))] = val
-                    area_results[area][key] = updated_dict
-
-    dopf = defaultdict(dict)
-    for area_name, vars_dict in area_results.items():
-        for key, value in vars_dict.items():
-            dopf[key][area_name] = value
-
-    return dopf
-
-def merge_solutions(dopf):
-    ## merging the area_wise dopf dictionary into one
-    dopfVals = {}
-    # Initialize containers for each variable
-    dopfVals['P_subs'] = {}
-    dopfVals['P'] = {}
-    dopfVals['Pe_c'] = {}
-    dopfVals['Pe_d'] = {}
-    dopfVals['P_c'] = {}
-    dopfVals['P_d'] = {}
-    dopfVals['B'] = {}
-
-    dopfVals["P_subs"] = {**dopf['P_subs']['area1']}
-    dopfVals["P"] = dict(ChainMap(*[dopf['P'][area] for area in dopf['P']]))
-    dopfVals["Pe_c"] = dict(ChainMap(*[dopf['Pe_c'][area] for area in dopf['Pe_c']]))
-    dopfVals["Pe_d"] = dict(ChainMap(*[dopf['Pe_d'][area] for area in dopf['Pe_d']]))
-    dopfVals["P_c"] = dict(ChainMap(*[dopf['P_c'][area] for area in dopf['P_c']]))
-    dopfVals["P_d"] = dict(ChainMap(*[dopf['P_d'][area] for area in dopf['P_d']]))
-    dopfVals["B"] = dict(ChainMap(*[dopf['B'][area] for area in dopf['B']]))
+def merge_solutions(dopf, root):
+    ## merging the area-wise results into one, with the substation power of the root area
+    dopfVals = merge_results(dopf, subs_from=root)
 
     return dopfVals
 
 
-def solve_ADMM(data, data_by_area, area_info, obj_fcn, rho, max_iterations):
-    shared_vars, dual_vars = initialize_shared_dual(area_info, data)
+## trajectory_path: folder to stream every consensus/dual iterate to (see Distributed/history.py), None keeps only the last ones
+## mode='async' runs the areas without a global barrier, at most 'staleness' solves ahead of their neighbours (see Distributed/async_admm.py)
+## adaptive_rho=True updates rho every iteration by residual balancing (balance_rho with mu, tau) of the relative residuals,
+## relaxation is the over-relaxation parameter alpha of relax_locals
+## dopfVals['stop_reason'] tells whether the run 'converged' or stopped at 'max_iterations'
+## eps_abs/eps_rel: stop once the primal and dual residuals are below residual_tolerances instead of once the largest
+## change of a tie-line is below 1e-5. eps_abs=None keeps that rule and ignores both, eps_abs=0 stops on eps_rel alone
+## telemetry_path: JSON lines file for the per iteration residuals
+## checkpoint_path: file the coordinator state is saved to every checkpoint_every iterations, at the end and when the run
+## is interrupted. resume_from continues the run of a checkpoint (iterations, histories, rho), seed_from only starts a new
+## run from its consensus values, duals and dummy node loads, e.g. the converged state of a run with other prices
+## executor: where the areas are solved, 'serial', 'thread' (with a thread-safe solver), 'process' (at most 'processes'
+## threads or workers, default one per core), 'auto' or 'tcp' with the options of TcpAreaWorkers in tcp (see Distributed/executors.py)
+def solve_ADMM(data, data_by_area, area_info, obj_fcn, rho, max_iterations, solver=None, warmstart=True, trajectory_path=None,
+               mode='sync', staleness=1, adaptive_rho=False, relaxation=1.0, mu=10.0, tau=2.0, eps_abs=None, eps_rel=1e-3,
+               telemetry_path=None, checkpoint_path=None, checkpoint_every=10, resume_from=None, seed_from=None,
+               executor='auto', processes=None, tcp=None):
+    if resume_from is not None and seed_from is not None:
+        raise ValueError("Give either resume_from or seed_from, not both")
+    if mode == 'async':
+        if adaptive_rho:
+            raise ValueError("adaptive_rho needs the global residuals of mode='sync'")
+        if checkpoint_path is not None or resume_from is not None or seed_from is not None:
+            raise ValueError("Checkpoints are only written and read by mode='sync'")
+        from Distributed.async_admm import solve_ADMM_async
+        return solve_ADMM_async(data, data_by_area, area_info, obj_fcn, rho, max_iterations, solver, warmstart, trajectory_path, staleness,
+                                relaxation=relaxation, eps_abs=eps_abs, eps_rel=eps_rel, telemetry_path=telemetry_path,
+                                executor=executor, processes=processes, tcp=tcp)
+    if mode != 'sync':
+        raise ValueError(f"Unknown ADMM mode '{mode}', expected 'sync' or 'async'")
+    log = TrajectoryLog(trajectory_path) if trajectory_path is not None else None
+    tie_lines = TieLines(area_info)
+    shared_vars, dual_vars = initialize_shared_dual(tie_lines, data['T'], log=log)
+    sink = TelemetrySink(telemetry_path, method='admm', mode='sync', tie_lines=tie_lines.edges, eps_abs=eps_abs, eps_rel=eps_rel) \
+        if telemetry_path is not None else None
 
     convergence = {}
     objective = {}
     aug_objective = {}
     area_folders = area_info.keys()
-    pool = mp.Pool(processes=len(area_folders))
-
-    for i in range(max_iterations):
-        results = pool.starmap(process_area,[(data_by_area[area], area, area_info, shared_vars, dual_vars, rho, obj_fcn) for area in area_folders])
-        area_results = {area_name: solutions for area_name, solutions in results}
-
-        p_local = compute_locals(area_info, area_results)
-
-        p_global = compute_globals(area_info, p_local)
-
-        data_by_area = update_area_values(area_info,data_by_area,p_global)
-
-        lagrange_update = update_lagrange(area_info, dual_vars, p_local, p_global,rho)
-
-        shared_vars, dual_vars = share_global_dual(area_info, shared_vars, dual_vars, lagrange_update, p_global)
-
-        ## Convergence Check
-        max_diff = {}
-
-        for area in area_folders:
-            max_diff[area] = []  # Initialize a list to store the max differences for the area
-
-            # Iterate over down_areas
-            for conn_area in area_info[area]['down_areas']:
-                max_diff[area].append(max(
-                    np.max(rho * (np.linalg.norm(shared_vars[f"{area}_{conn_area}_p"][-1] - shared_vars[f"{area}_{conn_area}_p"][-2]) ** 2)),
-                    np.max(np.linalg.norm(dual_vars[f"lambda_{area}_{conn_area}_p"][-1] - dual_vars[f"lambda_{area}_{conn_area}_p"][-2]) ** 2)
-                ))
-
-            # Iterate over up_area
-            for conn_area in area_info[area]['up_area']:
-                max_diff[area].append(max(
-                    np.max(rho * (np.linalg.norm(shared_vars[f"{area}_{conn_area}_p"][-1] - shared_vars[f"{area}_{conn_area}_p"][-2]) ** 2)),
-                    np.max(np.linalg.norm(dual_vars[f"lambda_{area}_{conn_area}_p"][-1] - dual_vars[f"lambda_{area}_{conn_area}_p"][-2]) ** 2)
-                ))
-
-        # Print statement for debugging
-        tol = np.max([np.max(sublist) for sublist in max_diff.values()])
-        convergence[i] = tol
-
-        if obj_fcn == cost_minimize_with_discharging_cost:
-            objective[i] = sum(area_results[area]['objective_value'] for area in area_folders) - sum(area_results[area]['P_subs'][t] * data['costshape'][t] for area in ['area2', 'area3', 'area4'] for t in data['Tset'])
-        else:
-            objective[i] = area_results['area1']['objective_value']
-        print(f"iteration = {i}, tolerance={tol}, objective value: {objective[i]}")
-
-        if tol < 1e-5:
-            print(f"Converged after {i} iterations")
-            print(f"total objective value for DOPF:{objective[i]}")
-            break
-
-    pool.close()
-    pool.join()
+    solver = solver or current_solver() ## passed explicitly, the workers may not share the solver setting of this process
+    iteration_stats = {'wall_time': [], 'solver_iterations': [], 'solve_time': [], 'ipc_bytes': [], 'rho': [], 'primal_residual': [], 'dual_residual': []}
+    settings = {'obj_fcn': obj_fcn, 'solver': solver, 'warmstart': warmstart}
+    layouts = {area: boundary_layout(area, area_info) for area in area_folders}
+    cost = np.array([data['costshape'][t] for t in data['Tset']])
+    root, downstream = root_area(area_info), downstream_areas(area_info) ## the substation power of the others is a load upstream
+    workers = area_executor(executor, init_area, solve_area, {area: data_by_area[area] for area in area_folders}, area_info, settings,
+                            layouts, data['T'], processes, tcp)
+    busy = {area: 0.0 for area in area_folders}
+    ## loads of the dummy nodes of the downstream areas, the consensus values of their tie-lines after the first iteration
+    loads = {area: boundary_loads(data_by_area[area], area_info[area]['down_local_node_id']) for area in area_folders}
+    first = 0
+    if resume_from is not None or seed_from is not None:
+        restored = load_admm_checkpoint(resume_from or seed_from, tie_lines, data['T'])
+        shared_vars.append(restored['shared'])
+        dual_vars.append(restored['dual'])
+        loads.update(restored['loads'])
+        if resume_from is not None:
+            first, rho = restored['iteration'] + 1, restored['rho']
+            objective, convergence = restored['objective'], restored['convergence']
+            iteration_stats = {key: restored['iteration_stats'].get(key, []) for key in iteration_stats}
+    ## state going into the next iteration, the arrays are replaced and never modified in place
+    state = {'iteration': first - 1, 'rho': rho, 'shared': shared_vars[-1], 'dual': dual_vars[-1], 'loads': dict(loads)}
+    saved = state['iteration']
+    stop_reason = 'max_iterations'
+    run_start = time.perf_counter()
+
+    try:
+        for i in range(first, max_iterations):
+            start = time.perf_counter()
+            for area in area_folders:
+                boundary = workers.boundary(area)
+                boundary['shared'][:] = tie_lines.area_consensus(shared_vars[-1], area)
+                boundary['dual'][:] = tie_lines.area_values(dual_vars[-1], area)
+                boundary['loads'][:] = loads[area]
+            with stage('area_solves', iteration=i):
+                solver_states = workers.solve(rho=rho, iteration=i, profile=worker_settings(iteration=i))
+            for area, status in solver_states.items():
+                add_records(status['profile'])
+                busy[area] += status['busy_s']
+
+            with stage('consensus_update', iteration=i):
+                ## stacked into a new array, the flow buffers of the workers are reused next iteration
+                p_local = compute_locals(tie_lines, {area: workers.boundary(area)['flows'] for area in area_folders})
+
+                p_relaxed = relax_locals(tie_lines, p_local, shared_vars, relaxation)
+
+                p_global = compute_globals(tie_lines, p_relaxed)
+
+                primal_tie_lines, dual_tie_lines = tie_line_residuals(tie_lines, p_local, p_global, shared_vars[-1], rho)
+                primal_residual, dual_residual = np.linalg.norm(primal_tie_lines), np.linalg.norm(dual_tie_lines)
+
+                for area in area_folders:
+                    loads[area] = p_global[tie_lines.down_edges[area]].T
+
+                lagrange_update = update_lagrange(tie_lines, dual_vars, p_relaxed, p_global, rho)
+
+                shared_vars, dual_vars = share_global_dual(shared_vars, dual_vars, lagrange_update, p_global)
+
+                ## Convergence Check
+                tol = admm_convergence(shared_vars, dual_vars, rho)
+                if eps_abs is not None:
+                    eps_pri, eps_dual = residual_tolerances(p_local, tie_lines.spread(p_global), lagrange_update, eps_abs, eps_rel)
+                    converged = primal_residual <= eps_pri and dual_residual <= eps_dual
+                else:
+                    eps_pri = eps_dual = None
+                    converged = tol < 1e-5
+            convergence[i] = tol
+
+            if obj_fcn == cost_minimize_with_discharging_cost:
+                objective[i] = sum(solver_states[area]['objective_value'] for area in area_folders) - sum(np.dot(solver_states[area]['P_subs'], cost) for area in downstream)
+            else:
+                objective[i] = solver_states[root]['objective_value']
+            iterations = [solver_states[area]['iterations'] for area in area_folders]
+            iteration_stats['solver_iterations'].append(None if None in iterations else sum(iterations))
+            iteration_stats['solve_time'].append(sum(solver_states[area]['solve_time'] for area in area_folders))
+            iteration_stats['ipc_bytes'].append(workers.ipc_bytes + workers.shared_bytes())
+            iteration_stats['rho'].append(rho)
+            iteration_stats['primal_residual'].append(primal_residual)
+            iteration_stats['dual_residual'].append(dual_residual)
+            iteration_stats['wall_time'].append(time.perf_counter() - start)
+            if sink is not None:
+                sink.record(iteration=i, objective=objective[i], rho=rho, change=tol, primal=primal_residual, dual=dual_residual,
+                            eps_pri=eps_pri, eps_dual=eps_dual, wall_time=iteration_stats['wall_time'][-1],
+                            primal_tie_lines=primal_tie_lines, dual_tie_lines=dual_tie_lines)
+            print(f"iteration = {i}, tolerance={tol}, objective value: {objective[i]}, "
+                  f"solver iterations: {iteration_stats['solver_iterations'][-1]}, time: {iteration_stats['wall_time'][-1]:.3f} s"
+                  + (f", rho: {rho:.3g}" if adaptive_rho else ""))
+
+            if not converged and adaptive_rho:
+                scale_pri, scale_dual = residual_scales(p_local, tie_lines.spread(p_global), lagrange_update)
+                if scale_pri > 0 and scale_dual > 0:
+                    rho = balance_rho(rho, primal_residual / scale_pri, dual_residual / scale_dual, mu, tau) ## used by the next solves and dual update
+            state = {'iteration': i, 'rho': rho, 'shared': shared_vars[-1], 'dual': dual_vars[-1], 'loads': dict(loads)}
+            if checkpoint_path is not None and (i + 1) % checkpoint_every == 0:
+                save_admm_checkpoint(checkpoint_path, tie_lines, state, objective, convergence, iteration_stats)
+                saved = i
+
+            if converged:
+                stop_reason = 'converged'
+                print(f"Converged after {i} iterations")
+                print(f"total objective value for DOPF:{objective[i]}")
+                break
+
+        area_results = workers.results()
+    finally:
+        if checkpoint_path is not None and state['iteration'] > saved:
+            save_admm_checkpoint(checkpoint_path, tie_lines, state, objective, convergence, iteration_stats) ## also when interrupted
+        workers.close()
+        if log is not None:
+            log.close()
+        if sink is not None:
+            sink.close()
+    stats = worker_stats({area: len(objective) - first for area in area_folders}, busy, time.perf_counter() - run_start)
+    print_worker_report(stats)
 
     dopf = arrange_solution_by_areas(area_info, area_results)
 
-    dopfVals = merge_solutions(dopf)
+    dopfVals = merge_solutions(dopf, root)
+    dopfVals['worker_stats'] = stats ## solves, busy and idle time of every area worker
+    dopfVals['executor'] = workers.executor
+    dopfVals['iteration_stats'] = iteration_stats ## per outer iteration: wall time, solver iterations, solve time summed over the areas and bytes exchanged with the workers
+    dopfVals['stop_reason'] = stop_reason ## 'converged' or 'max_iterations'
 
     return dopfVals,objective,aug_objective,convergence
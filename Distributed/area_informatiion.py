@@ -4,6 +4,8 @@
    each areas. Global Nodes are already present in the original system and local nodes are introduced for each
    sub-systems connecting tie-lines to solve the distributed optimization
 """
+import json
+import os
 ## area separation into 4 areas
 
 avista_sys_area_info = {
@@ -44,4 +46,24 @@ avista_sys_area_info = {
         'down_global_node_id': []
 
     },
-}
\ No newline at end of file
+}
+
+## The area at the substation, the only one without an upstream area
+def root_area(area_info):
+    roots = [area for area, info in area_info.items() if not info['up_area']]
+    if len(roots) != 1:
+        raise ValueError(f"Expected one area without up_area, found {roots}")
+    return roots[0]
+
+## Areas with an upstream area, whose substation power is the load of a dummy node of that area
+def downstream_areas(area_info):
+    return [area for area, info in area_info.items() if info['up_area']]
+
+## Returns the area information of a system: <system_name>_area_info defined above, or else the area_info.json written
+## next to its csvs by Benchmark/generate_feeder.py
+def get_area_info(system_name):
+    if f"{system_name}_area_info" in globals():
+        return globals()[f"{system_name}_area_info"]
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    with open(os.path.join(root, "rawData", system_name, "area_info.json")) as f:
+        return json.load(f)
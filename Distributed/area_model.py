@@ -0,0 +1,54 @@
+"""
+This script keeps the Pyomo model of every area alive across the iterations of the distributed algorithms. An area model
+is built once per run and process, with the loads of its dummy (down_local_node_id) nodes held as mutable parameters.
+Later iterations only push the updated boundary loads (and for ADMM the shared/dual values and rho) into the parameters.
+"""
+import numpy as np
+from Build_Model.Constraints import build_pyomo_model, MODEL_LOCK
+from Build_Model.solvers import get_solver, get_basis
+
+_area_models = {} ## per process cache: (run_id, area_name) -> model
+AREA_VARS = ('P_subs', 'P', 'Pe_c', 'Pe_d', 'P_c', 'P_d', 'B')
+
+def get_area_model(run_id, data_area, area_name, area_info, build_fcn=None):
+    """
+    Returns the cached model of the area for this run, building it on the first call. build_fcn(model) can add
+    algorithm specific components (e.g. the ADMM parameters) to a freshly built model. Threads build one model at a time.
+    """
+    key = (run_id, area_name)
+    with MODEL_LOCK:
+        model = _area_models.get(key)
+        if model is None:
+            for old_key in [k for k in _area_models if k[0] != run_id]:
+                del _area_models[old_key] ## models of earlier runs are never used again
+            model = build_pyomo_model(data_area, mutable_load_nodes=area_info[area_name]['down_local_node_id'])
+            if build_fcn is not None:
+                build_fcn(model)
+            _area_models[key] = model
+    return model
+
+## Copies the current loads of the dummy nodes from the area data into the mutable load parameters
+def update_boundary_loads(model, data_area):
+    set_boundary_loads(model, boundary_loads(data_area, model.mutable_load_nodes))
+
+## (T x n) loads of the given dummy nodes in the area data
+def boundary_loads(data_area, nodes):
+    p_L = data_area['p_L']
+    return np.array([[np.asarray(p_L[t, j]).item() for j in nodes] for t in data_area['Tset']], dtype=float).reshape(len(data_area['Tset']), len(nodes))
+
+## Sets the mutable loads of the dummy nodes from a (T x n) array, columns in mutable_load_nodes order
+def set_boundary_loads(model, loads):
+    keys = [(t, j) for t in model.Tset for j in model.mutable_load_nodes]
+    model.p_L_mutable.store_values(dict(zip(keys, np.ravel(loads).tolist())))
+
+## Starts the next solve of the area from its previous solution (Results of store_results), which may come from another process
+def load_warm_start(model, solutions):
+    for name in AREA_VARS:
+        for v, x in zip(getattr(model, name).values(), solutions.arrays[name].ravel().tolist()):
+            v.set_value(x, skip_validation=True)
+
+## Solver basis of the last solve, to warm start the area in whichever process solves it next, the solver that solved it
+## and the solver iterations and time of the solve for the iteration report
+def solver_state(model, solver=None):
+    name, opt = get_solver(model, solver)
+    return {'basis': get_basis(opt), 'solver': name, 'iterations': model.solver_iterations, 'solve_time': model.solve_time}
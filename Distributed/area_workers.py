@@ -0,0 +1,238 @@
+"""
+This script runs every area of a distributed algorithm in its own long-lived worker process. A worker receives the data
+of its area once when it starts, keeps the area model (and its persistent solver, basis included) resident, and per
+iteration only exchanges boundary vectors with the coordinator:
+
+    shared memory   (T x n) arrays of the area by name, e.g. the consensus values, duals and dummy node loads written
+                    by the coordinator and the tie-line flows written back by the worker
+    pipe            a small command ('solve', parameters such as rho) and a small status record in return
+
+so the data moved per iteration scales with the number of tie-lines, not with the size of the feeder. A worker can host
+several areas (processes=n spreads them over n workers) and solves them one after the other. The algorithm supplies two
+module level functions: init_fcn(data_area, area_name, area_info, settings) -> model, run once per area in its worker,
+and step_fcn(model, boundary, params) -> status dict, run for every 'solve'.
+"""
+import multiprocessing as mp
+import pickle
+import time
+import traceback
+from collections import deque
+from multiprocessing.connection import wait
+from multiprocessing.shared_memory import SharedMemory
+import numpy as np
+from Build_Model.store import store_results
+from Profiling.stages import worker_stage
+
+
+class BoundaryBuffers:
+    """
+    (T x n) float arrays of one area by name, laid out back to back in one shared memory block. Forked workers inherit
+    the mapping, otherwise the block is attached again by name when the buffers are unpickled.
+    """
+    def __init__(self, T, layout, name=None):
+        self.T = T
+        self.layout = dict(layout) ## array name -> number of columns
+        self.nbytes = 8 * T * sum(self.layout.values())
+        if name is None:
+            self.shm = SharedMemory(create=True, size=max(self.nbytes, 8))
+        else:
+            self.shm = SharedMemory(name=name)
+        self.arrays = {}
+        offset = 0
+        for key, n in self.layout.items():
+            self.arrays[key] = np.ndarray((T, n), dtype=float, buffer=self.shm.buf, offset=offset)
+            offset += 8 * T * n
+        if name is None:
+            for values in self.arrays.values():
+                values[:] = 0.0
+
+    def __getstate__(self):
+        return {'T': self.T, 'layout': self.layout, 'name': self.shm.name}
+
+    def __setstate__(self, state):
+        self.__init__(state['T'], state['layout'], state['name'])
+
+    def close(self, unlink=False):
+        self.arrays = {} ## the views must be gone before the block can be closed
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
+
+
+def _send(conn, message):
+    data = pickle.dumps(message, protocol=pickle.HIGHEST_PROTOCOL)
+    conn.send_bytes(data)
+    return len(data)
+
+def _worker_loop(conn, buffers, init_fcn, step_fcn, data_by_area, area_info, settings):
+    models, errors = {}, {}
+    for area_name, data_area in data_by_area.items():
+        try:
+            models[area_name] = init_fcn(data_area, area_name, area_info, settings)
+        except Exception:
+            errors[area_name] = traceback.format_exc() ## reported on the first command instead of leaving the coordinator waiting
+    while True:
+        command, area_name, params = pickle.loads(conn.recv_bytes())
+        if command == 'close':
+            break
+        if area_name in errors:
+            _send(conn, {'error': errors[area_name]})
+            continue
+        try:
+            if command == 'solve':
+                start = time.perf_counter()
+                with worker_stage(params.get('profile'), 'area_solve', area=area_name) as records:
+                    status = step_fcn(models[area_name], buffers[area_name].arrays, params)
+                status['profile'] = records
+                status['busy_s'] = time.perf_counter() - start
+                _send(conn, status)
+            elif command == 'results':
+                _send(conn, store_results(models[area_name]))
+            else:
+                raise ValueError(f"Unknown command '{command}'")
+        except Exception:
+            _send(conn, {'error': traceback.format_exc()})
+    for area_buffers in buffers.values():
+        area_buffers.close()
+    conn.close()
+
+## Areas of data_by_area spread over n groups of about the same total size (number of nodes), largest areas first
+def group_areas(data_by_area, n):
+    groups, sizes = [[] for _ in range(n)], [0] * n
+    for area in sorted(data_by_area, key=lambda area: -len(data_by_area[area]['Nset'])):
+        k = sizes.index(min(sizes))
+        groups[k].append(area)
+        sizes[k] += len(data_by_area[area]['Nset'])
+    return [group for group in groups if group]
+
+
+class AreaWorkers:
+    """
+    Worker processes for the areas of data_by_area, one per area or 'processes' of them hosting several areas each.
+    layouts[area] gives the boundary arrays of the area as {name: columns}, all with T rows. Use as a context manager,
+    or call close() to stop the workers.
+    """
+    executor = 'process'
+
+    def __init__(self, init_fcn, step_fcn, data_by_area, area_info, settings, layouts, T, processes=None):
+        ctx = mp.get_context()
+        self.areas = list(data_by_area)
+        self.buffers, self.conns, self.processes = {}, {}, []
+        self.pending = {} ## connection -> areas whose replies are still to be read, in the order the worker sends them
+        self.replies = {} ## replies read ahead of the area they were asked for
+        self.ipc_bytes = 0 ## bytes of the pipe messages in both directions since the last solve()
+        for area in self.areas:
+            self.buffers[area] = BoundaryBuffers(T, layouts[area])
+        n = len(self.areas) if processes is None else max(1, min(processes, len(self.areas)))
+        for group in group_areas(data_by_area, n):
+            conn, child_conn = ctx.Pipe()
+            process = ctx.Process(target=_worker_loop, name=f"area-worker-{'-'.join(group)}", daemon=True,
+                                  args=(child_conn, {area: self.buffers[area] for area in group}, init_fcn, step_fcn,
+                                        {area: data_by_area[area] for area in group}, area_info, settings))
+            process.start()
+            child_conn.close() ## recv() raises EOFError instead of blocking if the worker dies
+            self.processes.append(process)
+            self.pending[conn] = deque()
+            for area in group:
+                self.conns[area] = conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    ## Boundary arrays of an area by name, written in place by the coordinator before solve() and read after it
+    def boundary(self, area):
+        return self.buffers[area].arrays
+
+    def _request(self, command, area, params=None):
+        conn = self.conns[area]
+        self.ipc_bytes += _send(conn, (command, area, params))
+        self.pending[conn].append(area)
+
+    def _receive(self, area):
+        conn = self.conns[area]
+        while area not in self.replies:
+            head = self.pending[conn].popleft() ## a worker answers in the order it was asked
+            try:
+                data = conn.recv_bytes()
+            except EOFError:
+                raise RuntimeError(f"Worker of {head} exited unexpectedly") from None
+            self.ipc_bytes += len(data)
+            self.replies[head] = pickle.loads(data)
+        reply = self.replies.pop(area)
+        if isinstance(reply, dict) and 'error' in reply:
+            raise RuntimeError(f"Worker of {area} failed:\n{reply['error']}")
+        return reply
+
+    def solve(self, areas=None, **params):
+        """
+        Solves the given areas (default: all) in parallel with the current contents of their boundary arrays and
+        returns their status records by area. params (e.g. rho, iteration) are passed to step_fcn.
+        """
+        areas = self.areas if areas is None else list(areas)
+        self.ipc_bytes = 0
+        for area in areas:
+            self.submit(area, **params)
+        return {area: self._receive(area) for area in areas}
+
+    ## Starts a solve of one area without waiting for it, its status is collected with ready() and receive()
+    def submit(self, area, **params):
+        self._request('solve', area, params)
+
+    ## Areas whose submitted solve has finished, waiting up to timeout seconds (None: until at least one has)
+    def ready(self, areas=None, timeout=None):
+        areas = set(self.areas if areas is None else areas)
+        done = [area for area in areas if area in self.replies]
+        if done:
+            return done
+        conns = [conn for conn, queue in self.pending.items() if queue and queue[0] in areas]
+        return [self.pending[conn][0] for conn in wait(conns, timeout)]
+
+    def receive(self, area):
+        return self._receive(area)
+
+    ## Full Results of every area from its last solve, only fetched once at the end of a run
+    def results(self):
+        for area in self.areas:
+            self._request('results', area)
+        return {area: self._receive(area) for area in self.areas}
+
+    ## Bytes moved through the shared memory per solve of all areas (every boundary array written once)
+    def shared_bytes(self):
+        return sum(buffers.nbytes for buffers in self.buffers.values())
+
+    def close(self):
+        for conn in self.pending:
+            try:
+                _send(conn, ('close', None, None))
+            except (BrokenPipeError, OSError):
+                pass ## the worker is already gone
+        for process in self.processes:
+            process.join(timeout=10)
+            if process.is_alive():
+                process.terminate()
+        for conn in self.pending:
+            conn.close()
+        for buffers in self.buffers.values():
+            buffers.close(unlink=True)
+        self.conns, self.pending, self.processes, self.buffers = {}, {}, [], {}
+
+
+def worker_stats(solves, busy, wall_time):
+    """
+    Throughput and idle time of every area worker over a run of wall_time seconds, from the number of solves and the
+    busy seconds (sum of the busy_s of its status records) of every area.
+    """
+    stats = {}
+    for area in solves:
+        stats[area] = {'solves': solves[area], 'busy_s': busy[area], 'idle_s': max(wall_time - busy[area], 0.0),
+                       'solves_per_s': solves[area] / wall_time if wall_time > 0 else 0.0,
+                       'utilization': busy[area] / wall_time if wall_time > 0 else 0.0}
+    return stats
+
+def print_worker_report(stats):
+    print(f"{'area':>8} {'solves':>7} {'busy [s]':>9} {'idle [s]':>9} {'solves/s':>9} {'util':>6}")
+    for area, s in stats.items():
+        print(f"{area:>8} {s['solves']:7d} {s['busy_s']:9.3f} {s['idle_s']:9.3f} {s['solves_per_s']:9.2f} {100 * s['utilization']:5.1f}%")
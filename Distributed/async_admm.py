@@ -0,0 +1,182 @@
+"""
+This script runs ADMM without a global barrier. The areas solve in their resident workers (Distributed/area_workers.py)
+and the coordinator reacts to every finished solve:
+
+    - the consensus value and the duals of a tie-line are updated as soon as both areas at its ends have reported a
+      flow for their current inputs (a new one, or the last one of an idle area whose inputs did not change since)
+    - an idle area re-solves as soon as one of its inputs changed
+
+Staleness is bounded: an area may run at most 'staleness' solves ahead of any of its neighbours, staleness=0 keeps
+neighbours in lock step. The updates are the ones of solve_ADMM (with its over-relaxation), applied to one row of the
+stacked tie-line arrays (Distributed/tie_lines.py) at a time. A round ends whenever every area has finished one more
+solve, the objective and the convergence measure are recorded per round like the iterations of solve_ADMM, and so are
+the consensus values and duals of a trajectory log.
+"""
+import time
+import numpy as np
+from Build_Model.Objective import cost_minimize_with_discharging_cost
+from Build_Model.solvers import current_solver
+from Distributed.admm import init_area, solve_area, boundary_layout, initialize_shared_dual, arrange_solution_by_areas, merge_solutions, \
+    tie_line_residuals, residual_tolerances
+from Distributed.area_model import boundary_loads
+from Distributed.area_workers import worker_stats, print_worker_report
+from Distributed.executors import area_executor
+from Distributed.history import TrajectoryLog
+from Distributed.area_informatiion import root_area, downstream_areas
+from Distributed.tie_lines import TieLines
+from Distributed.telemetry import TelemetrySink
+from Profiling.stages import worker_settings, add_records
+
+def solve_ADMM_async(data, data_by_area, area_info, obj_fcn, rho, max_iterations, solver=None, warmstart=True,
+                     trajectory_path=None, staleness=1, tol=1e-5, relaxation=1.0, eps_abs=None, eps_rel=1e-3, telemetry_path=None,
+                     executor='auto', processes=None, tcp=None):
+    log = TrajectoryLog(trajectory_path) if trajectory_path is not None else None
+    tie_lines = TieLines(area_info)
+    shared_vars, dual_vars = initialize_shared_dual(tie_lines, data['T'], log=log)
+    sink = TelemetrySink(telemetry_path, method='admm', mode='async', staleness=staleness, tie_lines=tie_lines.edges,
+                         eps_abs=eps_abs, eps_rel=eps_rel) if telemetry_path is not None else None
+    shared, dual = shared_vars[-1].copy(), dual_vars[-1].copy() ## current values, updated one tie-line at a time
+    areas = list(area_info.keys())
+    conn = {area: area_info[area]['up_area'] + area_info[area]['down_areas'] for area in areas}
+    edges = tie_lines.edges ## (parent, child) tie-lines
+    end_area = [area for area, _ in tie_lines.end_keys]
+    down_column = {e: col for area in areas for col, e in enumerate(tie_lines.down_edges[area])}
+    cost = np.array([data['costshape'][t] for t in data['Tset']])
+    root, downstream = root_area(area_info), downstream_areas(area_info) ## the substation power of the others is a load upstream
+
+    solver = solver or current_solver()
+    settings = {'obj_fcn': obj_fcn, 'solver': solver, 'warmstart': warmstart}
+    layouts = {area: boundary_layout(area, area_info) for area in areas}
+    workers = area_executor(executor, init_area, solve_area, {area: data_by_area[area] for area in areas}, area_info, settings,
+                            layouts, data['T'], processes, tcp)
+
+    flows = np.zeros_like(dual)               ## latest tie-line flow reported for every end
+    reported = np.zeros(len(end_area), dtype=bool)
+    fresh = np.zeros(len(end_area), dtype=bool) ## flow not yet used in a tie-line update
+    residual = np.full(len(edges), np.inf)
+    loads = {area: boundary_loads(data_by_area[area], area_info[area]['down_local_node_id']) for area in areas}
+    solves = {area: 0 for area in areas}
+    busy = {area: 0.0 for area in areas}
+    states = {}
+    running, dirty = set(), set(areas)        ## dirty: inputs changed since the area was last submitted
+    objective, aug_objective, convergence = {}, {}, {}
+    iteration_stats = {'wall_time': [], 'solver_iterations': [], 'solve_time': [], 'ipc_bytes': []}
+    round_start = run_start = time.perf_counter()
+    round_stats = {'solver_iterations': 0, 'solve_time': 0.0}
+
+    def write_inputs(area):
+        boundary = workers.boundary(area)
+        boundary['shared'][:] = tie_lines.area_consensus(shared, area)
+        boundary['dual'][:] = tie_lines.area_values(dual, area)
+        boundary['loads'][:] = loads[area]
+
+    ## the last flow of an idle area with unchanged inputs is what it would report again
+    def settled(k):
+        return fresh[k] or (reported[k] and end_area[k] not in running and end_area[k] not in dirty)
+
+    def update_tie_line(e):
+        ends = tie_lines.edge_ends[e] ## (parent end, child end)
+        previous = shared[e]
+        relaxed = relaxation * flows[ends] + (1 - relaxation) * previous
+        p_global = (relaxed[0] + relaxed[1]) / 2
+        new_dual = dual[ends] + rho * (relaxed - p_global)
+        residual[e] = max(rho * np.sum((p_global - previous) ** 2), np.max(np.sum((new_dual - dual[ends]) ** 2, axis=1)))
+        shared[e] = p_global
+        dual[ends] = new_dual
+        fresh[ends] = False
+        parent, child = edges[e]
+        loads[parent][:, down_column[e]] = p_global ## the dummy node of the parent carries the consensus flow as its load
+        dirty.update((parent, child))
+
+    def eligible(area):
+        return area not in running and area in dirty and solves[area] < max_iterations and \
+            all(solves[area] - solves[other] <= staleness for other in conn[area])
+
+    try:
+        while True:
+            for area in areas:
+                if eligible(area):
+                    write_inputs(area)
+                    workers.submit(area, rho=rho, iteration=solves[area], profile=worker_settings(iteration=solves[area]))
+                    running.add(area)
+                    dirty.discard(area)
+            if not running:
+                stop_reason = 'max_iterations' if min(solves.values()) >= max_iterations else 'fixed_point'
+                break ## no area has new inputs: a fixed point, or every area reached max_iterations
+
+            for area in workers.ready(running):
+                state = workers.receive(area)
+                running.discard(area)
+                solves[area] += 1
+                busy[area] += state['busy_s']
+                states[area] = state
+                add_records(state['profile'])
+                round_stats['solve_time'] += state['solve_time']
+                if state['iterations'] is None or round_stats['solver_iterations'] is None:
+                    round_stats['solver_iterations'] = None
+                else:
+                    round_stats['solver_iterations'] += state['iterations']
+                rows = tie_lines.rows[area]
+                flows[rows] = workers.boundary(area)['flows'].T
+                reported[rows] = fresh[rows] = True
+                for e in tie_lines.area_edges(area):
+                    if all(settled(k) for k in tie_lines.edge_ends[e]):
+                        update_tie_line(e)
+
+            i = len(objective)
+            if min(solves.values()) > i: ## every area finished one more solve: record the round
+                convergence[i] = np.max(residual, initial=0.0)
+                shared_vars.append(shared.copy())
+                dual_vars.append(dual.copy())
+                ## residuals of the round: latest flows against the consensus, consensus against the one of the last round
+                primal_tie_lines, dual_tie_lines = tie_line_residuals(tie_lines, flows, shared_vars[-1], shared_vars[-2], rho)
+                primal_residual, dual_residual = np.linalg.norm(primal_tie_lines), np.linalg.norm(dual_tie_lines)
+                if eps_abs is not None:
+                    eps_pri, eps_dual = residual_tolerances(flows, tie_lines.spread(shared), dual, eps_abs, eps_rel)
+                    converged = primal_residual <= eps_pri and dual_residual <= eps_dual
+                else:
+                    eps_pri = eps_dual = None
+                    converged = convergence[i] < tol
+                if obj_fcn == cost_minimize_with_discharging_cost:
+                    objective[i] = sum(states[area]['objective_value'] for area in areas) - sum(np.dot(states[area]['P_subs'], cost) for area in downstream)
+                else:
+                    objective[i] = states[root]['objective_value']
+                iteration_stats['solver_iterations'].append(round_stats['solver_iterations'])
+                iteration_stats['solve_time'].append(round_stats['solve_time'])
+                iteration_stats['ipc_bytes'].append(workers.ipc_bytes)
+                iteration_stats['wall_time'].append(time.perf_counter() - round_start)
+                round_start = time.perf_counter()
+                round_stats = {'solver_iterations': 0, 'solve_time': 0.0}
+                workers.ipc_bytes = 0
+                if sink is not None:
+                    sink.record(iteration=i, objective=objective[i], rho=rho, change=convergence[i], primal=primal_residual,
+                                dual=dual_residual, eps_pri=eps_pri, eps_dual=eps_dual, wall_time=iteration_stats['wall_time'][-1],
+                                solves=sum(solves.values()), primal_tie_lines=primal_tie_lines, dual_tie_lines=dual_tie_lines)
+                print(f"round = {i}, tolerance={convergence[i]}, objective value: {objective[i]}, "
+                      f"solves: {sum(solves.values())}, time: {iteration_stats['wall_time'][-1]:.3f} s")
+                if converged:
+                    stop_reason = 'converged'
+                    print(f"Converged after {i} rounds")
+                    print(f"total objective value for DOPF:{objective[i]}")
+                    break
+
+        for area in list(running):
+            workers.receive(area) ## results are only fetched from idle workers
+        area_results = workers.results()
+    finally:
+        workers.close()
+        if log is not None:
+            log.close()
+        if sink is not None:
+            sink.close()
+    stats = worker_stats(solves, busy, time.perf_counter() - run_start)
+    print_worker_report(stats)
+
+    dopf = arrange_solution_by_areas(area_info, area_results)
+    dopfVals = merge_solutions(dopf, root)
+    dopfVals['worker_stats'] = stats ## solves, busy and idle time of every area worker
+    dopfVals['executor'] = workers.executor
+    dopfVals['iteration_stats'] = iteration_stats ## per round: wall time, solver iterations and solve time of the solves finished in it, bytes exchanged
+    dopfVals['stop_reason'] = stop_reason ## 'converged', 'fixed_point' (no area got new inputs) or 'max_iterations'
+
+    return dopfVals, objective, aug_objective, convergence
@@ -0,0 +1,49 @@
+"""
+This script saves and restores the coordinator state of ADMM and EnAPP, so a long run can be resumed after an
+interruption, or a new run (e.g. with other prices) can start from the converged state of an earlier one. A checkpoint
+is a single .npz file with the latest boundary arrays (consensus values, duals, dummy node loads) and a JSON record of
+the scalars (iteration, rho, ...) and per iteration histories. It is written to a temporary file and renamed over the
+previous checkpoint, so an interrupted write never leaves a broken or half updated checkpoint behind.
+"""
+import json
+import os
+import numpy as np
+
+CHECKPOINT_VERSION = 1 ## bump whenever the saved state changes
+
+def _to_json(o):
+    if isinstance(o, np.generic):
+        return o.item()
+    if isinstance(o, np.ndarray):
+        return o.tolist()
+    raise TypeError(f"{type(o).__name__} is not JSON serializable")
+
+def save_checkpoint(path, arrays, meta):
+    """
+    Atomically replaces the checkpoint at path with the given arrays (name -> ndarray) and meta (JSON serializable,
+    'method' names the algorithm).
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        np.savez(f, _meta=np.array(json.dumps({'version': CHECKPOINT_VERSION, **meta}, default=_to_json)), **arrays)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+def load_checkpoint(path, method=None):
+    """
+    (arrays, meta) of the checkpoint at path, method checks the algorithm it was written by.
+    """
+    with np.load(path, allow_pickle=False) as f:
+        meta = json.loads(str(f['_meta']))
+        arrays = {name: f[name] for name in f.files if name != '_meta'}
+    if meta.get('version') != CHECKPOINT_VERSION:
+        raise ValueError(f"{path} was saved with checkpoint version {meta.get('version')}, expected {CHECKPOINT_VERSION}")
+    if method is not None and meta.get('method') != method:
+        raise ValueError(f"{path} is a checkpoint of {meta.get('method')}, not {method}")
+    return arrays, meta
+
+## {iteration: value} histories of solve_ADMM/solve_EnAPP back from JSON, whose object keys are strings
+def iteration_dict(values):
+    return {int(i): val for i, val in values.items()}
@@ -1,27 +1,52 @@
 """
 This script does the distributed optimization using EnAPP Approach.
+
+The substation power of an area only enters the model of its upstream area, as the load of the dummy node, so
+information moves up the area tree. schedule='sweep' solves every area in every iteration and needs an iteration per
+level of the tree to carry it to the root. schedule='wavefront' solves the areas by depth within one iteration, the
+deepest first, each level with the substation powers its downstream areas have just reported, and only solves an area
+again once those dummy node loads changed by more than tol since its last solve.
 """
-import multiprocessing as mp
+import time
+import uuid
 from Build_Model.Objective import cost_minimize_with_discharging_cost,cost_minimize,substation_power_minimize_with_discharge_cost,substation_power_minimize,pyomo_solve
-from Build_Model.Constraints import build_pyomo_model
 from Build_Model.store import store_results
-from collections import defaultdict,ChainMap
+from Build_Model.results import merge_results
+from Build_Model.solvers import current_solver, thread_safe_solver
+from Distributed.area_informatiion import root_area, downstream_areas
+from Distributed.area_model import get_area_model, update_boundary_loads, load_warm_start, solver_state
+from Distributed.history import IterateHistory, TrajectoryLog, KEEP
+from Distributed.telemetry import TelemetrySink
+from Distributed.executors import area_pool, choose_executor, SerialPool, ThreadPool
+from Distributed.checkpoint import save_checkpoint, load_checkpoint, iteration_dict
+from Profiling.stages import stage, worker_stage, worker_settings, add_records
 import numpy as np
 
-def process_area(data_areas,area_name,obj_fcn):
-    model = build_pyomo_model(data_areas)
-
-    model = pyomo_solve(model,obj_fcn)
-    solutions = store_results(model)
-    return area_name, solutions
-
-def initialize_shared_dual(area_info, data):
+## warm_start is (solutions, basis) of the area from the previous iteration (either may be None), None solves it from a cold start
+## profile is worker_settings() of the main process, the profiled stages of the area are returned in the solver state
+def process_area(data_areas,area_name,area_info,obj_fcn,run_id=None,solver=None,warm_start=None,profile=None):
+    with worker_stage(profile, 'area_solve', area=area_name) as profile_records:
+        model = get_area_model(run_id, data_areas, area_name, area_info)
+        update_boundary_loads(model, data_areas)
+
+        if warm_start is not None and warm_start[0] is not None:
+            load_warm_start(model, warm_start[0])
+        model = pyomo_solve(model,obj_fcn,solver=solver,warmstart=warm_start is not None,
+                            basis=None if warm_start is None else warm_start[1])
+        if not model.solved:
+            raise RuntimeError(f"{area_name} could not be solved")
+        solutions = store_results(model)
+    return area_name, solutions, {**solver_state(model, solver), 'profile': profile_records}
+
+## Only the last 'keep' iterates of every vector are held in memory, log (a TrajectoryLog) receives all of them
+def initialize_shared_dual(area_info, data, keep=KEEP, log=None):
     shared_vars = {}
 
     # Initialize shared variables dynamically
     for area in area_info.keys():
         for idx, conn_area in enumerate(area_info[area]['up_area']):
-            shared_vars[f"{area}_{conn_area}_p"] = [np.zeros((data['T'], 1))]
+            key = f"{area}_{conn_area}_p"
+            shared_vars[key] = IterateHistory([np.zeros((data['T'], 1))], keep, log, key)
 
     return shared_vars
 
@@ -30,21 +55,40 @@ def compute_locals(area_info,area_results):
 
     # Extract local variables
     for area in area_info.keys():
-        area_p = area_results[area]['P_subs']
         for idx, conn_area in enumerate(area_info[area]['up_area']):
-            local_node_id = area_info[area]['up_local_node_id'][idx]
-            p_local[f"{area}_{conn_area}_p"] = np.vstack([area_p[key] for key in area_p.keys()])
+            p_local[f"{area}_{conn_area}_p"] = area_results[area].arrays['P_subs'][:, None] ## (T x 1) view of the result array
 
     return p_local
 
-def update_area_values(area_info,data_by_area,p_local):
-    for area in area_info.keys():
+## areas: the areas whose dummy node loads are updated, all by default
+def update_area_values(area_info,data_by_area,p_local,areas=None):
+    for area in (area_info.keys() if areas is None else areas):
         for idx, conn_area in enumerate(area_info[area]['down_areas']):
             local_node_id = area_info[area]['down_local_node_id'][idx]
             for t in data_by_area[area]['Tset']:
                 data_by_area[area]['p_L'][t,local_node_id] = p_local[f"{conn_area}_{area}_p"][t-1]
     return data_by_area
 
+## Areas grouped by their depth in the area tree (the root area, without up_area, at depth 0), deepest level first
+def area_levels(area_info):
+    depth = {area: 0 for area in area_info if not area_info[area]['up_area']}
+    frontier = list(depth)
+    while frontier:
+        frontier = [(child, depth[area] + 1) for area in frontier for child in area_info[area]['down_areas']]
+        depth.update(frontier)
+        frontier = [child for child, _ in frontier]
+    levels = [[] for _ in range(max(depth.values()) + 1)]
+    for area in area_info: ## in the order of area_info within a level
+        levels[depth[area]].append(area)
+    return levels[::-1]
+
+## Largest change of the dummy node loads of area since the values it was last solved with (inputs), inf if never solved
+def input_change(area_info, area, p_local, inputs):
+    if area not in inputs:
+        return np.inf
+    keys = [f"{conn_area}_{area}_p" for conn_area in area_info[area]['down_areas']]
+    return max((np.max(np.abs(p_local[key] - inputs[area][key])) for key in keys), default=0.0)
+
 def share_local(area_info,shared_vars,p_local):
     for area in area_info.keys():
         for idx, conn_area in enumerate(area_info[area]['up_area']):
@@ -52,101 +96,195 @@ def share_local(area_info,shared_vars,p_local):
 
     return shared_vars
 
+## Checkpoint of the coordinator state of solve_EnAPP after iteration i: the latest boundary values by key (which are
+## also the dummy node loads of the next iteration) and the histories up to i
+def save_enapp_checkpoint(path, shared, i, objective, convergence, iteration_stats):
+    arrays = dict(shared)
+    meta = {'method': 'enapp', 'iteration': i, 'keys': list(shared),
+            'objective': {k: v for k, v in objective.items() if k <= i}, 'convergence': {k: v for k, v in convergence.items() if k <= i},
+            'iteration_stats': {key: values[:i + 1] for key, values in iteration_stats.items()}}
+    save_checkpoint(path, arrays, meta)
+
+def load_enapp_checkpoint(path, shared_vars, T):
+    arrays, meta = load_checkpoint(path, 'enapp')
+    if sorted(meta['keys']) != sorted(shared_vars) or any(arrays[key].shape[0] != T for key in meta['keys']):
+        raise ValueError(f"{path} was saved for other areas or time periods")
+    return {'iteration': meta['iteration'], 'shared': {key: arrays[key] for key in meta['keys']},
+            'objective': iteration_dict(meta['objective']), 'convergence': iteration_dict(meta['convergence']),
+            'iteration_stats': meta['iteration_stats']}
+
 def arrange_solution_by_areas(area_info,area_results):
+    ## the lines into the dummy nodes of the downstream areas get the global node ids back, the arrays are shared
     for area in area_info.keys():
-        for idx, conn_area in enumerate(area_info[area]['down_areas']):
-            local_node_id = area_info[area]['down_local_node_id'][idx]
-            global_node_id = area_info[conn_area]['up_global_node_id'][0]
-            for key, value in area_results[area].items():
-                if key in ['P']:  # For 'pij_values': key is (t, i, k)
-                    updated_dict = {}
-                    for (t, (i, k)), val in value.items():
-                        if k == local_node_id:
-                            updated_dict[(t, (i, global_node_id))] = val
-                        else:
-                            updated_dict[(t, (i, k))] = val
-                    area_results[area][key] = updated_dict
-
-    dopf = defaultdict(dict)
-    for area_name, vars_dict in area_results.items():
-        for key, value in vars_dict.items():
-            dopf[key][area_name] = value
-
-    return dopf
-
-def merge_solutions(dopf):
-    ## merging the area_wise dopf dictionary into one
-    dopfVals = {}
-    # Initialize containers for each variable
-    dopfVals['P_subs'] = {}
-    dopfVals['P'] = {}
-    dopfVals['Pe_c'] = {}
-    dopfVals['Pe_d'] = {}
-    dopfVals['P_c'] = {}
-    dopfVals['P_d'] = {}
-    dopfVals['B'] = {}
-
-    dopfVals["P_subs"] = {**dopf['P_subs']['area1']}
-    dopfVals["P"] = dict(ChainMap(*[dopf['P'][area] for area in dopf['P']]))
-    dopfVals["Pe_c"] = dict(ChainMap(*[dopf['Pe_c'][area] for area in dopf['Pe_c']]))
-    dopfVals["Pe_d"] = dict(ChainMap(*[dopf['Pe_d'][area] for area in dopf['Pe_d']]))
-    dopfVals["P_c"] = dict(ChainMap(*[dopf['P_c'][area] for area in dopf['P_c']]))
-    dopfVals["P_d"] = dict(ChainMap(*[dopf['P_d'][area] for area in dopf['P_d']]))
-    dopfVals["B"] = dict(ChainMap(*[dopf['B'][area] for area in dopf['B']]))
+        dummy_nodes = {area_info[area]['down_local_node_id'][idx]: area_info[conn_area]['up_global_node_id'][0]
+                       for idx, conn_area in enumerate(area_info[area]['down_areas'])}
+        if dummy_nodes:
+            area_results[area] = area_results[area].relabel_lines(dummy_nodes)
+
+    return area_results
+
+def merge_solutions(dopf, root):
+    ## merging the area-wise results into one, with the substation power of the root area
+    dopfVals = merge_results(dopf, subs_from=root)
 
     return dopfVals
 
-def solve_EnAPP(data, data_by_area, area_info, obj_fcn, max_iterations):
-    shared_vars = initialize_shared_dual(area_info, data)
+## Area solves of the run. sweep_iterations are the iterations a schedule='sweep' run of the same system took to converge,
+## the sweep solves every area in each of them. Given, or for a sweep run itself, the stats also hold the solves of that
+## sweep and the solves saved against it.
+def enapp_schedule_stats(schedule, solves, n_areas, sweep_iterations=None):
+    stats = {'schedule': schedule, 'iterations': len(solves), 'solves': int(sum(solves))}
+    if schedule == 'sweep':
+        sweep_iterations = len(solves)
+    if sweep_iterations is not None:
+        stats['sweep_iterations'] = sweep_iterations
+        stats['sweep_solves'] = n_areas * sweep_iterations
+        stats['solves_saved'] = stats['sweep_solves'] - stats['solves']
+    return stats
+
+def print_schedule_report(stats):
+    report = f"{stats['schedule']} schedule: {stats['solves']} area solves in {stats['iterations']} iterations"
+    if stats['schedule'] != 'sweep' and 'sweep_solves' in stats:
+        report += (f", {stats['solves_saved']} fewer than the {stats['sweep_solves']} of the sweep run "
+                   f"({stats['sweep_iterations']} iterations)")
+    print(report)
+
+## trajectory_path: folder to stream every boundary iterate to (see Distributed/history.py), None keeps only the last ones
+## telemetry_path: JSON lines file for the per iteration change of every tie-line (see Distributed/telemetry.py)
+## checkpoint_path, checkpoint_every, resume_from, seed_from: checkpoints of the coordinator state, as for solve_ADMM
+## executor, processes: where the area tasks run, as for solve_ADMM; 'auto' decides after the first iteration
+## schedule: 'wavefront' or 'sweep' (see the module docstring), tol: largest change of a tie-line to stop at, and below
+## which the wavefront does not solve an area again
+def solve_EnAPP(data, data_by_area, area_info, obj_fcn, max_iterations, solver=None, warmstart=True, trajectory_path=None,
+                telemetry_path=None, checkpoint_path=None, checkpoint_every=10, resume_from=None, seed_from=None,
+                executor='auto', processes=None, schedule='wavefront', tol=1e-5):
+    if schedule not in ('wavefront', 'sweep'):
+        raise ValueError(f"Unknown EnAPP schedule '{schedule}', expected 'wavefront' or 'sweep'")
+    if resume_from is not None and seed_from is not None:
+        raise ValueError("Give either resume_from or seed_from, not both")
+    log = TrajectoryLog(trajectory_path) if trajectory_path is not None else None
+    shared_vars = initialize_shared_dual(area_info, data, log=log)
+    sink = TelemetrySink(telemetry_path, method='enapp', tie_lines=[(conn_area, area) for area in area_info for conn_area in area_info[area]['up_area']]) \
+        if telemetry_path is not None else None
 
     convergence = {}
     objective = {}
     area_folders = area_info.keys()
-    pool = mp.Pool(processes=len(area_folders))
-
-    for i in range(max_iterations):
-        results = pool.starmap(process_area,[(data_by_area[area], area, obj_fcn) for area in area_folders])
-        area_results = {area_name: solutions for area_name, solutions in results}
-
-        p_local = compute_locals(area_info, area_results)
-
-        data_by_area = update_area_values(area_info, data_by_area, p_local)
-
-        shared_vars = share_local(area_info, shared_vars, p_local)
-
-        ## Convergence Check
-        max_diff = {}
-
-        for area in area_folders:
-            max_diff[area] = []  # Initialize a list to store the max differences for the area
-
-            # Iterate over up_area
-            for conn_area in area_info[area]['up_area']:
-                # Compute the maximum difference for 'p' and 'q' shared variables
-                diff_p = np.max(np.abs(shared_vars[f"{area}_{conn_area}_p"][-1] - shared_vars[f"{area}_{conn_area}_p"][-2]))
-                max_diff[area].append(diff_p)  # Take the maximum difference of 'p'
-
-        # Print statement for debugging
-        # tol = np.max([np.max(sublist) for sublist in max_diff.values()])
-        # Compute tolerance, ignoring empty sublists
-        tol = np.max([np.max(sublist) if len(sublist) > 0 else 0 for sublist in max_diff.values()])
-        convergence[i] = tol
-
-        if obj_fcn == cost_minimize_with_discharging_cost:
-            objective[i] = sum(area_results[area]['objective_value'] for area in area_folders) - sum(area_results[area]['P_subs'][t] * data['costshape'][t] for area in ['area2', 'area3', 'area4'] for t in data['Tset'])
-        else:
-            objective[i] = area_results['area1']['objective_value']
-        print(f"iteration = {i}, tolerance={tol}, objective value: {objective[i]}")
-        if tol < 1e-5 :
-            print(f"Converged after {i} iterations")
-            print(f"total objective value for DOPF:{objective[i]}")
-            break
-
-    pool.close()
-    pool.join()
-
+    solver = solver or current_solver() ## passed explicitly, the workers may not share the solver setting of this process
+    pool = area_pool(executor, len(area_folders), processes, solver)
+    run_id = uuid.uuid4().hex ## area models are built once per run and process and reused by the later iterations
+    warm = {area: None for area in area_folders} ## previous solution and basis of every area, sent to whichever worker solves it
+    iteration_stats = {'wall_time': [], 'solver_iterations': [], 'solve_time': [], 'solves': []}
+    root, downstream = root_area(area_info), downstream_areas(area_info) ## the substation power of the others is a load upstream
+    levels = area_levels(area_info) if schedule == 'wavefront' else [list(area_folders)]
+    inputs = {} ## dummy node loads every area was last solved with
+    area_results, solver_states = {}, {}
+    first = 0
+    if resume_from is not None or seed_from is not None:
+        restored = load_enapp_checkpoint(resume_from or seed_from, shared_vars, data['T'])
+        data_by_area = update_area_values(area_info, data_by_area, restored['shared'])
+        shared_vars = share_local(area_info, shared_vars, restored['shared'])
+        if resume_from is not None:
+            first = restored['iteration'] + 1
+            objective, convergence = restored['objective'], restored['convergence']
+            iteration_stats = {key: restored['iteration_stats'].get(key, []) for key in iteration_stats}
+    completed = saved = first - 1
+    shared = {key: values[-1] for key, values in shared_vars.items()}
+    p_local = dict(shared)
+
+    try:
+        for i in range(first, max_iterations):
+            start = time.perf_counter()
+            profile = worker_settings(iteration=i)
+            solved, task_times = [], []
+            for level in levels:
+                ## the sweep solves every area, the wavefront the areas whose downstream areas reported new values
+                tasks = [area for area in level if schedule == 'sweep' or input_change(area_info, area, p_local, inputs) > tol]
+                if not tasks:
+                    continue
+                with stage('area_solves', iteration=i):
+                    results = pool.starmap(process_area,[(data_by_area[area], area, area_info, obj_fcn, run_id, solver, warm[area], profile) for area in tasks])
+                task_times += getattr(pool, 'task_times', [])
+                for area_name, solutions, state in results:
+                    area_results[area_name], solver_states[area_name] = solutions, state
+                    add_records(state['profile'])
+                    inputs[area_name] = {f"{conn_area}_{area_name}_p": p_local[f"{conn_area}_{area_name}_p"] for conn_area in area_info[area_name]['down_areas']}
+                    if warmstart:
+                        ## with a basis the primal values are not needed, HiGHS restarts from the basis
+                        warm[area_name] = (solutions if state['basis'] is None else None, state['basis'])
+                solved += tasks
+
+                with stage('boundary_update', iteration=i):
+                    p_local.update(compute_locals({area: area_info[area] for area in tasks}, area_results))
+                    ## the upstream areas of this level, all areas once the sweep solved them
+                    data_by_area = update_area_values(area_info, data_by_area, p_local,
+                                                      None if schedule == 'sweep' else {up for area in tasks for up in area_info[area]['up_area']})
+            if executor == 'auto' and i == first:
+                ## the first solves also built the models, an upper bound; threads only with the solver that was timed
+                threads = all(thread_safe_solver(state['solver']) for state in solver_states.values())
+                choice = choose_executor(task_times, task_times, data_by_area, processes, threads=threads)
+                if choice != 'serial':
+                    pool = area_pool(choice, len(area_folders), processes, solver)
+
+            shared_vars = share_local(area_info, shared_vars, p_local)
+
+            ## Convergence Check
+            max_diff = {}
+
+            for area in area_folders:
+                max_diff[area] = []  # Initialize a list to store the max differences for the area
+
+                # Iterate over up_area
+                for conn_area in area_info[area]['up_area']:
+                    # Compute the maximum difference for 'p' and 'q' shared variables
+                    diff_p = np.max(np.abs(shared_vars[f"{area}_{conn_area}_p"][-1] - shared_vars[f"{area}_{conn_area}_p"][-2]))
+                    max_diff[area].append(diff_p)  # Take the maximum difference of 'p'
+
+            # Print statement for debugging
+            # tol = np.max([np.max(sublist) for sublist in max_diff.values()])
+            # Compute tolerance, ignoring empty sublists
+            change = np.max([np.max(sublist) if len(sublist) > 0 else 0 for sublist in max_diff.values()])
+            convergence[i] = change
+
+            if obj_fcn == cost_minimize_with_discharging_cost:
+                objective[i] = sum(area_results[area]['objective_value'] for area in area_folders) - sum(area_results[area]['P_subs'][t] * data['costshape'][t] for area in downstream for t in data['Tset'])
+            else:
+                objective[i] = area_results[root]['objective_value']
+            iterations = [solver_states[area]['iterations'] for area in solved]
+            iteration_stats['solver_iterations'].append(None if None in iterations else sum(iterations))
+            iteration_stats['solve_time'].append(sum(solver_states[area]['solve_time'] for area in solved))
+            iteration_stats['solves'].append(len(solved))
+            iteration_stats['wall_time'].append(time.perf_counter() - start)
+            if sink is not None:
+                sink.record(iteration=i, objective=objective[i], change=change, solves=len(solved), wall_time=iteration_stats['wall_time'][-1],
+                            change_tie_lines=np.array([diff for area in area_folders for diff in max_diff[area]]))
+            print(f"iteration = {i}, tolerance={change}, objective value: {objective[i]}, solves: {len(solved)}, "
+                  f"solver iterations: {iteration_stats['solver_iterations'][-1]}, time: {iteration_stats['wall_time'][-1]:.3f} s")
+            completed, shared = i, {key: values[-1] for key, values in shared_vars.items()}
+            if checkpoint_path is not None and (i + 1) % checkpoint_every == 0:
+                save_enapp_checkpoint(checkpoint_path, shared, i, objective, convergence, iteration_stats)
+                saved = i
+            if change < tol :
+                print(f"Converged after {i} iterations")
+                print(f"total objective value for DOPF:{objective[i]}")
+                break
+    finally:
+        if checkpoint_path is not None and completed > saved:
+            save_enapp_checkpoint(checkpoint_path, shared, completed, objective, convergence, iteration_stats) ## also when interrupted
+        pool.close()
+        pool.join()
+        if log is not None:
+            log.close()
+        if sink is not None:
+            sink.close()
+
+    schedule_stats = enapp_schedule_stats(schedule, iteration_stats['solves'], len(area_folders))
+    print_schedule_report(schedule_stats)
     dopf = arrange_solution_by_areas(area_info, area_results)
 
-    dopfVals = merge_solutions(dopf)
+    dopfVals = merge_solutions(dopf, root)
+    dopfVals['iteration_stats'] = iteration_stats ## per outer iteration: wall time, solver iterations and solve time summed over the solved areas, areas solved
+    dopfVals['schedule_stats'] = schedule_stats
+    dopfVals['executor'] = 'serial' if isinstance(pool, SerialPool) else 'thread' if isinstance(pool, ThreadPool) else 'process'
 
     return dopfVals,objective,convergence
\ No newline at end of file
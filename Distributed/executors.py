@@ -0,0 +1,368 @@
+"""
+This script selects where the area solves of the distributed algorithms run:
+
+    serial    in the coordinator process, one area after the other: no process start up, no pickling, no pipes
+    thread    in threads of the coordinator process, each owning the models of its areas, with a thread-safe solver that
+              releases the GIL (OSQP, see Build_Model/solvers.py); the models are built one at a time (MODEL_LOCK)
+    process   in resident worker processes (Distributed/area_workers.py), at most one per core, each hosting several areas
+    auto      serial for the first iteration, then thread or process if the measured solve and model build times of the
+              areas promise to save more than starting the threads or workers and talking to them costs (choose_executor)
+    tcp       in workers connected over TCP, possibly on other machines (Distributed/tcp_workers.py), ADMM only
+
+area_executor returns the executor for ADMM, which keeps the area models resident, with the interface of AreaWorkers
+(boundary, solve, submit, ready, receive, results). area_pool returns the starmap pool EnAPP hands its tasks to.
+"""
+import contextlib
+import multiprocessing as mp
+import os
+import pickle
+import time
+from concurrent.futures import ThreadPoolExecutor, wait as wait_futures, FIRST_COMPLETED
+import numpy as np
+from Build_Model.Constraints import MODEL_LOCK
+from Build_Model.solvers import current_solver, get_solver, thread_safe_solver
+from Build_Model.store import store_results
+from Distributed.area_workers import AreaWorkers
+from Profiling.stages import stage
+
+EXECUTORS = ('serial', 'thread', 'process', 'auto')
+AUTO_HORIZON = 20 ## iterations the start up of worker processes has to pay off over in auto mode
+
+def cpu_count():
+    return len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count() or 1
+
+## Time to finish tasks of the given durations on n workers, each task going to the least loaded one, longest first
+def makespan(times, n):
+    loads = [0.0] * max(n, 1)
+    for t in sorted(times, reverse=True):
+        loads[loads.index(min(loads))] += t
+    return max(loads)
+
+def _echo(conn):
+    while True:
+        message = conn.recv_bytes()
+        if not message:
+            break
+        conn.send_bytes(message)
+    conn.close()
+
+def probe_process(round_trips=20):
+    """
+    Measured seconds to start a worker process until it answers, and of a round trip of a small message through its
+    pipe, in the start method of this process.
+    """
+    ctx = mp.get_context()
+    conn, child_conn = ctx.Pipe()
+    start = time.perf_counter()
+    process = ctx.Process(target=_echo, args=(child_conn,), daemon=True)
+    process.start()
+    conn.send_bytes(b'x')
+    conn.recv_bytes()
+    start_s = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(round_trips):
+        conn.send_bytes(b'x' * 256) ## about the size of a command or a status record
+        conn.recv_bytes()
+    round_trip_s = (time.perf_counter() - start) / round_trips
+    conn.send_bytes(b'')
+    process.join()
+    conn.close()
+    return start_s, round_trip_s
+
+## Seconds to hand the area data to the workers: nothing with fork, which inherits it, pickling it in and out otherwise
+def transfer_time(data_by_area):
+    if mp.get_start_method() == 'fork':
+        return 0.0
+    start = time.perf_counter()
+    pickle.loads(pickle.dumps(data_by_area, protocol=pickle.HIGHEST_PROTOCOL))
+    return time.perf_counter() - start
+
+def choose_executor(solve_times, build_times, data_by_area, processes=None, horizon=AUTO_HORIZON, threads=False):
+    """
+    The fastest of 'serial', 'process' and, if threads (the areas were timed with a thread-safe solver), 'thread' for
+    solving the areas with the given solve and model build times (seconds, measured in the coordinator) over the next
+    horizon iterations, on min(processes, cores) worker processes or threads.
+    """
+    n = min(processes or cpu_count(), cpu_count(), len(solve_times))
+    if n < 2:
+        return 'serial'
+    start_s, round_trip_s = probe_process()
+    expected = {'serial': horizon * sum(solve_times)}
+    ## the workers build the models again and their first solves are cold starts again: one more round of solves
+    expected['process'] = start_s + transfer_time(data_by_area) + makespan(build_times, n) + \
+        (horizon + 1) * (makespan(solve_times, n) + round_trip_s * len(solve_times))
+    if threads:
+        ## no start up and no transfer, but the threads build their models one after the other
+        expected['thread'] = sum(build_times) + (horizon + 1) * makespan(solve_times, n)
+    return min(expected, key=expected.get)
+
+
+class SerialAreas:
+    """
+    The area models in the coordinator process with the interface of AreaWorkers, a submitted solve runs right away.
+    The profiled stages of the solves are recorded directly, the status records carry none.
+    """
+    executor = 'serial'
+
+    def __init__(self, init_fcn, step_fcn, data_by_area, area_info, settings, layouts, T):
+        self.step_fcn = step_fcn
+        self.areas = list(data_by_area)
+        self.arrays = {area: {key: np.zeros((T, n)) for key, n in layouts[area].items()} for area in self.areas}
+        self.models, self.build_times = {}, {}
+        for area in self.areas:
+            start = time.perf_counter()
+            self.models[area] = init_fcn(data_by_area[area], area, area_info, settings)
+            self.build_times[area] = time.perf_counter() - start
+        self.done = {}
+        self.ipc_bytes = 0 ## nothing is sent anywhere
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def boundary(self, area):
+        return self.arrays[area]
+
+    def _run(self, area, params, profiled=True):
+        start = time.perf_counter()
+        tags = params['profile']['tags'] if profiled and params.get('profile') else {}
+        with stage('area_solve', area=area, **tags) if profiled else contextlib.nullcontext():
+            status = self.step_fcn(self.models[area], self.arrays[area], params)
+        status['profile'] = []
+        status['busy_s'] = time.perf_counter() - start
+        return status
+
+    def solve(self, areas=None, **params):
+        return {area: self._run(area, params) for area in (self.areas if areas is None else areas)}
+
+    def submit(self, area, **params):
+        self.done[area] = self._run(area, params)
+
+    def ready(self, areas=None, timeout=None):
+        return [area for area in (self.areas if areas is None else areas) if area in self.done]
+
+    def receive(self, area):
+        return self.done.pop(area)
+
+    def results(self):
+        return {area: store_results(model) for area, model in self.models.items()}
+
+    def shared_bytes(self):
+        return 0
+
+    def close(self):
+        self.models, self.done = {}, {}
+
+
+class ThreadAreas(SerialAreas):
+    """
+    The area models in the coordinator process, spread over 'threads' threads. Every thread builds and solves the models
+    of its areas, so a model and its persistent solver are only ever used by one thread, and the solves of different
+    threads overlap. The models are built under MODEL_LOCK, one at a time. Profiling stages are only recorded on the main
+    thread (see Profiling/stages.py), the status records carry none.
+    """
+    executor = 'thread'
+
+    def __init__(self, init_fcn, step_fcn, data_by_area, area_info, settings, layouts, T, threads=None):
+        self.step_fcn = step_fcn
+        self.areas = list(data_by_area)
+        self.arrays = {area: {key: np.zeros((T, n)) for key, n in layouts[area].items()} for area in self.areas}
+        n = min(threads or cpu_count(), len(self.areas)) or 1
+        self.threads = [ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"area-solve-{k}") for k in range(n)]
+        self.owner = {area: self.threads[k % n] for k, area in enumerate(self.areas)}
+        builds = {area: self.owner[area].submit(self._build, init_fcn, data_by_area[area], area, area_info, settings) for area in self.areas}
+        self.models, self.build_times = {}, {}
+        for area, future in builds.items():
+            self.models[area], self.build_times[area] = future.result()
+        self.futures, self.done = {}, {}
+        self.ipc_bytes = 0 ## nothing is sent anywhere
+
+    @staticmethod
+    def _build(init_fcn, data_area, area, area_info, settings):
+        start = time.perf_counter()
+        with MODEL_LOCK:
+            model = init_fcn(data_area, area, area_info, settings)
+        return model, time.perf_counter() - start
+
+    def solve(self, areas=None, **params):
+        areas = self.areas if areas is None else list(areas)
+        for area in areas:
+            self.submit(area, **params)
+        return {area: self.receive(area) for area in areas}
+
+    def submit(self, area, **params):
+        self.futures[area] = self.owner[area].submit(self._run, area, params, False)
+
+    def ready(self, areas=None, timeout=None):
+        futures = {self.futures[area]: area for area in (self.areas if areas is None else areas) if area in self.futures}
+        done, _ = wait_futures(list(futures), timeout, return_when=FIRST_COMPLETED)
+        return [futures[future] for future in done]
+
+    def receive(self, area):
+        return self.futures.pop(area).result()
+
+    def close(self):
+        for thread in getattr(self, 'threads', []):
+            thread.shutdown(wait=True)
+        self.futures = {}
+        super().close()
+
+
+class AutoAreas:
+    """
+    Starts with SerialAreas and, once every area has been solved once, moves the areas to threads or worker processes if
+    choose_executor expects that to be faster. executor tells which one is in use.
+    """
+    def __init__(self, init_fcn, step_fcn, data_by_area, area_info, settings, layouts, T, processes=None):
+        self.args = (init_fcn, step_fcn, data_by_area, area_info, settings, layouts, T)
+        self.processes = processes
+        self.current = SerialAreas(*self.args)
+        self.solve_times = {}
+        self.decided = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def executor(self):
+        return self.current.executor
+
+    @property
+    def ipc_bytes(self):
+        return self.current.ipc_bytes
+
+    @ipc_bytes.setter
+    def ipc_bytes(self, value):
+        self.current.ipc_bytes = value
+
+    def _measured(self, statuses):
+        for area, status in statuses.items():
+            self.solve_times.setdefault(area, status['busy_s'])
+        if not self.decided and len(self.solve_times) == len(self.current.areas) and not self.current.done:
+            self.decided = True
+            build_times = self.current.build_times
+            choice = choose_executor([self.solve_times[area] for area in self.current.areas], [build_times[area] for area in self.current.areas],
+                                     self.args[2], self.processes, threads=self._thread_safe())
+            if choice != 'serial':
+                self.current.close()
+                n = min(self.processes or cpu_count(), len(self.args[2]))
+                self.current = ThreadAreas(*self.args, threads=n) if choice == 'thread' else AreaWorkers(*self.args, processes=n)
+        return statuses
+
+    ## True if the areas were solved with a thread-safe solver, the solve times then hold for threads as well
+    def _thread_safe(self):
+        solver = self.args[4].get('solver')
+        return all(thread_safe_solver(get_solver(model, solver)[0]) for model in self.current.models.values())
+
+    def boundary(self, area):
+        return self.current.boundary(area)
+
+    def solve(self, areas=None, **params):
+        return self._measured(self.current.solve(areas, **params))
+
+    def submit(self, area, **params):
+        self.current.submit(area, **params)
+
+    def ready(self, areas=None, timeout=None):
+        return self.current.ready(areas, timeout)
+
+    def receive(self, area):
+        status = self.current.receive(area)
+        self._measured({area: status})
+        return status
+
+    def results(self):
+        return self.current.results()
+
+    def shared_bytes(self):
+        return self.current.shared_bytes()
+
+    def close(self):
+        self.current.close()
+
+
+def area_executor(executor, init_fcn, step_fcn, data_by_area, area_info, settings, layouts, T, processes=None, tcp=None):
+    """
+    Executor of the resident area models of ADMM (see the module docstring). processes caps the worker processes or
+    threads, by default at the number of cores. tcp holds the keyword arguments of TcpAreaWorkers (host, port, launch, ...).
+    """
+    if executor == 'tcp':
+        from Distributed.tcp_workers import TcpAreaWorkers
+        return TcpAreaWorkers(init_fcn, step_fcn, data_by_area, area_info, settings, layouts, T, processes=processes, **(tcp or {}))
+    if executor == 'serial':
+        return SerialAreas(init_fcn, step_fcn, data_by_area, area_info, settings, layouts, T)
+    if executor == 'thread':
+        check_thread_solver(settings.get('solver'))
+        return ThreadAreas(init_fcn, step_fcn, data_by_area, area_info, settings, layouts, T, threads=processes)
+    if executor == 'process':
+        return AreaWorkers(init_fcn, step_fcn, data_by_area, area_info, settings, layouts, T, processes=processes or cpu_count())
+    if executor == 'auto':
+        return AutoAreas(init_fcn, step_fcn, data_by_area, area_info, settings, layouts, T, processes=processes)
+    raise ValueError(f"Unknown executor '{executor}', expected one of {EXECUTORS}")
+
+
+class SerialPool:
+    """
+    Stand-in for mp.Pool running the tasks in the calling process one after the other, task_times holds the wall time
+    of every task of the last starmap.
+    """
+    def __init__(self):
+        self.task_times = []
+
+    def starmap(self, fcn, args):
+        results, self.task_times = [], []
+        for task_args in args:
+            start = time.perf_counter()
+            results.append(fcn(*task_args))
+            self.task_times.append(time.perf_counter() - start)
+        return results
+
+    def close(self):
+        pass
+
+    def join(self):
+        pass
+
+
+class ThreadPool:
+    """
+    Stand-in for mp.Pool running the tasks in threads of the calling process. The area models are shared by the threads
+    (see get_area_model), but an area is only solved by one task at a time.
+    """
+    def __init__(self, threads):
+        self.pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="area-solve")
+
+    def starmap(self, fcn, args):
+        return list(self.pool.map(lambda task_args: fcn(*task_args), args))
+
+    def close(self):
+        self.pool.shutdown(wait=True)
+
+    def join(self):
+        pass
+
+
+## Raises a ValueError unless solver (a registered name, 'auto' or None for the solver of the run) can solve in threads
+def check_thread_solver(solver=None):
+    if not thread_safe_solver(solver):
+        raise ValueError(f"The thread executor needs a thread-safe solver, '{solver or current_solver()}' is not "
+                         f"(see register_solver)")
+
+## starmap pool for the area tasks of EnAPP, 'auto' starts serial (see choose_executor)
+def area_pool(executor, n_areas, processes=None, solver=None):
+    n = min(processes or cpu_count(), n_areas)
+    if executor in ('serial', 'auto'):
+        return SerialPool()
+    if executor == 'thread':
+        check_thread_solver(solver)
+        return ThreadPool(n)
+    if executor == 'process':
+        return mp.Pool(processes=n)
+    if executor == 'tcp':
+        raise ValueError("The TCP workers keep the ADMM area models resident, EnAPP runs on 'serial', 'thread' or 'process'")
+    raise ValueError(f"Unknown executor '{executor}', expected one of {EXECUTORS}")
@@ -0,0 +1,86 @@
+"""
+This script bounds the memory of the iterate histories of ADMM and EnAPP. shared_vars/dual_vars are IterateHistory
+objects (one for the stacked tie-line arrays of ADMM, one per tie-line vector for EnAPP) instead of lists growing by
+one array every iteration: only the last 'keep' iterates stay in memory, which is all the consensus/dual updates ([-1])
+and convergence checks ([-2]) read. When the full trajectory is wanted, every appended iterate is also streamed to a
+TrajectoryLog, an append-only folder of raw float64 files (one per vector) that load_trajectory memory maps as
+(iterations x ...) arrays, e.g. (iterations x tie-lines x T) for the consensus values of ADMM.
+"""
+import json
+import os
+from collections import deque
+import numpy as np
+
+KEEP = 2 ## iterates kept in memory, [-1] and [-2]
+
+
+class IterateHistory(deque):
+    """
+    Last 'keep' iterates of one boundary vector. Supports the list operations the algorithms use (append, [-1], [-2]);
+    with a log every appended iterate is also written to disk under key.
+    """
+    def __init__(self, initial=(), keep=KEEP, log=None, key=None):
+        super().__init__(maxlen=keep)
+        self.log = log
+        self.key = key
+        for values in initial:
+            self.append(values)
+
+    def append(self, values):
+        super().append(values)
+        if self.log is not None:
+            self.log.write(self.key, values)
+
+    def __reduce__(self):
+        return (IterateHistory, (list(self), self.maxlen)) ## the log stays with the process that writes it
+
+
+class TrajectoryLog:
+    """
+    Append-only on-disk log of every iterate of the boundary vectors: path/<key>.f8 holds the iterates of one vector
+    back to back, path/trajectory.json their shapes. Use as a context manager or call close().
+    """
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        for entry in os.listdir(path):
+            if entry.endswith(".f8"):
+                os.remove(os.path.join(path, entry)) ## a new run replaces the trajectory of an earlier one
+        self.files = {}
+        self.shapes = {}
+
+    def write(self, key, values):
+        values = np.asarray(values, dtype='<f8')
+        if key not in self.files:
+            self.files[key] = open(os.path.join(self.path, f"{key}.f8"), 'ab')
+            self.shapes[key] = values.shape
+            self._write_meta()
+        elif values.shape != self.shapes[key]:
+            raise ValueError(f"Iterate of {key} has shape {values.shape}, expected {self.shapes[key]}")
+        self.files[key].write(values.tobytes())
+
+    def _write_meta(self):
+        with open(os.path.join(self.path, "trajectory.json"), 'w') as f:
+            json.dump({key: list(shape) for key, shape in self.shapes.items()}, f)
+
+    def close(self):
+        for f in self.files.values():
+            f.close()
+        self.files = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+## Memory mapped (iterations x ...) arrays of the vectors logged in path, by key (default: all)
+def load_trajectory(path, keys=None):
+    with open(os.path.join(path, "trajectory.json")) as f:
+        shapes = json.load(f)
+    keys = list(shapes) if keys is None else keys
+    trajectory = {}
+    for key in keys:
+        values = np.memmap(os.path.join(path, f"{key}.f8"), dtype='<f8', mode='r')
+        trajectory[key] = values.reshape(-1, *shapes[key])
+    return trajectory
@@ -5,6 +5,7 @@ Bset, Eset and so on.
 """
 
 import networkx as nx
+from Profiling.stages import timed
 
 ###########################
 # 1) Build the graph from data
@@ -130,6 +131,7 @@ def build_area_data(full_data, area_name, sg_local):
 ###########################
 # 4) Main function
 ###########################
+@timed('split_data_into_areas')
 def split_data_into_areas(full_data,area_info):
     # ----------------------------
     # Step 1: Build the graph from data
@@ -0,0 +1,433 @@
+"""
+This script runs the areas of ADMM in worker processes that connect to the coordinator over TCP, so the areas can be
+spread over several machines. A worker is started with the coordinator address, the system, the path of its csvs and
+the areas it solves,
+
+    python -m Distributed.tcp_workers --coordinator 10.0.0.1:5555 --system avista_sys --data rawData/avista_sys/csvs --areas area1 area2
+
+builds the models of its areas once from its own copy of the data and then only exchanges the boundary vectors of its
+areas with the coordinator. Every message is one frame:
+
+    header    <IBHI   payload length, message type, area index, sequence number
+    SOLVE     rho and iteration (<dI), then the input boundary arrays of the area (float64, T x n, in layout order)
+    STATUS    objective, solver iterations (NaN: unknown), solve time and busy time (<4d), P_subs (T) and the output
+              boundary arrays
+    HELLO, SETUP, READY, ERROR   JSON or text, only while a worker connects or when it fails
+    RESULTS   the Results of an area, once at the end of a run: a JSON record of the sets, the objective and the
+              name, dtype and shape of every variable block (<I length first), then the raw arrays in that order
+
+A worker that loses its connection keeps its models and reconnects. The coordinator waits for it (reconnect_timeout)
+and sends the requests that were in flight again. A request carries every input of the solve, so repeating it is
+harmless, and replies to superseded requests are recognized by their sequence number and dropped. Nothing received is
+unpickled: the coordinator listens on a public address in multi-host runs, and any peer may connect.
+"""
+import argparse
+import importlib
+import json
+import os
+import select
+import socket
+import struct
+import subprocess
+import sys
+import time
+import traceback
+import numpy as np
+from Build_Model.results import Results
+from Build_Model.store import store_results
+from Distributed.area_workers import group_areas
+
+HEADER = struct.Struct('<IBHI')
+SOLVE_PARAMS = struct.Struct('<dI')
+STATUS_VALUES = struct.Struct('<4d')
+JSON_LENGTH = struct.Struct('<I')
+HELLO, SETUP, READY, SOLVE, STATUS, RESULTS, ERROR, CLOSE = range(1, 9)
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _send_frame(sock, kind, area=0, seq=0, payload=b''):
+    frame = HEADER.pack(len(payload), kind, area, seq) + payload
+    sock.sendall(frame)
+    return len(frame)
+
+def _recv_exact(sock, n):
+    buf = bytearray(n)
+    view, got = memoryview(buf), 0
+    while got < n:
+        k = sock.recv_into(view[got:])
+        if k == 0:
+            raise ConnectionError("Connection closed by the other side")
+        got += k
+    return bytes(buf)
+
+## (message type, area index, sequence number, payload) of the next frame
+def _recv_frame(sock):
+    length, kind, area, seq = HEADER.unpack(_recv_exact(sock, HEADER.size))
+    return kind, area, seq, _recv_exact(sock, length)
+
+def _json_value(o):
+    if isinstance(o, np.generic):
+        return o.item()
+    raise TypeError(f"{type(o).__name__} is not JSON serializable")
+
+## RESULTS payload of results (see the module docstring), only the sets, objective and arrays travel
+def encode_results(results):
+    arrays = {name: np.ascontiguousarray(array) for name, array in results.arrays.items()}
+    header = json.dumps({'Tset': results.Tset, 'sets': results.sets, 'objective_value': results.objective_value,
+                         'arrays': [[name, array.dtype.str, array.shape] for name, array in arrays.items()]},
+                        default=_json_value).encode()
+    return JSON_LENGTH.pack(len(header)) + header + b''.join(array.tobytes() for array in arrays.values())
+
+def decode_results(payload):
+    (length,) = JSON_LENGTH.unpack_from(payload)
+    header = json.loads(payload[JSON_LENGTH.size:JSON_LENGTH.size + length])
+    offset, arrays = JSON_LENGTH.size + length, {}
+    for name, dtype, shape in header['arrays']:
+        dtype = np.dtype(dtype)
+        if dtype.kind not in 'fiub':
+            raise ValueError(f"Unexpected dtype {dtype} of '{name}' in the results")
+        count = int(np.prod(shape))
+        arrays[name] = np.frombuffer(payload, dtype=dtype, count=count, offset=offset).reshape(shape).copy()
+        offset += count * dtype.itemsize
+    sets = {name: [tuple(i) if isinstance(i, list) else i for i in nodes] for name, nodes in header['sets'].items()} ## lines are (i, j)
+    return Results(header['Tset'], sets, arrays, header['objective_value'])
+
+## 'module:qualname' of a module level function, how functions are named in SETUP
+def _name(fcn):
+    return f"{fcn.__module__}:{fcn.__qualname__}"
+
+def _resolve(name):
+    module, qualname = name.split(':')
+    obj = importlib.import_module(module)
+    for part in qualname.split('.'):
+        obj = getattr(obj, part)
+    return obj
+
+def _connect_options(sock):
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1) ## the frames are small, send them right away
+    sock.settimeout(None)
+
+
+class TcpAreaWorkers:
+    """
+    Coordinator side of the TCP workers with the interface of AreaWorkers. Listens on host:port (port 0: any free port,
+    see .address) until workers serving every area of data_by_area have connected. launch=system_name starts them on
+    this machine (one per area, or 'processes' of them), otherwise they are started elsewhere with the command of the
+    module docstring. Only the arrays of layouts not in outputs are sent to a worker, outputs come back.
+    """
+    executor = 'tcp'
+
+    def __init__(self, init_fcn, step_fcn, data_by_area, area_info, settings, layouts, T, host='127.0.0.1', port=0,
+                 launch=None, data_path=None, processes=None, outputs=('flows',), connect_timeout=300, reconnect_timeout=60):
+        self.areas = list(data_by_area)
+        self.index = {area: k for k, area in enumerate(self.areas)}
+        self.T = T
+        self.layouts = {area: dict(layouts[area]) for area in self.areas}
+        self.outputs = list(outputs)
+        self.arrays = {area: {key: np.zeros((T, n)) for key, n in layouts[area].items()} for area in self.areas}
+        first = data_by_area[self.areas[0]]
+        callables = [key for key, val in settings.items() if callable(val)]
+        self.setup = {'init_fcn': _name(init_fcn), 'step_fcn': _name(step_fcn), 'callables': callables,
+                      'settings': {key: _name(val) if key in callables else val for key, val in settings.items()},
+                      'price': [float(first['costshape'][t]) for t in first['Tset']], 'T': T, 'areas': self.areas,
+                      'layouts': self.layouts, 'outputs': self.outputs}
+        self.reconnect_timeout = reconnect_timeout
+        self.socks = {}    ## area -> connection of the worker serving it
+        self.requests = {} ## area -> (sequence number, frame) of the request in flight
+        self.replies = {}  ## area -> (message type, payload) answering the request in flight
+        self.seq = 0
+        self.ipc_bytes = 0 ## bytes of the frames in both directions since the last solve()
+        self.reconnects = 0
+        self.listener = socket.create_server((host, port))
+        self.address = self.listener.getsockname()[:2]
+        self.launched = []
+        if launch is not None:
+            groups = group_areas(data_by_area, min(processes or len(self.areas), len(self.areas)))
+            self.launched = launch_local_workers(self.address, launch, groups, data_path)
+        else:
+            print(f"Waiting for the workers of {self.areas} at {self.address[0]}:{self.address[1]}")
+        try:
+            self._accept(self.areas, connect_timeout)
+        except BaseException:
+            self.close()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _accept(self, areas, timeout):
+        """
+        Accepts workers until every given area is served by a connected worker that has built its models.
+        """
+        missing, hello = set(areas), {}
+        deadline = time.monotonic() + timeout
+        while missing:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError(f"No worker connected for {sorted(missing)} within {timeout} s")
+            readable, _, _ = select.select([self.listener, *hello], [], [], remaining)
+            for sock in readable:
+                try:
+                    if sock is self.listener:
+                        conn, _ = self.listener.accept()
+                        _connect_options(conn)
+                        kind, _, _, payload = _recv_frame(conn)
+                        served = json.loads(payload)['areas'] if kind == HELLO else []
+                        unknown = set(served) - set(self.areas)
+                        if unknown or not served:
+                            _send_frame(conn, ERROR, payload=f"Unknown areas {sorted(unknown)}, expected {self.areas}".encode())
+                            conn.close()
+                            continue
+                        _send_frame(conn, SETUP, payload=json.dumps(self.setup).encode())
+                        hello[conn] = served
+                    else:
+                        served = hello.pop(sock)
+                        kind, _, _, payload = _recv_frame(sock) ## READY once the models are built
+                        if kind == ERROR:
+                            raise RuntimeError(f"Worker of {served} failed:\n{payload.decode()}")
+                        for area in served:
+                            old = self.socks.get(area)
+                            self.socks[area] = sock
+                            if old is not None and old not in self.socks.values():
+                                old.close()
+                            missing.discard(area)
+                except (ConnectionError, OSError):
+                    hello.pop(sock, None) ## the worker retries
+
+    def _lost(self, sock):
+        areas = [area for area, conn in self.socks.items() if conn is sock]
+        sock.close()
+        for area in areas:
+            del self.socks[area]
+        self.reconnects += 1
+        print(f"Lost the worker of {areas}, waiting up to {self.reconnect_timeout} s for it to reconnect")
+        self._accept(areas, self.reconnect_timeout)
+        for area in areas:
+            if area in self.requests and area not in self.replies:
+                self._send(area, self.requests[area][1])
+
+    def _send(self, area, frame):
+        try:
+            self.socks[area].sendall(frame)
+        except OSError:
+            self._lost(self.socks[area]) ## sends the requests in flight again
+            return
+        self.ipc_bytes += len(frame)
+
+    def _request(self, area, kind, payload=b''):
+        self.seq += 1
+        frame = HEADER.pack(len(payload), kind, self.index[area], self.seq) + payload
+        self.requests[area] = (self.seq, frame)
+        self.replies.pop(area, None)
+        self._send(area, frame)
+
+    def _read(self, sock):
+        try:
+            kind, index, seq, payload = _recv_frame(sock)
+        except (ConnectionError, OSError):
+            self._lost(sock)
+            return
+        self.ipc_bytes += HEADER.size + len(payload)
+        area = self.areas[index]
+        if area in self.requests and self.requests[area][0] == seq:
+            self.replies[area] = (kind, payload) ## anything else answers a request that was sent again
+
+    def boundary(self, area):
+        return self.arrays[area]
+
+    def solve(self, areas=None, **params):
+        areas = self.areas if areas is None else list(areas)
+        self.ipc_bytes = 0
+        for area in areas:
+            self.submit(area, **params)
+        return {area: self.receive(area) for area in areas}
+
+    def submit(self, area, **params):
+        arrays = self.arrays[area]
+        payload = SOLVE_PARAMS.pack(params['rho'], params['iteration']) + \
+            b''.join(np.ascontiguousarray(arrays[key], dtype='<f8').tobytes() for key in self.layouts[area] if key not in self.outputs)
+        self._request(area, SOLVE, payload)
+
+    def ready(self, areas=None, timeout=None):
+        areas = set(self.areas if areas is None else areas)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            done = [area for area in areas if area in self.replies]
+            if done:
+                return done
+            socks = {self.socks[area] for area in areas if area in self.requests}
+            if not socks:
+                return []
+            remaining = None if deadline is None else max(deadline - time.monotonic(), 0.0)
+            readable, _, _ = select.select(list(socks), [], [], remaining)
+            if not readable:
+                return []
+            for sock in readable:
+                if sock in self.socks.values():
+                    self._read(sock)
+
+    def _reply(self, area, expected):
+        while area not in self.replies:
+            self.ready([area])
+        kind, payload = self.replies.pop(area)
+        del self.requests[area]
+        if kind == ERROR:
+            raise RuntimeError(f"Worker of {area} failed:\n{payload.decode()}")
+        if kind != expected:
+            raise RuntimeError(f"Unexpected message {kind} from the worker of {area}")
+        return payload
+
+    def receive(self, area):
+        payload = self._reply(area, STATUS)
+        objective, iterations, solve_time, busy = STATUS_VALUES.unpack_from(payload)
+        values = np.frombuffer(payload, dtype='<f8', offset=STATUS_VALUES.size)
+        offset = self.T
+        for key in self.outputs:
+            n = self.layouts[area][key]
+            self.arrays[area][key][:] = values[offset:offset + self.T * n].reshape(self.T, n)
+            offset += self.T * n
+        return {'objective_value': objective, 'P_subs': values[:self.T].copy(),
+                'iterations': None if np.isnan(iterations) else int(iterations), 'solve_time': solve_time,
+                'busy_s': busy, 'profile': []}
+
+    ## Full Results of every area from its last solve, only fetched once at the end of a run
+    def results(self):
+        for area in self.areas:
+            self._request(area, RESULTS)
+        return {area: decode_results(self._reply(area, RESULTS)) for area in self.areas}
+
+    def shared_bytes(self):
+        return 0 ## every byte goes through the sockets and is counted in ipc_bytes
+
+    def close(self):
+        for sock in set(self.socks.values()):
+            try:
+                _send_frame(sock, CLOSE)
+            except OSError:
+                pass
+            sock.close()
+        self.socks = {}
+        self.listener.close()
+        for process in self.launched:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.terminate()
+        self.launched = []
+
+
+## Starts one worker process per group of areas on this machine, connecting to the coordinator at address
+def launch_local_workers(address, system_name, groups, data_path=None):
+    processes = []
+    for group in groups:
+        command = [sys.executable, '-m', 'Distributed.tcp_workers', '--coordinator', f"{address[0]}:{address[1]}",
+                   '--system', system_name, '--areas', *group]
+        if data_path is not None:
+            command += ['--data', data_path]
+        processes.append(subprocess.Popen(command, cwd=ROOT, stdout=subprocess.DEVNULL))
+    return processes
+
+
+## Models of the given areas built from the csvs in data_path with the settings the coordinator sent
+def build_area_models(setup, system_name, areas, data_path):
+    from Distributed.area_informatiion import get_area_info
+    from Distributed.separate_areas import split_data_into_areas
+    from Parser.cache import load_system_data
+    area_info = get_area_info(system_name)
+    data = load_system_data(data_path, setup['price'], mode="array")
+    if data['T'] != setup['T']:
+        raise ValueError(f"{data_path} has {data['T']} time periods, the coordinator {setup['T']}")
+    data_by_area = split_data_into_areas(data, area_info)
+    init_fcn = _resolve(setup['init_fcn'])
+    settings = {key: _resolve(val) if key in setup['callables'] else val for key, val in setup['settings'].items()}
+    return {area: init_fcn(data_by_area[area], area, area_info, settings) for area in areas}
+
+## Answers the requests of the coordinator until it closes the run (True); connection errors are left to the caller
+def serve(sock, setup, models):
+    T, outputs = setup['T'], setup['outputs']
+    step_fcn = _resolve(setup['step_fcn'])
+    arrays = {area: {key: np.zeros((T, n)) for key, n in setup['layouts'][area].items()} for area in models}
+    while True:
+        kind, index, seq, payload = _recv_frame(sock)
+        if kind == CLOSE:
+            return True
+        area = setup['areas'][index]
+        try:
+            if kind == SOLVE:
+                start = time.perf_counter()
+                rho, iteration = SOLVE_PARAMS.unpack_from(payload)
+                values = np.frombuffer(payload, dtype='<f8', offset=SOLVE_PARAMS.size)
+                offset = 0
+                for key, n in setup['layouts'][area].items():
+                    if key not in outputs:
+                        arrays[area][key][:] = values[offset:offset + T * n].reshape(T, n)
+                        offset += T * n
+                status = step_fcn(models[area], arrays[area], {'rho': rho, 'iteration': iteration})
+                iterations = np.nan if status['iterations'] is None else status['iterations']
+                reply = STATUS_VALUES.pack(status['objective_value'], iterations, status['solve_time'], time.perf_counter() - start) + \
+                    np.asarray(status['P_subs'], dtype='<f8').tobytes() + \
+                    b''.join(np.ascontiguousarray(arrays[area][key], dtype='<f8').tobytes() for key in outputs)
+                _send_frame(sock, STATUS, index, seq, reply)
+            elif kind == RESULTS:
+                _send_frame(sock, RESULTS, index, seq, encode_results(store_results(models[area])))
+            else:
+                raise ValueError(f"Unknown message type {kind}")
+        except (ConnectionError, OSError):
+            raise
+        except Exception:
+            _send_frame(sock, ERROR, index, seq, traceback.format_exc().encode())
+
+def run_worker(address, system_name, areas, data_path=None, retry_s=1.0, give_up_s=300):
+    """
+    Worker of the given areas: connects to the coordinator at address, builds the models on the first connection and
+    serves until the run is closed. A lost connection is retried every retry_s seconds for up to give_up_s seconds,
+    keeping the models.
+    """
+    data_path = data_path or os.path.join(ROOT, "rawData", system_name, "csvs")
+    setup, models = None, None
+    last_contact = time.monotonic()
+    while True:
+        try:
+            sock = socket.create_connection(address, timeout=10)
+        except OSError:
+            if time.monotonic() - last_contact > give_up_s:
+                raise SystemExit(f"No coordinator at {address[0]}:{address[1]} for {give_up_s} s")
+            time.sleep(retry_s)
+            continue
+        try:
+            _connect_options(sock)
+            _send_frame(sock, HELLO, payload=json.dumps({'areas': areas}).encode())
+            kind, _, _, payload = _recv_frame(sock)
+            if kind == ERROR:
+                raise SystemExit(payload.decode())
+            if models is None:
+                setup = json.loads(payload)
+                try:
+                    models = build_area_models(setup, system_name, areas, data_path)
+                except Exception:
+                    _send_frame(sock, ERROR, payload=traceback.format_exc().encode())
+                    raise
+            _send_frame(sock, READY)
+            if serve(sock, setup, models):
+                return
+        except (ConnectionError, OSError):
+            pass ## reconnect, the models are kept
+        finally:
+            sock.close()
+        last_contact = time.monotonic()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="TCP worker solving areas for a distributed ADMM run")
+    parser.add_argument('--coordinator', required=True, help="host:port of the coordinator")
+    parser.add_argument('--system', required=True, help="system name, for its area information")
+    parser.add_argument('--areas', nargs='+', required=True)
+    parser.add_argument('--data', default=None, help="folder of the system csvs (default: rawData/<system>/csvs)")
+    parser.add_argument('--give-up', type=float, default=300, help="seconds to keep trying to reach the coordinator")
+    args = parser.parse_args()
+
+    host, port = args.coordinator.rsplit(':', 1)
+    run_worker((host, int(port)), args.system, args.areas, args.data, give_up_s=args.give_up)
@@ -0,0 +1,74 @@
+"""
+This script streams the per iteration convergence telemetry of the distributed algorithms (primal and dual residuals of
+every tie-line, stopping tolerances, objective, rho, ...) to a JSON lines file without blocking the coordinator:
+record() only puts the record on a queue, a background thread converts the arrays and writes the lines. The first
+line of a file is a header record describing the run (method, tie-lines in the row order of the residual arrays).
+
+Usage:
+    with TelemetrySink("runs/avista_sys/admm_telemetry.jsonl", method='admm', tie_lines=tie_lines.edges) as sink:
+        sink.record(iteration=i, primal=r, dual=s, primal_tie_lines=r_e, ...)
+    records = load_telemetry("runs/avista_sys/admm_telemetry.jsonl")
+"""
+import json
+import os
+import queue
+import threading
+import time
+import numpy as np
+
+_CLOSE = object()
+
+def _to_json(o):
+    if isinstance(o, np.generic):
+        return o.item()
+    if isinstance(o, np.ndarray):
+        return np.round(o, 12).tolist()
+    raise TypeError(f"{type(o).__name__} is not JSON serializable")
+
+
+class TelemetrySink:
+    """
+    Append-only JSON lines file written by a daemon thread. Records are dicts of scalars, strings and numpy arrays; the
+    arrays must not be modified after they were recorded (the coordinator hands over fresh arrays every iteration).
+    Use as a context manager or call close(), which waits until every record is written.
+    """
+    def __init__(self, path, **header):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.queue = queue.SimpleQueue()
+        self.t0 = time.perf_counter()
+        self.file = open(path, 'w')
+        self.thread = threading.Thread(target=self._write_loop, name="telemetry-sink", daemon=True)
+        self.thread.start()
+        self.record(record='header', **header)
+
+    def record(self, **fields):
+        self.queue.put({'t': time.perf_counter() - self.t0, **fields})
+
+    def _write_loop(self):
+        while True:
+            item = self.queue.get()
+            if item is _CLOSE:
+                break
+            self.file.write(json.dumps(item, default=_to_json, separators=(',', ':')) + "\n")
+        self.file.close()
+
+    def close(self):
+        if self.thread.is_alive():
+            self.queue.put(_CLOSE)
+            self.thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+## Records of a telemetry file (header first), per tie-line lists as arrays
+def load_telemetry(path):
+    records = []
+    with open(path) as f:
+        for line in f:
+            record = json.loads(line)
+            records.append({key: np.array(val) if key.endswith('_tie_lines') else val for key, val in record.items()})
+    return records
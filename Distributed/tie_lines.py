@@ -0,0 +1,71 @@
+"""
+This script holds the boundary state of the distributed algorithms as stacked arrays instead of one dictionary entry
+per tie-line end. A tie-line joins an area and one of its down_areas, and each of the two areas owns one end of it:
+
+    ends        (ends x tie-lines)   1 where an end belongs to a tie-line
+    edge_ends   (tie-lines x 2)      the parent end and the child end of every tie-line
+
+The ends are stacked area by area in the column order of the boundary arrays of the area workers (up_area, then
+down_areas), so the rows of one area are a contiguous block. Local flows and duals are (ends x T) arrays and
+consensus values (tie-lines x T) arrays. Averaging the two ends of every tie-line is ends.T @ x / 2, and handing the
+consensus values back to the ends is ends @ z, whatever the number of areas.
+"""
+import numpy as np
+import scipy.sparse as sp
+
+
+class TieLines:
+    """
+    Stacked layout of the tie-lines of area_info: edges[e] = (parent, child), end_keys[k] = (area, conn_area), rows[area]
+    the slice of the ends of an area, edge_ends[e] = (parent end, child end) and down_edges[area] the tie-lines to its
+    down_areas in their order.
+    """
+    def __init__(self, area_info):
+        self.areas = list(area_info)
+        self.edges = [(area, down) for area in self.areas for down in area_info[area]['down_areas']]
+        edge_index = {edge: e for e, edge in enumerate(self.edges)}
+        self.end_keys, self.rows, self.down_edges = [], {}, {}
+        end_edges = []
+        for area in self.areas:
+            conn_areas = area_info[area]['up_area'] + area_info[area]['down_areas']
+            self.rows[area] = slice(len(self.end_keys), len(self.end_keys) + len(conn_areas))
+            for conn_area in conn_areas:
+                edge = (area, conn_area) if (area, conn_area) in edge_index else (conn_area, area)
+                if edge not in edge_index:
+                    raise ValueError(f"{conn_area} is an up_area of {area}, but {area} is not one of its down_areas")
+                self.end_keys.append((area, conn_area))
+                end_edges.append(edge_index[edge])
+            self.down_edges[area] = np.array([edge_index[area, down] for down in area_info[area]['down_areas']], dtype=int)
+        self.end_edges = np.array(end_edges, dtype=int)
+
+        n_ends, n_edges = len(self.end_keys), len(self.edges)
+        self.ends = sp.csr_matrix((np.ones(n_ends), (np.arange(n_ends), self.end_edges)), shape=(n_ends, n_edges))
+        if np.any(np.bincount(self.end_edges, minlength=n_edges) != 2):
+            raise ValueError("Every tie-line must be listed by both of its areas (down_areas of the parent, up_area of the child)")
+        self.edge_ends = np.zeros((n_edges, 2), dtype=int)
+        for k, ((area, _), e) in enumerate(zip(self.end_keys, self.end_edges)):
+            self.edge_ends[e, 0 if self.edges[e][0] == area else 1] = k
+
+    ## (ends x T) stack of the (T x n_conn) boundary arrays of every area, e.g. the tie-line flows of the workers
+    def stack(self, by_area):
+        return np.concatenate([np.asarray(by_area[area]).T for area in self.areas], axis=0)
+
+    ## (tie-lines x T) average of the two ends of every tie-line
+    def average(self, values):
+        return 0.5 * (self.ends.T @ values)
+
+    ## (ends x T) value of its tie-line for every end
+    def spread(self, values):
+        return self.ends @ values
+
+    ## (T x n_conn) block of an (ends x T) array for the boundary arrays of an area
+    def area_values(self, values, area):
+        return values[self.rows[area]].T
+
+    ## (T x n_conn) values of the tie-lines of an area from a (tie-lines x T) array, in the order of its ends
+    def area_consensus(self, values, area):
+        return values[self.end_edges[self.rows[area]]].T
+
+    ## Tie-lines an area is at one end of
+    def area_edges(self, area):
+        return self.end_edges[self.rows[area]]
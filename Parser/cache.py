@@ -0,0 +1,100 @@
+"""
+This script caches the parsed system data next to the csvs. The profile arrays are saved as .npy files that are memory
+mapped on load and the sets and scalar battery parameters as json. The cache is keyed on the content hash of the csvs
+and on the price vector, so any change of the inputs rebuilds it automatically.
+"""
+import hashlib
+import json
+import os
+import shutil
+import numpy as np
+import pandas as pd
+from Parser.parse import parse_all_arrays
+from Parser.system_data import SystemData
+from Profiling.stages import timed
+
+CACHE_VERSION = 2 ## bump whenever the parsed layout changes
+CACHE_DIR = "_cache" ## folder created inside rawData/<system>/csvs
+
+## csv file of every parse_all_arrays argument, in argument order
+CSV_FILES = {
+    'bus': "node_data.csv",
+    'branch': "branch_data.csv",
+    'edo_kw_dis': "edo_kw_dis_profiles.csv",
+    'edo_kw_ch': "edo_kw_ch_profiles.csv",
+    'bat_kw_dis': "bat_kw_dis_profiles.csv",
+    'bat_kw_ch': "bat_kw_ch_profiles.csv",
+    'loadshape': "loadshape.csv",
+}
+
+@timed('csv_read')
+def read_system_csvs(filepath):
+    return {name: pd.read_csv(os.path.join(filepath, file)) for name, file in CSV_FILES.items()}
+
+## Key "<csv hash>_<price hash>": hash of the csv contents and the cache version, followed by the hash of the price vector
+def cache_key(filepath, price):
+    h = hashlib.sha256(f"v{CACHE_VERSION}".encode())
+    for file in CSV_FILES.values():
+        with open(os.path.join(filepath, file), 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                h.update(block)
+    price_hash = hashlib.sha256(np.asarray(price, dtype=float).tobytes())
+    return f"{h.hexdigest()[:16]}_{price_hash.hexdigest()[:16]}"
+
+def _to_json(o):
+    if isinstance(o, np.generic):
+        return o.item()
+    raise TypeError(f"{type(o).__name__} is not JSON serializable")
+
+def save_system_cache(cache_path, system):
+    tmp_path = cache_path + ".tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    for name, values in {**system.profiles, **system.series, **system.node_values}.items():
+        np.save(os.path.join(tmp_path, f"{name}.npy"), np.ascontiguousarray(values))
+    meta = {
+        'sets': system.sets,
+        'scalars': system.scalars,
+        'profiles': list(system.profiles),
+        'series': list(system.series),
+        'node_values': list(system.node_values),
+    }
+    with open(os.path.join(tmp_path, "meta.json"), 'w') as f:
+        json.dump(meta, f, default=_to_json)
+    os.replace(tmp_path, cache_path) ## the cache only becomes visible once it is complete
+
+## Loads a cached system with its arrays memory mapped copy-on-write, so in-place updates never touch the files
+@timed('load_cache')
+def load_system_cache(cache_path):
+    with open(os.path.join(cache_path, "meta.json")) as f:
+        meta = json.load(f)
+    sets = meta['sets']
+    sets['Lset'] = [tuple(line) for line in sets['Lset']]
+    ## plain ndarray views of the mappings, scalar indexing of a np.memmap is an order of magnitude slower
+    profiles = {name: np.load(os.path.join(cache_path, f"{name}.npy"), mmap_mode='c').view(np.ndarray) for name in meta['profiles']}
+    series = {name: np.load(os.path.join(cache_path, f"{name}.npy"), mmap_mode='c').view(np.ndarray) for name in meta['series']}
+    node_values = {name: np.load(os.path.join(cache_path, f"{name}.npy")) for name in meta['node_values']}
+    return SystemData(sets, profiles, series, meta['scalars'], node_values)
+
+## Returns the parsed system of the csvs in filepath, reusing the cache when the csvs and the price are unchanged
+def load_system_data(filepath, price, mode="dict", use_cache=True):
+    if not use_cache:
+        system = parse_all_arrays(**read_system_csvs(filepath), price=price)
+    else:
+        cache_root = os.path.join(filepath, CACHE_DIR)
+        key = cache_key(filepath, price)
+        cache_path = os.path.join(cache_root, key)
+        if not os.path.isdir(cache_path):
+            system = parse_all_arrays(**read_system_csvs(filepath), price=price)
+            os.makedirs(cache_root, exist_ok=True)
+            for entry in os.listdir(cache_root):
+                if not entry.startswith(key.split('_')[0]):
+                    shutil.rmtree(os.path.join(cache_root, entry), ignore_errors=True) ## drops entries of outdated csvs
+            save_system_cache(cache_path, system)
+        system = load_system_cache(cache_path)
+
+    if mode == "array":
+        return system
+    if mode != "dict":
+        raise ValueError(f"Unknown parse mode '{mode}', expected 'dict' or 'array'")
+    return system.to_dict()
@@ -3,8 +3,28 @@
 This script parses all the csv information to a data dictionary.
 """
 import numpy as np
+from Parser.system_data import SystemData
+from Profiling.stages import timed
 
-def parse_all_data(bus, branch, edo_kw_dis, edo_kw_ch, bat_kw_dis, bat_kw_ch, loadshape,price):
+## Scalar battery parameters shared by every parse mode
+def battery_parameters():
+    Pb_R = 500 ## Rated capacity of a battery
+    bmin = 0.3 * Pb_R * 4 ## mimimum state of charge set to 30% of rated energy(KWh). 4 indicates the battery can charge/discharge continuously with its rated capacity for 4 hours.
+    bmax = 0.95 * Pb_R * 4 ## maximum state of charge set to 95% of rated energy(KWh).
+    b0 = (bmin+bmax)/2 ## initial state of charge (soc) set to mid-point of minimum and maximum soc.
+    n_c = 0.95 ## charging efficiency set to 95%
+    n_d = 0.95 ## discharging efficiency set to 95%
+    delta_t = 1 ## time interval of 1 hour.
+    return {'Pb_R': Pb_R, 'bmin': bmin, 'bmax': bmax, 'b0': b0, 'n_c': n_c, 'n_d': n_d, 'delta_t': delta_t}
+
+## Reads the profile columns of the given nodes for every time period in one pass as a dense (T x n) array
+def profile_array(profile, Tset, nodes):
+    lookup = profile.set_index(profile.columns[0])
+    return lookup.reindex(index=Tset, columns=[str(i) for i in nodes]).to_numpy(dtype=float)
+
+## Parses the csvs into a SystemData object holding (T x n) NumPy arrays plus node and time index maps
+@timed('parse_all_data')
+def parse_all_arrays(bus, branch, edo_kw_dis, edo_kw_ch, bat_kw_dis, bat_kw_ch, loadshape, price):
     bus_set = sorted(set(bus['Nodes']))  ## Set of all nodes in the system
     edo_set = sorted(set(edo_kw_ch.columns[1:].astype(int))) ## Set of all edo nodes in the system
     bat_set = sorted(set(bat_kw_ch.columns[1:].astype(int))) ## Set of all battery nodes in the system
@@ -12,56 +32,33 @@ def parse_all_data(bus, branch, edo_kw_dis, edo_kw_ch, bat_kw_dis, bat_kw_ch, lo
     substationBus = list(set(branch['fb']) - set(branch['tb'])) ## Substation Bus Indicator
     T = len(loadshape) ## Length of optimization horizon
     Tset = np.arange(1, T + 1) ## Set of time periods in optimization horizon
+    if len(price) < T:
+        raise ValueError(f"price has {len(price)} values, the loadshape needs one for each of its {T} time periods")
 
-    ## parsing profiles_data and creating corresponding dictionaries
-    loadshape_dict = dict(zip(loadshape['time'], loadshape['M']))
-    loadshape = {t: loadshape_dict[t] for t in Tset}
-    costshape = {t : price[t-1] for t in Tset} ## indicates price of energy variation over time
+    loadshape_vals = loadshape.set_index('time')['M'].reindex(Tset).to_numpy(dtype=float) ## load multiplier of every time period
+    costshape_vals = np.asarray(price[:T], dtype=float) ## indicates price of energy variation over time
+    bus_p = bus.set_index('Nodes')['P'].reindex(bus_set).to_numpy(dtype=float) ## nominal load of every node
 
-    ## parsing bus_data
-    bus_lookup = bus.set_index('Nodes')
-    p_L = {(t, i): bus_lookup.at[i, "P"] * loadshape[t] for t in Tset for i in bus_set} ## time varying loads of all nodes
+    profiles = {
+        'p_L': np.outer(loadshape_vals, bus_p), ## time varying loads of all nodes
+        'edo_ch': profile_array(edo_kw_ch, Tset, edo_set), ## time varying edo nodes charging power limits
+        'edo_dis': profile_array(edo_kw_dis, Tset, edo_set), ## time varying edo nodes discharging power limits
+        'bat_ch': profile_array(bat_kw_ch, Tset, bat_set), ## time varying battery nodes charging power limits. Not used
+        'bat_dis': profile_array(bat_kw_dis, Tset, bat_set), ## time varying battery nodes discharging power limits. Not used
+    }
+    sets = {"Nset": bus_set, "Lset": branch_set, "Eset": edo_set, "Bset": bat_set, 'substationBus': substationBus}
+    series = {'loadshape': loadshape_vals, 'costshape': costshape_vals}
+    scalars = {'T': T, **battery_parameters()}
 
-    ## parsing edo_data
-    edo_ch_lookup = edo_kw_ch.set_index('t')
-    edo_ch = {(t, i): edo_ch_lookup.at[t, str(i)] for t in Tset for i in edo_set} ## time varying edo nodes charging power limits
-    edo_dis_lookup = edo_kw_dis.set_index('t')
-    edo_dis = {(t, i): edo_dis_lookup.at[t, str(i)] for t in Tset for i in edo_set} ## time varying edo nodes discharging power limits
+    node_values = {'p_L_nom': bus_p}
 
-    ## parsing bat_data
-    bat_ch_lookup = bat_kw_ch.set_index('t')
-    bat_ch = {(t, i): bat_ch_lookup.at[t, str(i)] for t in Tset for i in bat_set} ## ## time varying battery nodes charging power limits. Not used
-    bat_dis_lookup = bat_kw_dis.set_index('t')
-    bat_dis = {(t, i): bat_dis_lookup.at[t, str(i)] for t in Tset for i in bat_set} ## time varying battery nodes discharging power limits. Not used
-    Pb_R = 500 ## Rated capacity of a battery
-    bmin = 0.3 * Pb_R * 4 ## mimimum state of charge set to 30% of rated energy(KWh). 4 indicates the battery can charge/discharge continuously with its rated capacity for 4 hours.
-    bmax = 0.95 * Pb_R * 4 ## maximum state of charge set to 95% of rated energy(KWh).
-    b0 = (bmin+bmax)/2 ## initial state of charge (soc) set to mid-point of minimum and maximum soc.
-    n_c = 0.95 ## charging efficiency set to 95%
-    n_d = 0.95 ## discharging efficiency set to 95%
-    delta_t = 1 ## time interval of 1 hour.
+    return SystemData(sets, profiles, series, scalars, node_values)
 
-    data = {
-        "Nset": bus_set,
-        "Lset": branch_set,
-        "Eset": edo_set,
-        "Bset": bat_set,
-        'substationBus': substationBus,
-        'T': T,
-        'Tset': Tset,
-        'p_L': p_L,
-        'edo_ch': edo_ch,
-        'edo_dis': edo_dis,
-        'bat_ch': bat_ch,
-        'bat_dis': bat_dis,
-        'Pb_R': Pb_R,
-        'bmin': bmin,
-        'bmax': bmax,
-        'b0': b0,
-        'n_c': n_c,
-        'n_d': n_d,
-        'delta_t': delta_t,
-        'loadshape': loadshape,
-        'costshape': costshape
-    }
-    return data
+## mode="dict" returns the tuple-keyed data dictionary, mode="array" returns the array-backed SystemData object
+def parse_all_data(bus, branch, edo_kw_dis, edo_kw_ch, bat_kw_dis, bat_kw_ch, loadshape, price, mode="dict"):
+    system = parse_all_arrays(bus, branch, edo_kw_dis, edo_kw_ch, bat_kw_dis, bat_kw_ch, loadshape, price)
+    if mode == "array":
+        return system
+    if mode != "dict":
+        raise ValueError(f"Unknown parse mode '{mode}', expected 'dict' or 'array'")
+    return system.to_dict()
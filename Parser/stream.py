@@ -0,0 +1,58 @@
+"""
+This script streams the time varying profiles (loadshape, edo and battery profiles) in fixed size time windows, so that
+year long or sub-hourly horizons can be processed in bounded memory. Each window is parsed into its own data dictionary
+with a local horizon Tset = 1..window, exactly like parse_all_data does for a whole horizon.
+"""
+import os
+from itertools import zip_longest
+import numpy as np
+import pandas as pd
+from Parser.cache import CSV_FILES
+from Parser.parse import parse_all_arrays
+
+PROFILE_FILES = ('edo_kw_dis', 'edo_kw_ch', 'bat_kw_dis', 'bat_kw_ch', 'loadshape') ## csvs read chunk by chunk
+
+## Renumbers the time column of a chunk to the local horizon 1..len(chunk)
+def _local_time(chunk):
+    chunk = chunk.copy()
+    chunk[chunk.columns[0]] = np.arange(1, len(chunk) + 1)
+    return chunk
+
+def iter_system_windows(filepath, price, window, delta_t=1, mode="dict", drop_last=False):
+    """
+    Lazily yields one data dictionary per time window of the profiles in filepath.
+
+    price holds hourly values, either one per hour of the horizon or a shorter profile (e.g. 24 hourly prices) that is
+    repeated cyclically. delta_t is the length of one time period in hours (0.25 for 15 minute profiles), every period
+    gets the price of the hour it starts in.
+    Every window carries 't0', the global index of its first period. The last, shorter window is dropped when
+    drop_last is True.
+    """
+    if mode not in ("dict", "array"):
+        raise ValueError(f"Unknown parse mode '{mode}', expected 'dict' or 'array'")
+    bus = pd.read_csv(os.path.join(filepath, CSV_FILES['bus']))
+    branch = pd.read_csv(os.path.join(filepath, CSV_FILES['branch']))
+    price = np.asarray(price, dtype=float)
+    if delta_t <= 0 or (delta_t < 1 and not np.isclose(1 / delta_t, round(1 / delta_t))):
+        raise ValueError(f"delta_t={delta_t} h does not divide an hour into whole time periods")
+    readers = [pd.read_csv(os.path.join(filepath, CSV_FILES[name]), chunksize=window) for name in PROFILE_FILES]
+
+    t0 = 1
+    try:
+        for chunks in zip_longest(*readers):
+            T = len(chunks[-1]) if chunks[-1] is not None else 0
+            if any(chunk is None or len(chunk) != T for chunk in chunks):
+                raise ValueError(f"Profile csvs in {filepath} have different lengths around period {t0}")
+            if T < window and drop_last:
+                break
+            hours = np.floor(np.arange(t0 - 1, t0 - 1 + T) * delta_t + 1e-9).astype(int) ## hour each period starts in
+            price_window = price[hours % len(price)]
+            profiles = dict(zip(PROFILE_FILES, (_local_time(chunk) for chunk in chunks)))
+            system = parse_all_arrays(bus, branch, price=price_window, **profiles)
+            system.scalars['delta_t'] = delta_t
+            system.scalars['t0'] = t0
+            yield system if mode == "array" else system.to_dict()
+            t0 += T
+    finally:
+        for reader in readers:
+            reader.close()
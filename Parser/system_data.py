@@ -0,0 +1,162 @@
+"""
+This script holds the array-backed container of the parsed system data. Every time varying profile is stored once as a
+dense (T x n) NumPy array together with the node and time index maps, and the container exposes dict-compatible
+views so that build_pyomo_model and split_data_into_areas can keep reading data['p_L'][t, i] as before.
+"""
+from collections.abc import ItemsView, Mapping, MutableMapping
+import numpy as np
+
+
+class ArrayItems(ItemsView):
+    """
+    items() of the array views, pairing the keys with the array values in one pass instead of one lookup per key.
+    """
+    def __iter__(self):
+        return zip(self._mapping, self._mapping.flat_values())
+
+
+class SeriesView(Mapping):
+    """
+    Dict-compatible {t: value} view over a 1-D array indexed by time period.
+    """
+    def __init__(self, values, time_index):
+        self.values = values
+        self.time_index = time_index
+
+    def __getitem__(self, t):
+        return float(self.values[self.time_index[t]])
+
+    def __iter__(self):
+        return iter(self.time_index)
+
+    def __len__(self):
+        return len(self.time_index)
+
+    def items(self):
+        return ArrayItems(self)
+
+    def flat_values(self):
+        return self.values[list(self.time_index.values())].tolist()
+
+
+class ProfileView(MutableMapping):
+    """
+    Dict-compatible {(t, node): value} view over a dense (T x n) array. Writes go straight into the array, which keeps
+    update_area_values working on the boundary loads of the dummy nodes.
+    """
+    def __init__(self, values, time_index, node_index):
+        self.values = values
+        self.time_index = time_index
+        self.node_index = node_index
+
+    def __getitem__(self, key):
+        t, i = key
+        try:
+            return float(self.values[self.time_index[t], self.node_index[i]])
+        except KeyError:
+            raise KeyError(key) from None
+
+    def __setitem__(self, key, val):
+        t, i = key
+        try:
+            self.values[self.time_index[t], self.node_index[i]] = np.asarray(val, dtype=float).item()
+        except KeyError:
+            raise KeyError(key) from None
+
+    def __delitem__(self, key):
+        raise TypeError("entries of an array-backed profile cannot be deleted")
+
+    def __contains__(self, key):
+        try:
+            t, i = key
+        except (TypeError, ValueError):
+            return False
+        return t in self.time_index and i in self.node_index
+
+    def __iter__(self):
+        return ((t, i) for t in self.time_index for i in self.node_index) ## same (time major) order as the parsed dicts
+
+    def __len__(self):
+        return len(self.time_index) * len(self.node_index)
+
+    def items(self):
+        return ArrayItems(self)
+
+    ## Values in key order as a list
+    def flat_values(self):
+        return self.values[np.ix_(list(self.time_index.values()), list(self.node_index.values()))].ravel().tolist()
+
+    def column(self, i):
+        return self.values[:, self.node_index[i]] ## time series of one node (a view, not a copy)
+
+
+class SystemData(Mapping):
+    """
+    Compact system data: sets, (T x n) profile arrays with their index maps and the scalar battery parameters.
+    data[key] returns the same kind of object parse_all_data used to put under that key, with the profiles wrapped in
+    ProfileView/SeriesView instead of tuple-keyed dicts.
+    """
+    profile_sets = {'p_L': 'Nset', 'edo_ch': 'Eset', 'edo_dis': 'Eset', 'bat_ch': 'Bset', 'bat_dis': 'Bset'} ## profile name -> set of its columns
+    series_names = ('loadshape', 'costshape')
+    node_value_sets = {'p_L_nom': 'Nset'} ## name of the time invariant node values -> set they are indexed by
+
+    def __init__(self, sets, profiles, series, scalars, node_values=None):
+        self.sets = sets ## Nset, Lset, Eset, Bset, substationBus
+        self.profiles = profiles ## name -> (T x n) float array
+        self.series = series ## name -> (T,) float array
+        self.scalars = scalars ## T, Pb_R, bmin, bmax, b0, n_c, n_d, delta_t
+        self.node_values = node_values or {} ## name -> (n,) float array, e.g. the nominal node loads of node_data.csv
+        self.Tset = np.arange(1, scalars['T'] + 1)
+        self.time_index = {t: k for k, t in enumerate(self.Tset)}
+        self.index = {name: {i: k for k, i in enumerate(nodes)} for name, nodes in sets.items() if name != 'Lset'}
+        self.line_index = {line: k for k, line in enumerate(sets['Lset'])}
+        self._views = {}
+
+    def __getitem__(self, key):
+        if key in self._views:
+            return self._views[key]
+        if key == 'Tset':
+            return self.Tset
+        if key in self.sets:
+            return self.sets[key]
+        if key in self.scalars:
+            return self.scalars[key]
+        if key in self.profiles:
+            view = ProfileView(self.profiles[key], self.time_index, self.index[self.profile_sets[key]])
+        elif key in self.series:
+            view = SeriesView(self.series[key], self.time_index)
+        elif key in self.node_values:
+            view = dict(zip(self.sets[self.node_value_sets[key]], self.node_values[key].tolist()))
+        else:
+            raise KeyError(key)
+        self._views[key] = view
+        return view
+
+    def __iter__(self):
+        yield from self.sets
+        yield 'Tset'
+        yield from self.scalars
+        yield from self.profiles
+        yield from self.series
+        yield from self.node_values
+
+    def __len__(self):
+        return len(self.sets) + 1 + len(self.scalars) + len(self.profiles) + len(self.series) + len(self.node_values)
+
+    def to_dict(self):
+        """
+        Materializes the tuple-keyed dictionaries produced by the dict parse mode.
+        """
+        data = {key: self[key] for key in self.sets}
+        data['T'] = self.scalars['T']
+        data['Tset'] = self.Tset
+        for name, values in self.profiles.items():
+            nodes = self.sets[self.profile_sets[name]]
+            keys = ((t, i) for t in self.Tset for i in nodes)
+            data[name] = dict(zip(keys, values.ravel().tolist()))
+        data.update({key: val for key, val in self.scalars.items() if key != 'T'})
+        for name, values in self.series.items():
+            data[name] = dict(zip(self.Tset, values.tolist()))
+        for name in self.node_values:
+            data[name] = self[name]
+        return data
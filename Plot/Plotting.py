@@ -2,6 +2,7 @@ import os
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
+from Profiling.stages import timed
 
 ###############################################################################
 # Helper function to save Plotly figures as PNG
@@ -19,6 +20,7 @@ def save_plot_png(fig, filename):
 ###############################################################################
 # 1) plot_substation_power
 ###############################################################################
+@timed('plotting')
 def plot_substation_power(**modelVals_dict):
     """
     Usage example:
@@ -79,6 +81,7 @@ def plot_substation_power(**modelVals_dict):
 ###############################################################################
 # 2) plot_active_power_flows
 ###############################################################################
+@timed('plotting')
 def plot_active_power_flows(**modelVals_dict):
     """
     Usage:
@@ -127,6 +130,7 @@ def plot_active_power_flows(**modelVals_dict):
 ###############################################################################
 # 3) plot_edo_charging_discharging_combined
 ###############################################################################
+@timed('plotting')
 def plot_edo_charging_discharging_combined(**modelVals_dict):
     """
     Usage:
@@ -190,6 +194,7 @@ def plot_edo_charging_discharging_combined(**modelVals_dict):
 ###############################################################################
 # 4) plot_battery_charging_discharging_combined
 ###############################################################################
+@timed('plotting')
 def plot_battery_charging_discharging_combined(**modelVals_dict):
     """
     Usage:
@@ -252,6 +257,7 @@ def plot_battery_charging_discharging_combined(**modelVals_dict):
 ###############################################################################
 # 5) plot_battery_soc
 ###############################################################################
+@timed('plotting')
 def plot_battery_soc(**modelVals_dict):
     """
     Usage:
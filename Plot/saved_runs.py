@@ -0,0 +1,72 @@
+"""
+This script redraws the plots of main.py and compares the methods from the runs saved by main.py (runs/<system>/<method>)
+instead of solving them again. Only the variables of the selected plots and the selected time periods are read.
+
+Usage:
+    python -m Plot.saved_runs --system avista_sys --plots substation soc --start 8 --end 20
+"""
+import argparse
+import os
+import numpy as np
+from Build_Model.run_store import load_metadata, load_results, load_history, saved_methods
+from Plot.Plotting import plot_substation_power, plot_active_power_flows, plot_edo_charging_discharging_combined, \
+    plot_battery_charging_discharging_combined, plot_battery_soc
+
+## plot name -> (plot function, variables it needs)
+PLOTS = {
+    'substation': (plot_substation_power, ('P_subs',)),
+    'battery': (plot_battery_charging_discharging_combined, ('P_c', 'P_d')),
+    'edo': (plot_edo_charging_discharging_combined, ('Pe_c', 'Pe_d')),
+    'flows': (plot_active_power_flows, ('P',)),
+    'soc': (plot_battery_soc, ('B',)),
+}
+
+def load_runs(run_path, methods=None, variables=None, times=None):
+    """
+    Lazily loaded Results of the saved methods of a run folder by method name, limited to variables and times
+    (see load_results).
+    """
+    methods = methods or saved_methods(run_path)
+    return {method: load_results(os.path.join(run_path, method), variables, times) for method in methods}
+
+def print_comparison(run_path, runs):
+    """
+    Objective value, iterations and the largest deviation of the substation power from the first method.
+    """
+    reference = next(iter(runs.values()))
+    print(f"{'method':>10} {'objective':>16} {'iterations':>11} {'max |dP_subs|':>14}")
+    for method, results in runs.items():
+        meta = load_metadata(os.path.join(run_path, method))
+        history = load_history(os.path.join(run_path, method), meta=meta)
+        iterations = len(history['objective']) if 'objective' in history else '-'
+        objective = results.objective_value
+        if objective is None and 'objective' in history:
+            objective = float(history['objective'][-1]) ## final iterate of a distributed run
+        deviation = '-'
+        if 'P_subs' in results.arrays and 'P_subs' in reference.arrays:
+            deviation = f"{np.max(np.abs(results.arrays['P_subs'] - reference.arrays['P_subs'])):.4f}"
+        print(f"{method:>10} {objective if objective is not None else '-':>16} {iterations:>11} {deviation:>14}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Plots and comparison of saved runs")
+    parser.add_argument('--system', default='avista_sys')
+    parser.add_argument('--methods', nargs='*', default=None, help="saved methods to load (default: all)")
+    parser.add_argument('--plots', nargs='*', default=list(PLOTS), choices=list(PLOTS))
+    parser.add_argument('--start', type=int, default=None, help="first time period")
+    parser.add_argument('--end', type=int, default=None, help="last time period")
+    args = parser.parse_args()
+
+    run_path = os.path.join(os.getcwd(), "runs", args.system)
+    methods = args.methods or saved_methods(run_path)
+    if not methods:
+        raise SystemExit(f"No saved runs in {run_path}, run main.py with save_runs = True first")
+    first_meta = load_metadata(os.path.join(run_path, methods[0]))
+    start = args.start if args.start is not None else first_meta['Tset'][0]
+    end = args.end if args.end is not None else first_meta['Tset'][-1]
+    variables = sorted({var for name in args.plots for var in PLOTS[name][1]} | {'P_subs'})
+    runs = load_runs(run_path, methods, variables, times=(start, end))
+
+    print_comparison(run_path, runs)
+    for name in args.plots:
+        PLOTS[name][0](**{f"{method}Vals": results for method, results in runs.items()})
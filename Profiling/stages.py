@@ -0,0 +1,170 @@
+"""
+This script records the wall time and peak memory of the stages of a run (csv read, parsing, area split, model build,
+objective construction, solver call, store_results, consensus updates, plotting). Stages are marked with
+
+    with stage('build_pyomo_model', area='area2'):
+        ...
+
+or the @timed(name) decorator, and nest: a stage inherits the tags (area, iteration) of the stage around it. While
+profiling is disabled, stage() returns one shared empty context manager, so the marks cost a function call. Stages
+that run in the worker processes of ADMM/EnAPP are recorded inside worker_stage() and sent back with the task results
+to be merged into the records of the main process with add_records(). Only the main thread of a process records
+stages: the stack of the open stages is shared by all threads, so the marks are no-ops on the other threads.
+
+Memory is the peak of the Python/NumPy allocations traced by tracemalloc during the stage, relative to its start.
+"""
+import contextlib
+import csv
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+
+FIELDS = ('stage', 'parent', 'area', 'iteration', 'pid', 'start_s', 'wall_s', 'peak_mb')
+
+_NULL = contextlib.nullcontext()
+_state = {'enabled': False, 'memory': False, 't0': 0.0, 'pid': None}
+_records = [] ## finished stages of this process
+_open = [] ## stack of the running stages: [name, tags, start, start_mem, max_peak]
+
+def enable(memory=True):
+    """
+    Starts recording. memory=True also traces the allocations to get the peak memory of every stage, which slows
+    allocation heavy code down noticeably, so use memory=False for timings only.
+    """
+    _state.update(enabled=True, memory=memory, t0=_state['t0'] or time.perf_counter(), pid=os.getpid())
+    if memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+def disable():
+    _state['enabled'] = False
+    if _state['memory'] and tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+def enabled():
+    return _state['enabled']
+
+def _recording():
+    return _state['enabled'] and threading.current_thread() is threading.main_thread()
+
+def stage(name, **tags):
+    if not _recording():
+        return _NULL
+    return _stage(name, tags)
+
+## Decorator recording every call of a function as the stage name
+def timed(name):
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _recording():
+                return func(*args, **kwargs)
+            with _stage(name, {}):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+## Settings to pass to the pool workers with their task, None while profiling is disabled
+def worker_settings(**tags):
+    return {'memory': _state['memory'], 't0': _state['t0'], 'tags': tags} if _state['enabled'] else None
+
+@contextlib.contextmanager
+def worker_stage(settings, name, **tags):
+    """
+    Stage around the task of a pool worker. settings comes from worker_settings() in the main process. The records of
+    the task are put into the yielded list when the stage ends, to be returned with the task results.
+    """
+    task_records = []
+    if settings is None or threading.current_thread() is not threading.main_thread():
+        yield task_records
+        return
+    if _state['pid'] != os.getpid():
+        _records.clear() ## records and open stages a forked worker inherited from the main process
+        _open.clear()
+    if not _state['enabled'] or _state['pid'] != os.getpid():
+        _state['t0'] = settings['t0'] ## perf_counter is system wide, so start_s of the workers lines up with the main process
+        enable(memory=settings['memory'])
+    with _stage(name, {**settings['tags'], **tags}):
+        yield task_records
+    task_records.extend(drain())
+
+@contextlib.contextmanager
+def _stage(name, tags):
+    memory = _state['memory']
+    if _open:
+        tags = {**_open[-1][1], **tags}
+    if memory:
+        current, peak = tracemalloc.get_traced_memory()
+        for frame in _open:
+            frame[4] = max(frame[4], peak) ## the reset below would hide this peak from the enclosing stages
+        tracemalloc.reset_peak()
+    else:
+        current = 0
+    frame = [name, tags, time.perf_counter(), current, current]
+    _open.append(frame)
+    try:
+        yield
+    finally:
+        end = time.perf_counter()
+        _open.pop()
+        record = {'stage': name, 'parent': _open[-1][0] if _open else None, 'area': tags.get('area'),
+                  'iteration': tags.get('iteration'), 'pid': os.getpid(), 'start_s': frame[2] - _state['t0'],
+                  'wall_s': end - frame[2], 'peak_mb': None}
+        if memory:
+            frame[4] = max(frame[4], tracemalloc.get_traced_memory()[1])
+            record['peak_mb'] = (frame[4] - frame[3]) / 2 ** 20
+            if _open:
+                _open[-1][4] = max(_open[-1][4], frame[4])
+        _records.append(record)
+
+## Returns the records of this process and clears them, used to send the stages of a worker back with its results
+def drain():
+    records = list(_records)
+    _records.clear()
+    return records
+
+def add_records(records):
+    _records.extend(records)
+
+def records():
+    return list(_records)
+
+def reset():
+    _records.clear()
+    _state['t0'] = time.perf_counter() if _state['enabled'] else 0.0
+
+def summary(by=('stage',)):
+    """
+    Totals per stage (or per ('stage', 'area'), ('stage', 'iteration'), ...): count, total and max wall time and the
+    largest peak memory.
+    """
+    rows = {}
+    for r in _records:
+        key = tuple(r[k] for k in by)
+        row = rows.setdefault(key, {**dict(zip(by, key)), 'count': 0, 'wall_s': 0.0, 'max_wall_s': 0.0, 'peak_mb': None})
+        row['count'] += 1
+        row['wall_s'] += r['wall_s']
+        row['max_wall_s'] = max(row['max_wall_s'], r['wall_s'])
+        if r['peak_mb'] is not None:
+            row['peak_mb'] = max(row['peak_mb'] or 0.0, r['peak_mb'])
+    return list(rows.values())
+
+def print_summary(by=('stage',)):
+    print(f"{' / '.join(by):>32} {'count':>6} {'total [s]':>10} {'max [s]':>9} {'peak [MB]':>10}")
+    for row in sorted(summary(by), key=lambda r: -r['wall_s']):
+        label = ' / '.join(str(row[k]) for k in by)
+        peak = '-' if row['peak_mb'] is None else f"{row['peak_mb']:.2f}"
+        print(f"{label:>32} {row['count']:6d} {row['wall_s']:10.3f} {row['max_wall_s']:9.3f} {peak:>10}")
+
+def export_json(path):
+    with open(path, 'w') as f:
+        json.dump({'records': _records, 'summary': summary(), 'summary_by_area': summary(('stage', 'area')),
+                   'summary_by_iteration': summary(('stage', 'iteration'))}, f, indent=1)
+
+def export_csv(path):
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDS)
+        writer.writeheader()
+        writer.writerows(_records)
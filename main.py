@@ -1,67 +1,124 @@
 # %% Importing all the required Modules
-from Parser.parse import parse_all_data
+from Parser.cache import load_system_data
 from Build_Model.Constraints import build_pyomo_model
 from Build_Model.Objective import cost_minimize,cost_minimize_with_discharging_cost,pyomo_solve ## Similarly others can also be imported with their name
 from Build_Model.store import store_results
+from Build_Model.matrix_lp import solve_matrix_lp
+from Build_Model.rolling import solve_rolling_horizon
+from Build_Model.solvers import set_solver
+from Build_Model.run_store import save_results
 from Plot.Plotting import *
 import pandas as pd
 from Distributed.separate_areas import split_data_into_areas
 from Distributed.area_informatiion import *
 from Distributed.admm import solve_ADMM
 from Distributed.enapp import solve_EnAPP
+from Profiling import stages
 
 system_name = 'avista_sys' ## System name
-area_info = eval(f'{system_name}' + '_area_info') ## Gives Information about the area interconnection
+area_info = get_area_info(system_name) ## Gives Information about the area interconnection
 obj = cost_minimize  ## Objective function to be used
+backend = 'pyomo' ## 'pyomo' builds the Pyomo model, 'matrix' solves the same LP from sparse matrices in process (centralized only)
+set_solver('auto') ## solver registered in Build_Model/solvers.py, 'auto' picks an in-process persistent solver for LP/QP
+executor = 'auto' ## where ADMM/EnAPP solve the areas: 'serial', 'thread' (with OSQP), 'process' (one worker per core) or 'auto'
+save_trajectories = False ## streams every consensus/dual iterate of ADMM and EnAPP to runs/<system_name>/<method>_trajectory
+save_runs = True ## saves the results of every method to runs/<system_name>/<method>, to be replotted with Plot/saved_runs.py
+save_telemetry = False ## streams the per iteration residuals of ADMM and EnAPP to runs/<system_name>/<method>_telemetry.jsonl
+save_checkpoints = False ## checkpoints the ADMM/EnAPP coordinator state to runs/<system_name>/<method>_checkpoint.npz every 10 iterations
+resume = False ## continues ADMM/EnAPP from those checkpoints instead of starting over
+profiling = False ## records wall time and peak memory of every stage, exported to profile_<system_name>.json/.csv
+if profiling:
+    stages.enable(memory=True)
 
 wd = os.getcwd()
 filepath = os.path.join(wd, "rawData", system_name,"csvs") ## Connects to the path of all csvs corresponding to system name
 
-# Import CSV files
-bus_data = pd.read_csv(os.path.join(filepath, "node_data.csv"))
-branch_data = pd.read_csv(os.path.join(filepath, "branch_data.csv"))
-edo_kw_dis_data = pd.read_csv(os.path.join(filepath, "edo_kw_dis_profiles.csv"))
-edo_kw_ch_data = pd.read_csv(os.path.join(filepath, "edo_kw_ch_profiles.csv"))
-bat_kw_dis_data = pd.read_csv(os.path.join(filepath, "bat_kw_dis_profiles.csv"))
-bat_kw_ch_data = pd.read_csv(os.path.join(filepath, "bat_kw_ch_profiles.csv"))
-loadshape_data = pd.read_csv(os.path.join(filepath, "loadshape.csv"))
 ## using arbitrary price profile for 24 hours
 price = [0.1,0.1,0.1,0.1,0.1,0.12,0.15,0.18,0.2,0.2,0.22,0.25,0.25,0.28,0.33,0.3,0.25,0.22,0.15,0.12,0.12,0.1,0.1,0.1]
 
-data = parse_all_data(bus_data, branch_data, edo_kw_dis_data, edo_kw_ch_data, bat_kw_dis_data, bat_kw_ch_data, loadshape_data,price)
+## Parses the csvs once and reuses the binary cache in filepath/_cache on later runs, as long as the csvs and price are unchanged
+data = load_system_data(filepath, price, mode="array", use_cache=True)
 
 # %%
 if __name__ == "__main__":
     centralized = True
     ADMM = True
     enapp = True
+    rolling = False ## receding horizon re-dispatch, one step per period
+    run_path = os.path.join(wd, "runs", system_name)
+    run_info = {'system': system_name, 'objective_function': obj.__name__, 'backend': backend}
 
     if centralized:
         print("Solving centralized problem...")
-        centralized_model = build_pyomo_model(data)
-        centralized_model = pyomo_solve(centralized_model,obj)
-        copfVals = store_results(centralized_model)
+        if backend == 'matrix':
+            copfVals = solve_matrix_lp(data, obj)
+        else:
+            centralized_model = build_pyomo_model(data)
+            centralized_model = pyomo_solve(centralized_model,obj)
+            copfVals = store_results(centralized_model)
         print(f"COPF Objective Value:{copfVals['objective_value']}")
+        if save_runs:
+            save_results(os.path.join(run_path, "copf"), copfVals, metadata=run_info)
 
     if ADMM:
         print("Solving ADMM ...")
         data_area = split_data_into_areas(data, area_info)
-        admmVals,admm_obj,admm_aug_obj,admm_conv = solve_ADMM(data, data_area, area_info, obj, rho=5e-5, max_iterations=500)
+        rho = 5e-5 ## ADMM penalty parameter
+        admm_mode = 'sync' ## 'async' updates every tie-line as soon as both its areas report, without a barrier per iteration
+        adaptive_rho = False ## rebalance rho every iteration from the primal and dual residuals (sync mode only)
+        relaxation = 1.0 ## over-relaxation alpha, e.g. 1.6 roughly halves the iterations on the test feeders
+        admm_checkpoint = os.path.join(run_path, "admm_checkpoint.npz")
+        eps_abs, eps_rel = None, 1e-3 ## residual based stopping tolerances, only used with eps_abs set (0: eps_rel alone), eps_abs=None stops on the largest tie-line change
+        admm_tcp = None ## solve the areas in TCP workers instead, e.g. {'launch': system_name} on this machine or {'host': '0.0.0.0', 'port': 5555} for workers started elsewhere (Distributed/tcp_workers.py)
+        admmVals,admm_obj,admm_aug_obj,admm_conv = solve_ADMM(data, data_area, area_info, obj, rho=rho, max_iterations=500, mode=admm_mode,
+                                                              adaptive_rho=adaptive_rho, relaxation=relaxation, eps_abs=eps_abs, eps_rel=eps_rel,
+                                                              telemetry_path=os.path.join(run_path, "admm_telemetry.jsonl") if save_telemetry else None,
+                                                              trajectory_path=os.path.join(run_path, "admm_trajectory") if save_trajectories else None,
+                                                              checkpoint_path=admm_checkpoint if save_checkpoints else None,
+                                                              executor='tcp' if admm_tcp else executor, tcp=admm_tcp,
+                                                              resume_from=admm_checkpoint if resume and os.path.exists(admm_checkpoint) else None)
         print(f"ADMM Objective Value:{admm_obj}")
+        if save_runs:
+            save_results(os.path.join(run_path, "admm"), admmVals, history={'objective': admm_obj, 'convergence': admm_conv},
+                         metadata={**run_info, 'rho': rho, 'mode': admm_mode, 'adaptive_rho': adaptive_rho, 'relaxation': relaxation,
+                                   'eps_abs': eps_abs, 'eps_rel': eps_rel})
         print("ADMM ran successfully")
 
 
     if enapp:
         print("Solving EnAPP ...")
         data_area = split_data_into_areas(data, area_info)
-        enappVals, enapp_obj,enapp_conv = solve_EnAPP(data, data_area, area_info, obj, max_iterations=50)
+        enapp_checkpoint = os.path.join(run_path, "enapp_checkpoint.npz")
+        enapp_schedule = 'wavefront' ## solves the area tree leaves first and skips areas with unchanged inputs, 'sweep' solves every area every iteration
+        enappVals, enapp_obj,enapp_conv = solve_EnAPP(data, data_area, area_info, obj, max_iterations=50,
+                                                        trajectory_path=os.path.join(run_path, "enapp_trajectory") if save_trajectories else None,
+                                                        telemetry_path=os.path.join(run_path, "enapp_telemetry.jsonl") if save_telemetry else None,
+                                                        checkpoint_path=enapp_checkpoint if save_checkpoints else None, executor=executor,
+                                                        schedule=enapp_schedule,
+                                                        resume_from=enapp_checkpoint if resume and os.path.exists(enapp_checkpoint) else None)
         print(f"Enapp Objective Value:{enapp_obj}")
+        if save_runs:
+            save_results(os.path.join(run_path, "enapp"), enappVals, history={'objective': enapp_obj, 'convergence': enapp_conv},
+                         metadata={**run_info, 'schedule': enapp_schedule})
         print("EnAPP ran successfully")
 
+    if rolling:
+        print("Solving rolling horizon ...")
+        rollingVals = solve_rolling_horizon(data, obj, horizon=24, backend=backend)
+        print(f"Rolling horizon realized cost:{rollingVals['objective_value']}")
+        if save_runs:
+            save_results(os.path.join(run_path, "rolling"), rollingVals, metadata={**run_info, 'horizon': 24})
+
     plot_substation_power(copfVals=copfVals,admmVals=admmVals,enappVals=enappVals)
     plot_battery_charging_discharging_combined(copfVals=copfVals,admmVals=admmVals,enappVals=enappVals)
     plot_edo_charging_discharging_combined(copfVals=copfVals,admmVals=admmVals,enappVals=enappVals)
     plot_active_power_flows(copfVals=copfVals,admmVals=admmVals,enappVals=enappVals)
     plot_battery_soc(copfVals=copfVals,admmVals=admmVals,enappVals=enappVals)
 
+    if profiling:
+        stages.export_json(os.path.join(wd, f"profile_{system_name}.json"))
+        stages.export_csv(os.path.join(wd, f"profile_{system_name}.csv"))
+        stages.print_summary()
+        stages.print_summary(by=('stage', 'area'))
+
     print("Everything ran successfully")
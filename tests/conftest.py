@@ -0,0 +1,28 @@
+"""
+Shared fixtures of the tests. They run on rawData/avista_sys, the only system shipped with the repository, and chdir to
+the repository root because the scripts read rawData/<system> relative to it.
+"""
+import os
+import sys
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+AVISTA_CSVS = os.path.join(ROOT, "rawData", "avista_sys", "csvs")
+
+## same arbitrary price profile as main.py
+PRICE = [0.1, 0.1, 0.1, 0.1, 0.1, 0.12, 0.15, 0.18, 0.2, 0.2, 0.22, 0.25, 0.25, 0.28, 0.33, 0.3, 0.25, 0.22, 0.15, 0.12, 0.12, 0.1, 0.1, 0.1]
+
+@pytest.fixture(autouse=True)
+def repo_root(monkeypatch):
+    monkeypatch.chdir(ROOT)
+
+@pytest.fixture
+def price():
+    return list(PRICE)
+
+@pytest.fixture
+def avista_csvs():
+    return AVISTA_CSVS
@@ -0,0 +1,36 @@
+import pytest
+from Build_Model.Objective import cost_minimize
+from Distributed.admm import solve_ADMM
+from Distributed.area_informatiion import get_area_info
+from Distributed.separate_areas import split_data_into_areas
+from Parser.cache import load_system_data
+
+def _solve(avista_csvs, price, **kwargs):
+    area_info = get_area_info('avista_sys')
+    data = load_system_data(avista_csvs, price, mode="array", use_cache=False)
+    return solve_ADMM(data, split_data_into_areas(data, area_info), area_info, cost_minimize, rho=5e-5, executor='serial', **kwargs)
+
+def test_stop_reason(avista_csvs, price):
+    vals, objective, _, _ = _solve(avista_csvs, price, max_iterations=50, eps_abs=1e-3, eps_rel=1e-4)
+    assert vals['stop_reason'] == 'converged'
+    assert len(objective) < 50
+    vals, objective, _, _ = _solve(avista_csvs, price, max_iterations=3)
+    assert vals['stop_reason'] == 'max_iterations'
+    assert len(objective) == 3
+
+## balancing the relative residuals leaves rho alone where fixed rho already converges
+def test_adaptive_rho_matches_fixed(avista_csvs, price):
+    fixed, fixed_objective, _, _ = _solve(avista_csvs, price, max_iterations=50, eps_abs=1e-3, eps_rel=1e-4)
+    adaptive, adaptive_objective, _, _ = _solve(avista_csvs, price, max_iterations=50, eps_abs=1e-3, eps_rel=1e-4, adaptive_rho=True)
+    assert adaptive['stop_reason'] == 'converged'
+    assert len(adaptive_objective) <= len(fixed_objective)
+    assert adaptive_objective[max(adaptive_objective)] == pytest.approx(fixed_objective[max(fixed_objective)], rel=1e-4)
+
+def test_failed_area_raises(avista_csvs, price):
+    area_info = get_area_info('avista_sys')
+    data = load_system_data(avista_csvs, price, mode="array", use_cache=False)
+    data_by_area = split_data_into_areas(data, area_info)
+    p_L = data_by_area['area4']['p_L']
+    data_by_area['area4']['p_L'] = {key: 1e4 * load for key, load in p_L.items()} ## beyond the feeder limits
+    with pytest.raises(RuntimeError, match="area4 could not be solved"):
+        solve_ADMM(data, data_by_area, area_info, cost_minimize, rho=5e-5, max_iterations=5, executor='serial')
@@ -0,0 +1,38 @@
+import copy
+import pytest
+from pyomo.environ import value
+from Build_Model.Constraints import build_pyomo_model
+from Build_Model.Objective import cost_minimize, pyomo_solve
+from Distributed.area_informatiion import get_area_info
+from Distributed.area_model import get_area_model, update_boundary_loads, _area_models
+from Distributed.separate_areas import split_data_into_areas
+from Parser.cache import load_system_data
+
+@pytest.fixture
+def areas(avista_csvs, price):
+    area_info = get_area_info('avista_sys')
+    data = load_system_data(avista_csvs, price, mode="array", use_cache=False)
+    return split_data_into_areas(data, area_info), area_info
+
+def test_built_once_per_run(areas):
+    data_by_area, area_info = areas
+    model = get_area_model('run1', data_by_area['area1'], 'area1', area_info)
+    assert get_area_model('run1', data_by_area['area1'], 'area1', area_info) is model
+    assert model.mutable_load_nodes == area_info['area1']['down_local_node_id']
+    other = get_area_model('run2', data_by_area['area1'], 'area1', area_info)
+    assert other is not model
+    assert all(key[0] == 'run2' for key in _area_models) ## the models of earlier runs are dropped
+
+## new dummy node loads pushed into the resident model solve like a model built with them
+def test_updated_loads_match_rebuild(areas):
+    data_by_area, area_info = areas
+    model = get_area_model('run3', data_by_area['area1'], 'area1', area_info)
+    pyomo_solve(model, cost_minimize)
+    changed = copy.deepcopy(data_by_area['area1'])
+    for key in changed['p_L']:
+        if key[1] in area_info['area1']['down_local_node_id']:
+            changed['p_L'][key] = 150.0
+    update_boundary_loads(model, changed)
+    resident = value(pyomo_solve(model, cost_minimize).obj)
+    rebuilt = value(pyomo_solve(build_pyomo_model(changed), cost_minimize).obj)
+    assert resident == pytest.approx(rebuilt, rel=1e-9)
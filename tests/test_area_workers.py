@@ -0,0 +1,33 @@
+import pickle
+import pytest
+from Build_Model.Objective import cost_minimize
+from Distributed.admm import solve_ADMM
+from Distributed.area_informatiion import get_area_info
+from Distributed.area_workers import group_areas
+from Distributed.separate_areas import split_data_into_areas
+from Parser.cache import load_system_data
+
+def _solve(avista_csvs, price, **kwargs):
+    area_info = get_area_info('avista_sys')
+    data = load_system_data(avista_csvs, price, mode="array", use_cache=False)
+    data_by_area = split_data_into_areas(data, area_info)
+    return data_by_area, solve_ADMM(data, data_by_area, area_info, cost_minimize, rho=5e-5, max_iterations=5, **kwargs)
+
+## the resident workers run the same iterates as the serial loop and only exchange the boundary vectors
+def test_workers_match_serial(avista_csvs, price):
+    _, (serial, serial_objective, _, _) = _solve(avista_csvs, price, executor='serial')
+    data_by_area, (workers, worker_objective, _, _) = _solve(avista_csvs, price, executor='process', processes=2)
+    assert workers['executor'] == 'process'
+    assert list(worker_objective) == list(serial_objective)
+    for k in serial_objective:
+        assert worker_objective[k] == pytest.approx(serial_objective[k], rel=1e-6)
+    assert serial['iteration_stats']['ipc_bytes'] == [0] * 5
+    ipc_bytes = workers['iteration_stats']['ipc_bytes']
+    assert len(ipc_bytes) == 5
+    assert max(ipc_bytes[1:]) == min(ipc_bytes[1:]) ## the same boundary vectors every iteration
+    assert 0 < max(ipc_bytes) < len(pickle.dumps(data_by_area))
+
+def test_group_areas():
+    data_by_area = {'a': {'Nset': range(5)}, 'b': {'Nset': range(4)}, 'c': {'Nset': range(3)}, 'd': {'Nset': range(2)}}
+    assert group_areas(data_by_area, 2) == [['a', 'd'], ['b', 'c']]
+    assert group_areas(data_by_area, 6) == [['a'], ['b'], ['c'], ['d']]
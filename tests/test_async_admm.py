@@ -0,0 +1,28 @@
+import pytest
+from Build_Model.Objective import cost_minimize
+from Distributed.admm import solve_ADMM
+from Distributed.area_informatiion import get_area_info
+from Distributed.separate_areas import split_data_into_areas
+from Parser.cache import load_system_data
+
+def _solve(avista_csvs, price, **kwargs):
+    area_info = get_area_info('avista_sys')
+    data = load_system_data(avista_csvs, price, mode="array", use_cache=False)
+    return solve_ADMM(data, split_data_into_areas(data, area_info), area_info, cost_minimize, rho=5e-5, max_iterations=100,
+                      eps_abs=1e-3, eps_rel=1e-4, **kwargs)
+
+## without a barrier the areas reach the consensus of the synchronous run
+@pytest.mark.parametrize('staleness', [0, 1])
+def test_async_matches_sync(avista_csvs, price, staleness):
+    sync, sync_objective, _, _ = _solve(avista_csvs, price, executor='serial')
+    rounds, round_objective, _, _ = _solve(avista_csvs, price, mode='async', staleness=staleness, executor='process', processes=2)
+    assert rounds['stop_reason'] in ('converged', 'fixed_point')
+    assert len(round_objective) < 100
+    assert len(rounds['iteration_stats']['wall_time']) == len(round_objective)
+    assert round_objective[max(round_objective)] == pytest.approx(sync_objective[max(sync_objective)], rel=1e-3)
+
+@pytest.mark.parametrize('kwargs, message', [({'adaptive_rho': True}, "adaptive_rho"), ({'checkpoint_path': 'run.npz'}, "Checkpoints"),
+                                             ({'mode': 'lockstep'}, "Unknown ADMM mode")])
+def test_async_options_refused(avista_csvs, price, kwargs, message):
+    with pytest.raises(ValueError, match=message):
+        _solve(avista_csvs, price, **{'mode': 'async', **kwargs})
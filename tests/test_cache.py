@@ -0,0 +1,39 @@
+import os
+import shutil
+import numpy as np
+from Parser.cache import CACHE_DIR, CSV_FILES, load_system_data, read_system_csvs
+from Parser.parse import parse_all_arrays
+
+def _copy_csvs(src, dst):
+    for file in CSV_FILES.values():
+        shutil.copy(os.path.join(src, file), dst)
+    return str(dst)
+
+def test_cache_round_trip(avista_csvs, price, tmp_path):
+    csvs = _copy_csvs(avista_csvs, tmp_path)
+    parsed = parse_all_arrays(**read_system_csvs(csvs), price=price)
+    first = load_system_data(csvs, price, mode="array")
+    cached = load_system_data(csvs, price, mode="array")
+    assert len(os.listdir(os.path.join(csvs, CACHE_DIR))) == 1
+    for system in (first, cached):
+        assert system.sets == parsed.sets
+        for name in parsed.profiles:
+            np.testing.assert_array_equal(system.profiles[name], parsed.profiles[name])
+        np.testing.assert_array_equal(system.node_values['p_L_nom'], parsed.node_values['p_L_nom'])
+    as_dict = load_system_data(csvs, price)
+    assert as_dict['p_L'] == parsed.to_dict()['p_L']
+
+def test_cache_invalidation(avista_csvs, price, tmp_path):
+    csvs = _copy_csvs(avista_csvs, tmp_path)
+    before = load_system_data(csvs, price, mode="array")
+    with open(os.path.join(csvs, CSV_FILES['loadshape'])) as f:
+        lines = f.read().splitlines()
+    t, m = lines[1].split(',')
+    lines[1] = f"{t},{float(m) * 2}"
+    with open(os.path.join(csvs, CSV_FILES['loadshape']), 'w') as f:
+        f.write("\n".join(lines) + "\n")
+    after = load_system_data(csvs, price, mode="array")
+    assert after.series['loadshape'][0] == 2 * before.series['loadshape'][0]
+    assert len(os.listdir(os.path.join(csvs, CACHE_DIR))) == 1 ## the entry of the old csvs is dropped
+    other_price = load_system_data(csvs, [p * 2 for p in price], mode="array")
+    np.testing.assert_allclose(other_price.series['costshape'], 2 * after.series['costshape'])
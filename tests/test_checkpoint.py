@@ -0,0 +1,52 @@
+import os
+import numpy as np
+import pytest
+from Build_Model.Objective import cost_minimize
+from Distributed.admm import solve_ADMM
+from Distributed.area_informatiion import get_area_info
+from Distributed.checkpoint import save_checkpoint, load_checkpoint, iteration_dict
+from Distributed.enapp import solve_EnAPP
+from Distributed.separate_areas import split_data_into_areas
+from Parser.cache import load_system_data
+
+@pytest.fixture
+def system(avista_csvs, price):
+    area_info = get_area_info('avista_sys')
+    data = load_system_data(avista_csvs, price, mode="array", use_cache=False)
+    return data, split_data_into_areas(data, area_info), area_info
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / "run" / "admm.npz")
+    save_checkpoint(path, {'shared': np.arange(6.0).reshape(2, 3)}, {'method': 'admm', 'iteration': 4, 'objective': {1: 2.5}})
+    arrays, meta = load_checkpoint(path, 'admm')
+    assert arrays['shared'].tolist() == [[0.0, 1.0, 2.0], [3.0, 4.0, 5.0]]
+    assert meta['iteration'] == 4 and iteration_dict(meta['objective']) == {1: 2.5}
+    assert not os.path.exists(path + ".tmp")
+    with pytest.raises(ValueError, match="not enapp"):
+        load_checkpoint(path, 'enapp')
+
+## a run resumed from the checkpoint of its first iterations ends where the uninterrupted run does
+def test_admm_resume(tmp_path, system):
+    data, data_by_area, area_info = system
+    path = str(tmp_path / "admm.npz")
+    full, full_objective, _, _ = solve_ADMM(data, data_by_area, area_info, cost_minimize, rho=5e-5, max_iterations=50, executor='serial')
+    solve_ADMM(data, data_by_area, area_info, cost_minimize, rho=5e-5, max_iterations=6, executor='serial', checkpoint_path=path)
+    resumed, resumed_objective, _, _ = solve_ADMM(data, data_by_area, area_info, cost_minimize, rho=5e-5, max_iterations=50,
+                                                  executor='serial', resume_from=path)
+    assert sorted(resumed_objective) == sorted(full_objective) ## the histories of the first run are restored
+    assert resumed['stop_reason'] == 'converged'
+    assert resumed_objective[max(resumed_objective)] == pytest.approx(full_objective[max(full_objective)], rel=1e-6)
+    with pytest.raises(ValueError, match="not enapp"):
+        solve_EnAPP(data, data_by_area, area_info, cost_minimize, max_iterations=2, executor='serial', resume_from=path)
+
+## EnAPP writes the dummy node loads into the area data, every run gets a fresh split
+def test_enapp_resume(tmp_path, system):
+    data, _, area_info = system
+    path = str(tmp_path / "enapp.npz")
+    def run(**kwargs):
+        return solve_EnAPP(data, split_data_into_areas(data, area_info), area_info, cost_minimize, executor='serial', schedule='sweep', **kwargs)
+    _, full_objective, full_convergence = run(max_iterations=20)
+    run(max_iterations=1, checkpoint_path=path)
+    _, resumed_objective, resumed_convergence = run(max_iterations=20, resume_from=path)
+    assert sorted(resumed_convergence) == sorted(full_convergence)
+    assert resumed_objective[max(resumed_objective)] == pytest.approx(full_objective[max(full_objective)], rel=1e-9)
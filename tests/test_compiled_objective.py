@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+from pyomo.environ import value
+from Build_Model.Constraints import build_pyomo_model
+from Build_Model.Objective import cost_minimize, cost_minimize_with_discharging_cost, substation_power_minimize, power_flow
+from Build_Model.compiled_objective import CompiledObjective, compiled_coefficients, is_compiled, objective_expression
+from Parser.cache import load_system_data
+
+@pytest.fixture
+def model(avista_csvs, price):
+    return build_pyomo_model(load_system_data(avista_csvs, price, mode="array", use_cache=False))
+
+def _evaluate(expr, model, seed=0):
+    rng = np.random.default_rng(seed)
+    for v in ('P_subs', 'P', 'Pe_c', 'Pe_d', 'P_c', 'P_d', 'B'):
+        for var in getattr(model, v).values():
+            var.set_value(float(rng.uniform(-10, 10)), skip_validation=True)
+    return value(expr)
+
+@pytest.mark.parametrize('obj_func', [cost_minimize, cost_minimize_with_discharging_cost, substation_power_minimize, power_flow])
+def test_compiled_matches_function(model, obj_func):
+    assert is_compiled(obj_func, model)
+    assert _evaluate(objective_expression(obj_func, model), model) == pytest.approx(_evaluate(obj_func(model), model))
+
+## weights period 24 differently, which the probe over periods 1 and 2 cannot see
+def late_penalty(model):
+    return sum(model.P_subs[t] * model.cost[t] * (2 if t == 24 else 1) for t in model.Tset)
+
+## weights the battery at node 12 differently
+def node_penalty(model):
+    return sum(model.P_d[t, j] * (5 if j == 12 else 1) for t in model.Tset for j in model.Bset)
+
+@pytest.mark.parametrize('obj_func', [late_penalty, node_penalty])
+def test_special_cases_are_not_compiled(model, obj_func):
+    assert compiled_coefficients(obj_func, model.n_c, model.n_d) is not None ## the probe alone misses them
+    assert not is_compiled(obj_func, model)
+    with pytest.raises(ValueError, match="No compiled form"):
+        CompiledObjective(obj_func, model)
+    assert _evaluate(objective_expression(obj_func, model), model) == pytest.approx(_evaluate(obj_func(model), model))
+
+def missing_component(model):
+    return sum(model.P_subs[t] * model.tariff[t] for t in model.Tset)
+
+def broken(model):
+    raise TypeError("bug in the objective")
+
+def test_missing_component_falls_back(model):
+    assert not is_compiled(missing_component, model)
+
+def test_other_errors_propagate(model):
+    with pytest.raises(TypeError, match="bug in the objective"):
+        is_compiled(broken, model)
@@ -0,0 +1,34 @@
+import pytest
+from pyomo.environ import value
+from pyomo.repn import generate_standard_repn
+from Build_Model.Constraints import build_pyomo_model
+from Build_Model.Objective import cost_minimize, pyomo_solve
+from Parser.cache import load_system_data
+
+@pytest.fixture
+def data(avista_csvs, price):
+    return load_system_data(avista_csvs, price, mode="array", use_cache=False)
+
+## every power balance row holds the lines into (+1) and out of (-1) its node and the devices at it, nothing else
+def test_power_balance_rows(data):
+    model = build_pyomo_model(data)
+    t = data['Tset'][5]
+    for j in data['Nset']:
+        repn = generate_standard_repn(model.real_power_balance_constraint[t, j].body)
+        coefs = {v.name: c for v, c in zip(repn.linear_vars, repn.linear_coefs)}
+        expected = {model.P[t, (i, k)].name: (1 if k == j else -1) for (i, k) in data['Lset'] if j in (i, k)}
+        if j in data['substationBus']:
+            expected = {name: c for name, c in expected.items() if c == -1}
+            expected[model.P_subs[t].name] = 1
+        if j in data['Bset']:
+            expected.update({model.P_c[t, j].name: -1, model.P_d[t, j].name: 1})
+        if j in data['Eset']:
+            expected.update({model.Pe_c[t, j].name: -1, model.Pe_d[t, j].name: 1})
+        assert coefs == expected
+        assert repn.constant == pytest.approx(-data['p_L'][t, j])
+
+## the array backed data and its dictionaries build the same model
+def test_array_and_dict_data(data):
+    from_arrays = value(pyomo_solve(build_pyomo_model(data), cost_minimize).obj)
+    from_dicts = value(pyomo_solve(build_pyomo_model(data.to_dict()), cost_minimize).obj)
+    assert from_arrays == pytest.approx(from_dicts, rel=1e-9)
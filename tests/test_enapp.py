@@ -0,0 +1,38 @@
+import pytest
+from Build_Model.Objective import cost_minimize
+from Distributed.area_informatiion import get_area_info
+from Distributed.enapp import area_levels, enapp_schedule_stats, solve_EnAPP
+from Distributed.separate_areas import split_data_into_areas
+from Parser.cache import load_system_data
+
+def _solve(avista_csvs, price, schedule):
+    area_info = get_area_info('avista_sys')
+    data = load_system_data(avista_csvs, price, mode="array", use_cache=False)
+    return solve_EnAPP(data, split_data_into_areas(data, area_info), area_info, cost_minimize, max_iterations=20,
+                       executor='serial', schedule=schedule)
+
+def test_area_levels():
+    assert area_levels(get_area_info('avista_sys')) == [['area4'], ['area2', 'area3'], ['area1']]
+
+def test_wavefront_matches_sweep(avista_csvs, price):
+    sweep, sweep_objective, _ = _solve(avista_csvs, price, 'sweep')
+    wavefront, wavefront_objective, _ = _solve(avista_csvs, price, 'wavefront')
+    assert wavefront_objective[max(wavefront_objective)] == pytest.approx(sweep_objective[max(sweep_objective)], rel=1e-6)
+    assert sweep['schedule_stats']['solves'] == 4 * len(sweep_objective) == sweep['schedule_stats']['sweep_solves']
+    assert 'sweep_solves' not in wavefront['schedule_stats'] ## no sweep run to compare against
+    stats = enapp_schedule_stats('wavefront', wavefront['iteration_stats']['solves'], 4, len(sweep_objective))
+    assert stats['sweep_solves'] == sweep['schedule_stats']['solves']
+    assert stats['solves_saved'] == sweep['schedule_stats']['solves'] - wavefront['schedule_stats']['solves'] > 0
+
+def test_unknown_schedule(avista_csvs, price):
+    with pytest.raises(ValueError, match="Unknown EnAPP schedule"):
+        _solve(avista_csvs, price, 'random')
+
+def test_failed_area_raises(avista_csvs, price):
+    area_info = get_area_info('avista_sys')
+    data = load_system_data(avista_csvs, price, mode="array", use_cache=False)
+    data_by_area = split_data_into_areas(data, area_info)
+    p_L = data_by_area['area4']['p_L']
+    data_by_area['area4']['p_L'] = {key: 1e4 * load for key, load in p_L.items()} ## beyond the feeder limits
+    with pytest.raises(RuntimeError, match="area4 could not be solved"):
+        solve_EnAPP(data, data_by_area, area_info, cost_minimize, max_iterations=5, executor='serial')
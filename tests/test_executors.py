@@ -0,0 +1,55 @@
+import threading
+import pytest
+from Build_Model.Constraints import build_pyomo_model
+from Build_Model.Objective import cost_minimize
+from Build_Model.solvers import get_solver, solver_available
+from Distributed.admm import solve_ADMM
+from Distributed.area_informatiion import get_area_info
+from Distributed.enapp import solve_EnAPP
+from Distributed.executors import makespan
+from Distributed.separate_areas import split_data_into_areas
+from Parser.cache import load_system_data
+
+pytestmark = pytest.mark.skipif(not solver_available('osqp'), reason="the thread executor solves with osqp")
+
+def _system(avista_csvs, price):
+    area_info = get_area_info('avista_sys')
+    data = load_system_data(avista_csvs, price, mode="array", use_cache=False)
+    return data, split_data_into_areas(data, area_info), area_info
+
+def test_makespan():
+    assert makespan([3.0, 2.0, 2.0, 1.0], 2) == 4.0
+    assert makespan([3.0, 2.0], 1) == 5.0
+
+@pytest.mark.parametrize('mode', ['sync', 'async'])
+def test_admm_threads_match_serial(avista_csvs, price, mode):
+    data, data_by_area, area_info = _system(avista_csvs, price)
+    serial, serial_objective, _, _ = solve_ADMM(data, data_by_area, area_info, cost_minimize, rho=5e-5, max_iterations=50,
+                                                mode=mode, executor='serial')
+    threads, thread_objective, _, _ = solve_ADMM(data, data_by_area, area_info, cost_minimize, rho=5e-5, max_iterations=50,
+                                                 mode=mode, executor='thread', processes=2)
+    assert threads['executor'] == 'thread'
+    assert threads['stop_reason'] == 'converged'
+    assert thread_objective[max(thread_objective)] == pytest.approx(serial_objective[max(serial_objective)], rel=1e-3)
+
+def test_enapp_threads_match_serial(avista_csvs, price):
+    data, data_by_area, area_info = _system(avista_csvs, price)
+    serial, serial_objective, _ = solve_EnAPP(data, data_by_area, area_info, cost_minimize, max_iterations=20, executor='serial')
+    threads, thread_objective, _ = solve_EnAPP(data, data_by_area, area_info, cost_minimize, max_iterations=20, executor='thread', processes=2)
+    assert threads['executor'] == 'thread'
+    assert thread_objective[max(thread_objective)] == pytest.approx(serial_objective[max(serial_objective)], rel=1e-5)
+
+def test_threads_refuse_unsafe_solver(avista_csvs, price):
+    data, data_by_area, area_info = _system(avista_csvs, price)
+    with pytest.raises(ValueError, match="thread-safe"):
+        solve_EnAPP(data, data_by_area, area_info, cost_minimize, max_iterations=2, solver='appsi_highs', executor='thread')
+    model, errors = build_pyomo_model(data), []
+    def solver_in_thread():
+        try:
+            get_solver(model, 'appsi_highs')
+        except RuntimeError as e:
+            errors.append(str(e))
+    thread = threading.Thread(target=solver_in_thread)
+    thread.start()
+    thread.join()
+    assert len(errors) == 1 and "not thread-safe" in errors[0]
@@ -0,0 +1,35 @@
+import os
+import numpy as np
+import pytest
+from pyomo.environ import value
+from Benchmark import generate_feeder as gen
+from Build_Model.Constraints import build_pyomo_model
+from Build_Model.Objective import cost_minimize, pyomo_solve
+from Distributed.enapp import solve_EnAPP
+from Distributed.separate_areas import split_data_into_areas
+from Parser.cache import load_system_data
+
+def test_radial_tree_and_areas():
+    parent = gen.random_radial_tree(200, 3, np.random.default_rng(1))
+    assert parent[1] == 0 and all(0 < parent[k] < k for k in range(2, 201))
+    assert np.bincount(parent[2:]).max() <= 3
+    area_info = gen.build_area_info(parent, gen.partition_areas(parent, 5))
+    assert len(area_info) == 5
+    assert [area for area, info in area_info.items() if not info['up_area']] == ['area1']
+    for area, info in area_info.items():
+        for down, local in zip(info['down_areas'], info['down_local_node_id']):
+            assert area_info[down]['up_area'] == [area]
+            assert local == f"D{area[4:]}_{down[4:]}"
+
+## a generated feeder parses, solves, and its areas reproduce the centralized optimum with EnAPP
+def test_generated_feeder_solves(tmp_path, monkeypatch, price):
+    monkeypatch.setattr(gen, 'RAW_DATA', str(tmp_path))
+    area_info = gen.generate_feeder('synth_test', 60, n_batteries=2, n_edos=3, n_areas=3, seed=4)
+    data = load_system_data(os.path.join(tmp_path, 'synth_test', 'csvs'), price, mode="array", use_cache=False)
+    assert len(data['Nset']) == 60 and len(data['Lset']) == 59
+    assert len(data['Bset']) == 2 and len(data['Eset']) == 3
+    model = pyomo_solve(build_pyomo_model(data), cost_minimize)
+    assert model.solved
+    _, objective, _ = solve_EnAPP(data, split_data_into_areas(data, area_info), area_info, cost_minimize, max_iterations=20,
+                                  executor='serial')
+    assert objective[max(objective)] == pytest.approx(value(model.obj), rel=1e-3)
@@ -0,0 +1,36 @@
+import pickle
+import numpy as np
+import pytest
+from Build_Model.Objective import cost_minimize
+from Distributed.admm import solve_ADMM
+from Distributed.area_informatiion import get_area_info
+from Distributed.history import IterateHistory, TrajectoryLog, load_trajectory
+from Distributed.separate_areas import split_data_into_areas
+from Parser.cache import load_system_data
+
+def test_keeps_last_iterates(tmp_path):
+    with TrajectoryLog(str(tmp_path)) as log:
+        history = IterateHistory([np.zeros(3)], keep=2, log=log, key='shared')
+        for k in range(1, 5):
+            history.append(np.full(3, float(k)))
+        assert len(history) == 2
+        assert history[-1].tolist() == [4.0] * 3 and history[-2].tolist() == [3.0] * 3
+        with pytest.raises(ValueError, match="shape"):
+            log.write('shared', np.zeros(4))
+    trajectory = load_trajectory(str(tmp_path))
+    assert trajectory['shared'][:, 0].tolist() == [0.0, 1.0, 2.0, 3.0, 4.0]
+    copy = pickle.loads(pickle.dumps(history)) ## the log stays behind
+    assert copy.log is None and copy.maxlen == 2 and copy[-1].tolist() == [4.0] * 3
+
+## the trajectory of an ADMM run holds the initial and every later iterate, the last ones equal the kept ones
+def test_admm_trajectory(tmp_path, avista_csvs, price):
+    area_info = get_area_info('avista_sys')
+    data = load_system_data(avista_csvs, price, mode="array", use_cache=False)
+    _, objective, _, _ = solve_ADMM(data, split_data_into_areas(data, area_info), area_info, cost_minimize, rho=5e-5,
+                                    max_iterations=50, executor='serial', trajectory_path=str(tmp_path))
+    trajectory = load_trajectory(str(tmp_path))
+    assert trajectory['shared'].shape == (len(objective) + 1, 3, len(data['Tset'])) ## 3 tie-lines
+    assert trajectory['dual'].shape == (len(objective) + 1, 6, len(data['Tset']))
+    assert np.all(trajectory['shared'][0] == 0)
+    ## a converged run barely moves the consensus values in its last iteration
+    assert np.max(np.abs(trajectory['shared'][-1] - trajectory['shared'][-2])) < np.max(np.abs(trajectory['shared'][1]))
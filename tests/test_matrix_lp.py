@@ -0,0 +1,24 @@
+import numpy as np
+import pytest
+from pyomo.environ import value
+from Build_Model.Constraints import build_pyomo_model
+from Build_Model.Objective import cost_minimize, substation_power_minimize, pyomo_solve
+from Build_Model.matrix_lp import solve_matrix_lp
+from Parser.cache import load_system_data
+
+@pytest.fixture
+def data(avista_csvs, price):
+    return load_system_data(avista_csvs, price, mode="array", use_cache=False)
+
+@pytest.mark.parametrize('obj_func', [cost_minimize, substation_power_minimize])
+def test_matches_pyomo(data, obj_func):
+    results = solve_matrix_lp(data, obj_func)
+    model = pyomo_solve(build_pyomo_model(data), obj_func)
+    assert results['objective_value'] == pytest.approx(value(model.obj), rel=1e-6)
+    assert results.arrays['P_subs'].shape == (len(data['Tset']),)
+    assert results.arrays['P'].shape == (len(data['Tset']), len(data['Lset']))
+    assert np.allclose(results.arrays['P_subs'], [model.P_subs[t].value for t in data['Tset']], rtol=1e-4, atol=1e-3)
+
+def test_cross_check(data):
+    results = solve_matrix_lp(data, cost_minimize, cross_check=True)
+    assert np.isfinite(results.arrays['B']).all()
@@ -0,0 +1,23 @@
+import numpy as np
+import pytest
+from Parser.cache import read_system_csvs
+from Parser.parse import parse_all_arrays, parse_all_data
+
+def test_arrays_match_dict(avista_csvs, price):
+    csvs = read_system_csvs(avista_csvs)
+    system = parse_all_arrays(**csvs, price=price)
+    data = parse_all_data(**csvs, price=price)
+    T = system.scalars['T']
+    assert system.profiles['p_L'].shape == (T, len(system.sets['Nset']))
+    for t in (1, T):
+        for j, node in enumerate(system.sets['Nset']):
+            assert data['p_L'][t, node] == pytest.approx(system.profiles['p_L'][t - 1, j])
+    np.testing.assert_allclose(system.series['costshape'], price[:T])
+
+def test_short_price_is_rejected(avista_csvs, price):
+    with pytest.raises(ValueError, match="price has 23 values"):
+        parse_all_arrays(**read_system_csvs(avista_csvs), price=price[:-1])
+
+def test_unknown_mode(avista_csvs, price):
+    with pytest.raises(ValueError, match="Unknown parse mode"):
+        parse_all_data(**read_system_csvs(avista_csvs), price=price, mode="frame")
@@ -0,0 +1,50 @@
+import pickle
+import numpy as np
+import pytest
+from Build_Model.Constraints import build_pyomo_model
+from Build_Model.Objective import cost_minimize, pyomo_solve
+from Build_Model.results import Results, merge_results
+from Build_Model.store import store_results
+from Parser.cache import load_system_data
+
+@pytest.fixture
+def model(avista_csvs, price):
+    return pyomo_solve(build_pyomo_model(load_system_data(avista_csvs, price, mode="array", use_cache=False)), cost_minimize)
+
+## the dict views give the values of the tuple-keyed dictionaries store_results used to return
+def test_views_match_model(model):
+    results = store_results(model)
+    for name, nodes in (('P', model.Lset), ('Pe_c', model.Eset), ('P_d', model.Bset), ('B', model.Bset)):
+        var = getattr(model, name)
+        expected = {(t, i): var[t, i].value for t in model.Tset for i in nodes}
+        assert results.to_dict()[name] == expected
+        assert all(results[name][key] == x for key, x in expected.items())
+    assert results['P_subs'][model.Tset[0]] == model.P_subs[model.Tset[0]].value
+    line = next(iter(model.Lset))
+    assert np.array_equal(results.column('P', line), [model.P[t, line].value for t in model.Tset])
+    assert results.line_into(line[1])[:, 0].tolist() == results.column('P', line).tolist()
+
+def test_extra_and_pickle(model):
+    results = store_results(model)
+    results['iteration_stats'] = {'wall_time': [1.0]}
+    assert list(results)[-2:] == ['objective_value', 'iteration_stats']
+    results['B'].items() ## builds a view, which does not travel
+    copy = pickle.loads(pickle.dumps(results))
+    assert copy._views == {}
+    assert copy['objective_value'] == results['objective_value']
+    assert np.array_equal(copy.arrays['B'], results.arrays['B'])
+    with pytest.raises(TypeError):
+        del results['P']
+
+## a line present in two areas keeps the values of the first one, P_subs comes from subs_from
+def test_merge_results():
+    Tset = [1, 2]
+    def part(lines, value):
+        sets = {'Lset': lines, 'Eset': [], 'Bset': []}
+        arrays = {'P_subs': np.full(2, value), 'P': np.full((2, len(lines)), value)}
+        arrays.update({name: np.zeros((2, 0)) for name in ('Pe_c', 'Pe_d', 'P_c', 'P_d', 'B')})
+        return Results(Tset, sets, arrays)
+    merged = merge_results({'area1': part([(1, 2), (2, 3)], 1.0), 'area2': part([(2, 3), (3, 4)], 2.0)}, 'area2')
+    assert merged.sets['Lset'] == [(1, 2), (2, 3), (3, 4)]
+    assert merged.arrays['P'].tolist() == [[1.0, 1.0, 2.0], [1.0, 1.0, 2.0]]
+    assert merged.arrays['P_subs'].tolist() == [2.0, 2.0]
@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+from pyomo.environ import value
+from Build_Model.Constraints import build_pyomo_model
+from Build_Model.Objective import cost_minimize, pyomo_solve
+from Build_Model.rolling import window_index, solve_rolling_horizon
+from Parser.cache import load_system_data
+
+@pytest.fixture
+def data(avista_csvs, price):
+    return load_system_data(avista_csvs, price, mode="array", use_cache=False)
+
+def test_window_index():
+    assert window_index(24, 22, 4).tolist() == [22, 23, 0, 1]
+
+## one window over the whole day is the day-ahead model, its soc brought back to b0 at period T
+@pytest.mark.parametrize('backend', ['pyomo', 'matrix'])
+def test_full_window_is_day_ahead(data, backend):
+    day_ahead = value(pyomo_solve(build_pyomo_model(data), cost_minimize).obj)
+    results = solve_rolling_horizon(data, cost_minimize, horizon=len(data['Tset']), steps=1, backend=backend)
+    assert results['window_objective'][0] == pytest.approx(day_ahead, rel=1e-6)
+
+def test_backends_agree(data):
+    pyomo = solve_rolling_horizon(data, cost_minimize, horizon=6, backend='pyomo')
+    matrix = solve_rolling_horizon(data, cost_minimize, horizon=6, backend='matrix')
+    assert len(pyomo['window_objective']) == len(data['Tset'])
+    ## a window can have several optimal first period decisions, so the windows are compared while both start from the same soc
+    b0 = np.full((1, len(data['Bset'])), float(data['b0']))
+    same_start = np.isclose(np.vstack([b0, pyomo.arrays['B'][:-1]]), np.vstack([b0, matrix.arrays['B'][:-1]])).all(axis=1)
+    assert same_start[:12].all()
+    assert np.allclose(np.array(pyomo['window_objective'])[same_start], np.array(matrix['window_objective'])[same_start], rtol=1e-6)
+    assert pyomo['objective_value'] == pytest.approx(matrix['objective_value'], rel=1e-4)
+    assert pyomo.arrays['B'].shape == (len(data['Tset']), len(data['Bset']))
+    ## the soc is back at b0 after the last period of the data horizon
+    assert pyomo.arrays['B'][-1] == pytest.approx(data['b0'])
+
+def test_unknown_backend(data):
+    with pytest.raises(ValueError, match="Unknown backend"):
+        solve_rolling_horizon(data, cost_minimize, horizon=4, steps=1, backend='sparse')
@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+from Build_Model.Constraints import build_pyomo_model
+from Build_Model.Objective import cost_minimize, pyomo_solve
+from Build_Model.run_store import save_results, load_results, load_history, load_metadata, saved_methods
+from Build_Model.store import store_results
+from Parser.cache import load_system_data
+
+@pytest.fixture
+def results(avista_csvs, price):
+    model = pyomo_solve(build_pyomo_model(load_system_data(avista_csvs, price, mode="array", use_cache=False)), cost_minimize)
+    results = store_results(model)
+    results['iteration_stats'] = {'wall_time': [0.5, 0.25]}
+    return results
+
+def test_round_trip(tmp_path, results):
+    path = str(tmp_path / "copf")
+    save_results(path, results, history={'objective': {0: 2.0, 1: 1.0}, 'convergence': [1e-2, None]}, metadata={'rho': 5e-5})
+    loaded = load_results(path)
+    assert loaded.Tset == results.Tset
+    assert loaded.sets == results.sets ## lines come back as (i, j) tuples
+    assert loaded['objective_value'] == results['objective_value']
+    assert loaded['iteration_stats'] == {'wall_time': [0.5, 0.25]}
+    for name, array in results.arrays.items():
+        assert np.array_equal(loaded.arrays[name], array, equal_nan=True)
+    assert loaded.to_dict() == results.to_dict()
+    history = load_history(path)
+    assert history['objective'].tolist() == [2.0, 1.0]
+    assert np.isnan(history['convergence'][1])
+    assert load_metadata(path)['metadata'] == {'rho': 5e-5}
+    assert saved_methods(str(tmp_path)) == ['copf']
+
+def test_lazy_selection(tmp_path, results):
+    path = str(tmp_path / "copf")
+    save_results(path, results)
+    Tset = results.Tset
+    loaded = load_results(path, variables=['B', 'P_subs'], times=(Tset[2], Tset[5]))
+    assert set(loaded.arrays) == {'P_subs', 'B'}
+    assert loaded.Tset == Tset[2:6]
+    assert np.array_equal(loaded.arrays['B'], results.arrays['B'][2:6])
+    del results.arrays['P']
+    save_results(path, results)
+    with pytest.raises(KeyError, match="not saved"):
+        load_results(path, variables=['P'])
+
+def test_replace_and_version(tmp_path, results):
+    path = str(tmp_path / "copf")
+    save_results(path, results, history={'objective': [3.0]})
+    save_results(path, results) ## a second save replaces the first one completely
+    assert load_history(path) == {}
+    meta = (tmp_path / "copf" / "meta.json")
+    meta.write_text(meta.read_text().replace('"version": 1', '"version": 0'))
+    with pytest.raises(ValueError, match="layout version"):
+        load_results(path)
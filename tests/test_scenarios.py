@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+from Build_Model.Objective import cost_minimize
+from Build_Model.scenarios import scenario_loads, solve_scenarios
+from Parser.cache import load_system_data
+
+@pytest.fixture
+def data(avista_csvs, price):
+    return load_system_data(avista_csvs, price, mode="array", use_cache=False)
+
+def test_multipliers_scale_nominal_loads(data):
+    loadshape = data.series['loadshape']
+    np.testing.assert_allclose(scenario_loads(data, loadshape[None, :])[0], data.profiles['p_L'])
+    flat = scenario_loads(data, np.ones((1, len(loadshape))))[0]
+    np.testing.assert_allclose(flat, np.tile(data.node_values['p_L_nom'], (len(loadshape), 1)))
+
+def test_nominal_loads_in_dict_mode(data):
+    assert data.to_dict()['p_L_nom'] == dict(zip(data['Nset'], data.node_values['p_L_nom'].tolist()))
+
+@pytest.mark.parametrize('backend', ['pyomo', 'matrix'])
+def test_failed_scenario_is_nan(data, price, backend):
+    loadshape = data.series['loadshape']
+    loads = np.vstack([loadshape, 1e4 * loadshape]) ## the second scenario exceeds the feeder limits
+    results = solve_scenarios(data, loads, np.vstack([price, price]), cost_minimize, processes=1, backend=backend)
+    assert np.isfinite(results['objective_value'][0])
+    assert np.isfinite(results['P'][0]).all()
+    assert np.isnan(results['objective_value'][1])
+    assert np.isnan(results['P'][1]).all() and np.isnan(results['B'][1]).all()
+
+def test_backends_agree(data, price):
+    loadshape = data.series['loadshape']
+    loads = np.vstack([loadshape, 0.8 * loadshape])
+    prices = np.vstack([price, np.asarray(price) * 2])
+    pyomo = solve_scenarios(data, loads, prices, cost_minimize, processes=1, backend='pyomo')
+    matrix = solve_scenarios(data, loads, prices, cost_minimize, processes=1, backend='matrix')
+    np.testing.assert_allclose(pyomo['objective_value'], matrix['objective_value'], rtol=1e-6)
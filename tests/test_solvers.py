@@ -0,0 +1,57 @@
+import pytest
+from pyomo.environ import Param, value
+from Build_Model.Constraints import build_pyomo_model
+from Build_Model.Objective import cost_minimize, pyomo_solve
+from Build_Model.solvers import AUTO_ORDER, SOLVERS, resolve_solver, solver_available
+from Parser.cache import load_system_data
+
+pytestmark = pytest.mark.skipif(not solver_available('osqp'), reason="osqp is not installed")
+
+@pytest.fixture
+def data(avista_csvs, price):
+    return load_system_data(avista_csvs, price, mode="array", use_cache=False)
+
+## cost_minimize plus a diagonal quadratic term on the substation power like the ADMM penalty, weighted by a mutable rho
+def quadratic_objective(model):
+    return cost_minimize(model) + model.rho / 2 * sum((model.P_subs[t] - 1000) ** 2 for t in model.Tset)
+
+def _quadratic_model(data, rho):
+    model = build_pyomo_model(data, mutable_load_nodes=list(data['Nset']), mutable_cost=True)
+    model.rho = Param(mutable=True, initialize=rho)
+    return model
+
+def test_osqp_is_the_first_quadratic_choice(data):
+    quadratic = [name for name in AUTO_ORDER if SOLVERS[name]['quadratic'] and solver_available(name)]
+    assert quadratic[0] == 'osqp'
+    model = _quadratic_model(data, 1e-4)
+    pyomo_solve(model, quadratic_objective, solver='osqp')
+    assert resolve_solver('auto', model) == 'osqp'
+
+def test_osqp_matches_highs_on_the_lp(data):
+    highs = pyomo_solve(build_pyomo_model(data), cost_minimize, solver='appsi_highs')
+    osqp = pyomo_solve(build_pyomo_model(data), cost_minimize, solver='osqp')
+    assert osqp.solved and osqp.solver_iterations > 0
+    assert value(osqp.obj) == pytest.approx(value(highs.obj), rel=1e-6)
+
+def test_updates_match_a_fresh_model(data, price):
+    model = _quadratic_model(data, 1e-4)
+    pyomo_solve(model, quadratic_objective, solver='osqp')
+    model.rho.set_value(1e-3) ## only the parameters change, the same OSQP object is updated
+    model.cost.store_values({t: 2 * c for t, c in zip(model.Tset, price)})
+    pyomo_solve(model, quadratic_objective, solver='osqp')
+
+    fresh = _quadratic_model(data, 1e-3)
+    fresh.cost.store_values({t: 2 * c for t, c in zip(fresh.Tset, price)})
+    pyomo_solve(fresh, quadratic_objective, solver='scip_persistent' if solver_available('scip_persistent') else 'osqp')
+    assert value(model.obj) == pytest.approx(value(fresh.obj), rel=1e-5)
+    for t in model.Tset:
+        assert model.P_subs[t].value == pytest.approx(fresh.P_subs[t].value, rel=1e-3, abs=1e-2)
+
+def test_infeasible_is_not_loaded(data):
+    model = _quadratic_model(data, 1e-4)
+    pyomo_solve(model, quadratic_objective, solver='osqp')
+    before = [model.P_subs[t].value for t in model.Tset]
+    model.p_L_mutable.store_values({key: 1e4 * model.p_L_mutable[key].value for key in model.p_L_mutable})
+    pyomo_solve(model, quadratic_objective, solver='osqp')
+    assert not model.solved
+    assert [model.P_subs[t].value for t in model.Tset] == before
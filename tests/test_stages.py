@@ -0,0 +1,49 @@
+import os
+import threading
+import pytest
+from Build_Model.Objective import cost_minimize
+from Distributed.area_informatiion import get_area_info
+from Distributed.enapp import solve_EnAPP
+from Distributed.separate_areas import split_data_into_areas
+from Parser.cache import load_system_data
+from Profiling import stages
+
+@pytest.fixture
+def profiling():
+    stages.enable(memory=True)
+    stages.reset()
+    yield stages
+    stages.reset()
+    stages.disable()
+
+def test_nested_stages(profiling):
+    @stages.timed('inner')
+    def inner():
+        return [0.0] * 100000
+    with stages.stage('outer', iteration=3, area='area1'):
+        inner()
+    inner_record, outer_record = stages.records()
+    assert (inner_record['stage'], inner_record['parent'], inner_record['iteration'], inner_record['area']) == ('inner', 'outer', 3, 'area1')
+    assert outer_record['parent'] is None and outer_record['wall_s'] >= inner_record['wall_s']
+    assert outer_record['peak_mb'] >= inner_record['peak_mb'] > 0.5 ## the list of 100000 floats
+    assert stages.summary()[0]['count'] == 1
+
+def test_disabled_and_other_threads(profiling):
+    thread = threading.Thread(target=lambda: stages.stage('in_thread').__enter__())
+    thread.start()
+    thread.join()
+    assert stages.records() == [] ## only the main thread records
+    stages.disable()
+    assert stages.stage('off') is stages.stage('other') ## one shared empty context manager
+    assert stages.worker_settings() is None
+
+## the area solves of the worker processes come back with the task results, tagged with their area and iteration
+def test_worker_records(profiling, avista_csvs, price):
+    area_info = get_area_info('avista_sys')
+    data = load_system_data(avista_csvs, price, mode="array", use_cache=False)
+    solve_EnAPP(data, split_data_into_areas(data, area_info), area_info, cost_minimize, max_iterations=20, executor='process',
+                processes=2, schedule='sweep')
+    solves = [r for r in stages.records() if r['stage'] == 'area_solve']
+    assert {r['area'] for r in solves} == set(area_info)
+    assert all(r['pid'] != os.getpid() and r['iteration'] is not None for r in solves)
+    assert any(r['stage'] == 'build_pyomo_model' and r['parent'] == 'area_solve' for r in stages.records())
@@ -0,0 +1,39 @@
+import os
+import shutil
+import numpy as np
+import pandas as pd
+import pytest
+from Parser.cache import CSV_FILES, read_system_csvs
+from Parser.parse import parse_all_arrays
+from Parser.stream import PROFILE_FILES, iter_system_windows
+
+def test_windows_match_whole_horizon(avista_csvs, price):
+    whole = parse_all_arrays(**read_system_csvs(avista_csvs), price=price)
+    windows = list(iter_system_windows(avista_csvs, price, window=10, mode="array"))
+    assert [w.scalars['t0'] for w in windows] == [1, 11, 21]
+    for name, values in whole.profiles.items():
+        np.testing.assert_allclose(np.vstack([w.profiles[name] for w in windows]), values)
+    np.testing.assert_allclose(np.concatenate([w.series['costshape'] for w in windows]), whole.series['costshape'])
+
+def test_drop_last(avista_csvs, price):
+    windows = list(iter_system_windows(avista_csvs, price, window=10, mode="array", drop_last=True))
+    assert [w.scalars['T'] for w in windows] == [10, 10]
+
+def test_sub_hourly_price(avista_csvs, price):
+    windows = list(iter_system_windows(avista_csvs, price, window=8, delta_t=0.25, mode="array"))
+    costshape = np.concatenate([w.series['costshape'] for w in windows])
+    np.testing.assert_allclose(costshape, np.repeat(price[:6], 4))
+
+def test_longer_profile_is_rejected(avista_csvs, price, tmp_path):
+    for file in CSV_FILES.values():
+        shutil.copy(os.path.join(avista_csvs, file), tmp_path)
+    ## two extra rows in one profile csv, ending in the last window of the loadshape
+    edo = pd.read_csv(os.path.join(avista_csvs, CSV_FILES[PROFILE_FILES[0]]))
+    edo = pd.concat([edo, edo.tail(2).assign(**{edo.columns[0]: [25, 26]})])
+    edo.to_csv(os.path.join(tmp_path, CSV_FILES[PROFILE_FILES[0]]), index=False)
+    with pytest.raises(ValueError, match="different lengths"):
+        list(iter_system_windows(str(tmp_path), price, window=12, mode="array"))
+
+def test_bad_delta_t(avista_csvs, price):
+    with pytest.raises(ValueError, match="delta_t"):
+        next(iter_system_windows(avista_csvs, price, window=12, delta_t=0.3))
@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+from Build_Model.Constraints import build_pyomo_model
+from Build_Model.Objective import cost_minimize, pyomo_solve
+from Build_Model.store import store_results
+from Distributed.admm import solve_ADMM
+from Distributed.area_informatiion import get_area_info
+from Distributed.separate_areas import split_data_into_areas
+from Distributed.tcp_workers import encode_results, decode_results, JSON_LENGTH
+from Parser.cache import load_system_data
+
+@pytest.fixture
+def data(avista_csvs, price):
+    return load_system_data(avista_csvs, price, mode="array", use_cache=False)
+
+def test_results_round_trip(data):
+    results = store_results(pyomo_solve(build_pyomo_model(data), cost_minimize))
+    decoded = decode_results(encode_results(results))
+    assert decoded.Tset == results.Tset
+    assert decoded.sets == results.sets ## lines come back as (i, j) tuples
+    assert decoded['objective_value'] == results['objective_value']
+    for name, array in results.arrays.items():
+        assert decoded.arrays[name].dtype == array.dtype
+        assert np.array_equal(decoded.arrays[name], array, equal_nan=True)
+    assert decoded.to_dict() == results.to_dict()
+
+## nothing received is unpickled: object arrays are refused
+def test_decode_refuses_objects(data):
+    payload = bytearray(encode_results(store_results(pyomo_solve(build_pyomo_model(data), cost_minimize))))
+    (length,) = JSON_LENGTH.unpack_from(payload)
+    header = payload[JSON_LENGTH.size:JSON_LENGTH.size + length].replace(b'"<f8"', b'"|O"', 1)
+    with pytest.raises(ValueError, match="Unexpected dtype"):
+        decode_results(JSON_LENGTH.pack(len(header)) + header + payload[JSON_LENGTH.size + length:])
+
+def test_admm_over_tcp_matches_serial(data):
+    area_info = get_area_info('avista_sys')
+    data_by_area = split_data_into_areas(data, area_info)
+    serial, serial_objective, _, _ = solve_ADMM(data, data_by_area, area_info, cost_minimize, rho=5e-5, max_iterations=50,
+                                                executor='serial')
+    tcp, tcp_objective, _, _ = solve_ADMM(data, data_by_area, area_info, cost_minimize, rho=5e-5, max_iterations=50,
+                                          executor='tcp', processes=2, tcp={'launch': 'avista_sys', 'connect_timeout': 120})
+    assert tcp['executor'] == 'tcp'
+    assert len(tcp_objective) == len(serial_objective)
+    assert tcp_objective[max(tcp_objective)] == pytest.approx(serial_objective[max(serial_objective)], rel=1e-6)
+    assert np.allclose(tcp.arrays['P_subs'], serial.arrays['P_subs'], rtol=1e-5, atol=1e-3)
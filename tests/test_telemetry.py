@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+from Build_Model.Objective import cost_minimize
+from Distributed.admm import solve_ADMM
+from Distributed.area_informatiion import get_area_info
+from Distributed.separate_areas import split_data_into_areas
+from Distributed.telemetry import TelemetrySink, load_telemetry
+from Parser.cache import load_system_data
+
+def test_sink_round_trip(tmp_path):
+    path = str(tmp_path / "run" / "telemetry.jsonl")
+    with TelemetrySink(path, method='test', tie_lines=[('a', 'b')]) as sink:
+        for i in range(3):
+            sink.record(iteration=i, primal=np.float64(i), primal_tie_lines=np.full((1, 2), i / 3))
+    records = load_telemetry(path)
+    assert records[0]['record'] == 'header' and records[0]['tie_lines'] == [['a', 'b']]
+    assert [r['iteration'] for r in records[1:]] == [0, 1, 2]
+    assert isinstance(records[2]['primal_tie_lines'], np.ndarray)
+    assert records[2]['primal_tie_lines'] == pytest.approx(np.full((1, 2), 1 / 3))
+
+## one record per iteration whose tie-line residuals add up to the residuals of iteration_stats
+def test_admm_telemetry(tmp_path, avista_csvs, price):
+    area_info = get_area_info('avista_sys')
+    data = load_system_data(avista_csvs, price, mode="array", use_cache=False)
+    path = str(tmp_path / "admm_telemetry.jsonl")
+    vals, objective, _, _ = solve_ADMM(data, split_data_into_areas(data, area_info), area_info, cost_minimize, rho=5e-5,
+                                       max_iterations=50, executor='serial', eps_abs=1e-3, eps_rel=1e-4, telemetry_path=path)
+    header, *records = load_telemetry(path)
+    assert header['method'] == 'admm' and len(header['tie_lines']) == 3
+    assert len(records) == len(objective)
+    stats = vals['iteration_stats']
+    for record, primal, dual in zip(records, stats['primal_residual'], stats['dual_residual']):
+        assert np.linalg.norm(record['primal_tie_lines']) == pytest.approx(primal, rel=1e-9, abs=1e-9)
+        assert np.linalg.norm(record['dual_tie_lines']) == pytest.approx(dual, rel=1e-9, abs=1e-9)
+    assert vals['stop_reason'] == 'converged'
+    assert records[-1]['primal'] <= records[-1]['eps_pri'] and records[-1]['dual'] <= records[-1]['eps_dual']
@@ -0,0 +1,37 @@
+import copy
+import numpy as np
+import pytest
+from Distributed.area_informatiion import get_area_info
+from Distributed.tie_lines import TieLines
+
+@pytest.fixture
+def tie_lines():
+    return TieLines(get_area_info('avista_sys'))
+
+def test_layout(tie_lines):
+    assert tie_lines.edges == [('area1', 'area2'), ('area1', 'area3'), ('area3', 'area4')]
+    assert tie_lines.end_keys == [('area1', 'area2'), ('area1', 'area3'), ('area2', 'area1'), ('area3', 'area1'),
+                                  ('area3', 'area4'), ('area4', 'area3')]
+    assert tie_lines.edge_ends.tolist() == [[0, 2], [1, 3], [4, 5]]
+    assert tie_lines.rows['area3'] == slice(3, 5)
+    assert tie_lines.down_edges['area1'].tolist() == [0, 1]
+
+def test_average_and_spread(tie_lines):
+    T = 4
+    flows = {area: np.arange(T * n, dtype=float).reshape(T, n) + 10 * k
+             for k, (area, n) in enumerate([('area1', 2), ('area2', 1), ('area3', 2), ('area4', 1)])}
+    ends = tie_lines.stack(flows)
+    assert ends.shape == (6, T)
+    z = tie_lines.average(ends)
+    for e, (parent, child) in enumerate(tie_lines.edge_ends):
+        assert np.allclose(z[e], (ends[parent] + ends[child]) / 2)
+    spread = tie_lines.spread(z)
+    assert np.allclose(spread[tie_lines.edge_ends[:, 0]], z) and np.allclose(spread[tie_lines.edge_ends[:, 1]], z)
+    assert np.array_equal(tie_lines.area_values(ends, 'area3'), flows['area3'])
+    assert np.array_equal(tie_lines.area_consensus(z, 'area3'), z[[1, 2]].T)
+
+def test_one_sided_tie_line():
+    area_info = copy.deepcopy(get_area_info('avista_sys'))
+    area_info['area3']['down_areas'] = []
+    with pytest.raises(ValueError, match="not one of its down_areas"):
+        TieLines(area_info)
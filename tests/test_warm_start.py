@@ -0,0 +1,33 @@
+import pytest
+from Build_Model.Objective import cost_minimize
+from Build_Model.solvers import solver_available
+from Distributed.admm import solve_ADMM
+from Distributed.area_informatiion import get_area_info
+from Distributed.enapp import solve_EnAPP
+from Distributed.separate_areas import split_data_into_areas
+from Parser.cache import load_system_data
+
+@pytest.fixture
+def system(avista_csvs, price):
+    area_info = get_area_info('avista_sys')
+    data = load_system_data(avista_csvs, price, mode="array", use_cache=False)
+    return data, area_info
+
+## warm starts change where the solves start, not where the iterations end
+@pytest.mark.skipif(not solver_available('appsi_highs'), reason="HiGHS warm starts from the basis of the previous solve")
+def test_enapp_warm_start(system):
+    data, area_info = system
+    runs = {warm: solve_EnAPP(data, split_data_into_areas(data, area_info), area_info, cost_minimize, max_iterations=20,
+                              solver='appsi_highs', warmstart=warm, executor='serial', schedule='sweep') for warm in (False, True)}
+    (cold, cold_objective, _), (warm, warm_objective, _) = runs[False], runs[True]
+    assert warm_objective[max(warm_objective)] == pytest.approx(cold_objective[max(cold_objective)], rel=1e-9)
+    ## the first iteration starts cold in both runs, the later ones restart from the previous basis
+    assert sum(warm['iteration_stats']['solver_iterations'][1:]) < sum(cold['iteration_stats']['solver_iterations'][1:])
+
+def test_admm_warm_start(system):
+    data, area_info = system
+    runs = {warm: solve_ADMM(data, split_data_into_areas(data, area_info), area_info, cost_minimize, rho=5e-5, max_iterations=50,
+                             warmstart=warm, executor='serial') for warm in (False, True)}
+    (cold, cold_objective, _, _), (warm, warm_objective, _, _) = runs[False], runs[True]
+    assert len(warm_objective) == len(cold_objective)
+    assert warm_objective[max(warm_objective)] == pytest.approx(cold_objective[max(cold_objective)], rel=1e-6)